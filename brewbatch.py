@@ -0,0 +1,153 @@
+import importlib
+import io
+import os
+import signal
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+
+import brewcache
+
+VERSIONS = (1, 2, 3, 4)
+
+
+class Job:
+    def __init__(self, source, inputs=None, version=4, timeout=None):
+        if version not in VERSIONS:
+            raise ValueError(f"Unknown interpreter version {version}")
+        self.source = source
+        self.inputs = inputs
+        self.version = version
+        # Seconds of wall time the run may take, or None for no limit
+        self.timeout = timeout
+
+
+class Result:
+    def __init__(self, output_log, error_type, error_line, exception, timed_out):
+        self.output_log = output_log
+        self.error_type = error_type
+        self.error_line = error_line
+        # "Name: message" of a Python exception that was not a Brewin error
+        self.exception = exception
+        self.timed_out = timed_out
+
+    def get_error_type_and_line(self):
+        return self.error_type, self.error_line
+
+
+class JobTimeout(BaseException):
+    # Not an Exception, so interpreter error handling cannot swallow it
+    pass
+
+
+@contextmanager
+def time_limit(timeout):
+    # SIGALRM only exists on Unix; elsewhere jobs run without a limit
+    if not timeout or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise JobTimeout
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def interpreter_class(version):
+    return importlib.import_module(f"interpreterv{version}").Interpreter
+
+
+def start_worker(cache_directory):
+    # Reads the trees the parent already parsed, and pays for every import
+    # once per worker instead of once per job
+    brewcache.default_cache = brewcache.ParseCache(directory=cache_directory)
+    for version in VERSIONS:
+        interpreter_class(version)
+
+
+def run_job(job):
+    interpreter = interpreter_class(job.version)(console_output=False, inp=job.inputs)
+    exception = None
+    timed_out = False
+    try:
+        with time_limit(job.timeout):
+            interpreter.run(job.source)
+    except JobTimeout:
+        timed_out = True
+    except Exception as e:
+        if interpreter.error_type is None:
+            exception = f"{type(e).__name__}: {e}"
+    return Result(
+        interpreter.output_log,
+        interpreter.error_type,
+        interpreter.error_line,
+        exception,
+        timed_out,
+    )
+
+
+class BatchRunner:
+    """Runs many Brewin jobs over a pool of warm worker processes.
+
+    Each distinct source is parsed once, here, into an on-disk parse cache
+    that the workers read instead of running PLY themselves. Jobs sharing
+    a source are sent to the workers together so each worker also keeps
+    the decoded tree in memory. The pool stays up between run() calls.
+    """
+
+    def __init__(self, max_workers=None, cache_directory=None, chunksize=8):
+        self.temporary_directory = None
+        if cache_directory is None:
+            self.temporary_directory = tempfile.TemporaryDirectory()
+            cache_directory = self.temporary_directory.name
+        os.makedirs(cache_directory, exist_ok=True)
+        self.cache = brewcache.ParseCache(directory=cache_directory)
+        self.chunksize = chunksize
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=start_worker,
+            initargs=(cache_directory,),
+        )
+
+    def run(self, jobs):
+        """Returns one Result per job, in the order of jobs."""
+        jobs = list(jobs)
+        # Any messages are printed again, and errors reported, by the worker
+        # that runs the job, so they are not repeated here
+        with redirect_stdout(io.StringIO()):
+            for source in {job.source for job in jobs}:
+                try:
+                    self.cache.parse(source)
+                except SyntaxError:
+                    pass
+
+        order = sorted(range(len(jobs)), key=lambda index: jobs[index].source)
+        results = [None] * len(jobs)
+        ordered_results = self.executor.map(
+            run_job, [jobs[index] for index in order], chunksize=self.chunksize
+        )
+        for index, result in zip(order, ordered_results):
+            results[index] = result
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+        if self.temporary_directory is not None:
+            self.temporary_directory.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_batch(jobs, max_workers=None, cache_directory=None):
+    with BatchRunner(max_workers, cache_directory) as runner:
+        return runner.run(jobs)
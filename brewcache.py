@@ -0,0 +1,175 @@
+import gc
+import hashlib
+import marshal
+import os
+import threading
+from collections import OrderedDict
+
+import brewparse
+import brewtables
+from element import Element, Node
+
+# Bump whenever the serialized tree layout changes
+AST_VERSION = 2
+
+PARSE_CACHE_DIR_VARIABLE = "BREWIN_PARSE_CACHE_DIR"
+
+
+def node_classes():
+    classes = {}
+    pending = [Node]
+    while pending:
+        cls = pending.pop()
+        classes[cls.__name__] = cls
+        pending.extend(cls.__subclasses__())
+    return classes
+
+
+class Encoder:
+    """Flattens a tree into nested tuples and lists that marshal can store.
+
+    Every node becomes (kind, position, *fields), where kind indexes a
+    table of (class name, elem_type) pairs saved alongside the tree.
+    """
+
+    def __init__(self):
+        self.kinds = []
+        self.kind_indexes = {}
+
+    def kind(self, node):
+        kind = (type(node).__name__, node.elem_type)
+        if kind not in self.kind_indexes:
+            self.kind_indexes[kind] = len(self.kinds)
+            self.kinds.append(kind)
+        return self.kind_indexes[kind]
+
+    def encode(self, value):
+        if isinstance(value, Node):
+            return (self.kind(value), value.position) + tuple(
+                self.encode(getattr(value, key)) for key in value.__slots__
+            )
+        if isinstance(value, list):
+            return [self.encode(item) for item in value]
+        return value
+
+
+class Decoder:
+    """Rebuilds a tree from the Encoder layout.
+
+    Nodes are filled in through their slot descriptors, which is much
+    faster than going through Node.__init__ for every node.
+    """
+
+    def __init__(self, kinds, classes):
+        self.kinds = []
+        for class_name, elem_type in kinds:
+            cls = classes[class_name]
+            setters = tuple(getattr(cls, key).__set__ for key in cls.__slots__)
+            self.kinds.append((cls, elem_type, setters))
+
+    def decode(self, value):
+        if type(value) is tuple:
+            cls, elem_type, setters = self.kinds[value[0]]
+            node = Element.__new__(cls)
+            node.elem_type = elem_type
+            node.position = value[1]
+            for setter, field in zip(setters, value[2:]):
+                if type(field) is tuple or type(field) is list:
+                    field = self.decode(field)
+                setter(node, field)
+            return node
+        return [self.decode(item) for item in value]
+
+
+class ParseCache:
+    """Caches parsed programs keyed by a hash of their source text.
+
+    Trees are kept in memory with LRU eviction, and when a directory is
+    given they are also stored there in marshal format so other processes
+    can skip PLY too. The interpreters never mutate the AST, so one tree
+    is safely shared by every run of the same program.
+    """
+
+    def __init__(self, max_entries=128, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.trees = OrderedDict()
+        # Threads may parse concurrently; only the LRU itself is guarded
+        self.lock = threading.Lock()
+        self.classes = node_classes()
+        # Trees written under other rules or layouts are never read
+        self.version = brewtables.table_key("ast", AST_VERSION, brewparse.grammar_key)
+
+    def key(self, program):
+        return hashlib.sha256(program.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.ast")
+
+    def parse(self, program):
+        key = self.key(program)
+        with self.lock:
+            tree = self.trees.get(key)
+            if tree is not None:
+                self.trees.move_to_end(key)
+                return tree
+
+        if self.directory:
+            tree = self.load(key)
+        if tree is None:
+            parser = brewparse.thread_parser()
+            tree = parser.parse(program)
+            # Recovered parses and illegal characters also print messages,
+            # so only clean parses can be replayed from the cache
+            if parser.syntax_errors or parser.illegal_characters:
+                return tree
+            if self.directory:
+                self.store(key, tree)
+
+        self.insert(key, tree)
+        return tree
+
+    def add(self, program, tree):
+        """Caches a tree parsed elsewhere, which must have parsed cleanly."""
+        self.insert(self.key(program), tree)
+
+    def insert(self, key, tree):
+        with self.lock:
+            self.trees[key] = tree
+            if len(self.trees) > self.max_entries:
+                self.trees.popitem(last=False)
+
+    def load(self, key):
+        # The tree has no cycles, so collections while building it are
+        # pure overhead
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.path(key), "rb") as ast_file:
+                version, kinds, encoded = marshal.load(ast_file)
+            if version != self.version:
+                return None
+            return Decoder(kinds, self.classes).decode(encoded)
+        except Exception:
+            # Missing or unreadable entries are just misses
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def store(self, key, tree):
+        encoder = Encoder()
+        encoded = encoder.encode(tree)
+        data = marshal.dumps((self.version, encoder.kinds, encoded))
+        brewtables.write_file(self.path(key), data)
+
+    def clear(self):
+        with self.lock:
+            self.trees.clear()
+
+
+default_cache = ParseCache(directory=os.environ.get(PARSE_CACHE_DIR_VARIABLE))
+
+
+def parse_program(program):
+    return default_cache.parse(program)
@@ -0,0 +1,184 @@
+import io
+import sys
+from contextlib import redirect_stdout
+
+import brewlex
+import brewparse
+from brewcache import Encoder
+from brewincremental import IncrementalParser
+from brewscan import TableLexer
+
+# Programs that cover every token and rule, some of them malformed on
+# purpose; each ends up lexed and parsed by every path
+SAMPLES = [
+    """func main() {
+  x = 5;
+  print("x is ", x);
+}
+""",
+    """/* Recursion and loops */
+func fact(n) {
+  if (n <= 1) { return 1; }
+  return n * fact(n - 1);
+}
+
+func main() {
+  i = 0;
+  while (i < 5) {
+    print(fact(i));
+    i = i + 1;
+  }
+  if (!(i == 5) || i != 5 && true) { print("no"); } else { print(false); }
+  return;
+}
+""",
+    """func apply(ref f, x) { return f(x); }
+func main() {
+  y = 10;
+  add = lambda(a) { return a + y; };
+  print(apply(add, -3), inputi("n? "), inputs());
+  o = @;
+  o.count = 0;
+  o.bump = lambda(by) { this.count = this.count + by; };
+  o.bump(2);
+  print(o.count, nil == nil, 7 / 2, 1 >= 2, 3 > 2, "a" + "b");
+}
+""",
+    """func main() { a = 1; b = 2; c = lambda() { return a; }; }   func f(x, y, z) { return x; }
+func g() { return f(1, 2, 3); } /* a comment
+spanning lines */ func h() { print(g()); }
+""",
+    # Syntax errors and illegal characters
+    """func main() {
+  x = 3 $ 4;
+  print(x)
+}
+
+func other() { y = ; }
+""",
+    'func main() { print("unterminated); }\n',
+    "func main() { x = 1 /* never closed\n}\n",
+    "func main() { return 1 }",
+    "",
+]
+
+
+def capture(function, *args):
+    # Runs function, returning what it returned or raised and what it printed
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            result = function(*args)
+        except SyntaxError as exception:
+            result = f"SyntaxError: {exception}"
+    return result, output.getvalue()
+
+
+def tokens(lexer, program):
+    lexer.input(program)
+    lexer.lineno = 1
+    return [(token.type, token.value, token.lineno, token.lexpos) for token in lexer]
+
+
+def check_lexer(program):
+    """Compares the tokens and messages of TableLexer with the PLY lexer."""
+    expected = capture(tokens, brewlex.lexer.clone(), program)
+    actual = capture(tokens, TableLexer(), program)
+    if actual != expected:
+        return ["TableLexer differs from the PLY lexer"]
+    return []
+
+
+def tree(parser, program):
+    # Positions included, which the encoded layout keeps
+    return Encoder().encode(parser.parse(program)), parser.syntax_errors
+
+
+def check_parser(program):
+    """Compares the trees and messages of the generated parser with PLY."""
+    if brewparse.generated_parser() is None:
+        return ["brewlalr.py is missing or out of date; run brewgen.py"]
+    expected = capture(tree, brewparse.Parser(generated=False), program)
+    mismatches = []
+    for lexer in (None, TableLexer()):
+        actual = capture(tree, brewparse.Parser(lexer), program)
+        if actual != expected:
+            lexer_name = type(lexer).__name__ if lexer else "the PLY lexer"
+            mismatches.append(f"Generated parser with {lexer_name} differs from PLY")
+    return mismatches
+
+
+def incremental_tree(parser, parse, *args):
+    source_tree = parse(*args)
+    return Encoder().encode(source_tree.tree), parser.syntax_errors
+
+
+def edits(source_tree):
+    # (start, end, text) edits in and around every function, and one that
+    # swaps the first two functions
+    program = source_tree.program
+    spans = source_tree.spans or [(0, len(program), None)]
+    for start, end, _ in spans:
+        body = program.find("{", start, end) + 1 or end
+        yield body, body, "\n"
+        yield body, body, " x = 1;"
+        yield start, end, ""
+        yield end, end, "func added() { return; }\n"
+    if len(spans) > 1:
+        (start1, end1, _), (start2, end2, _) = spans[:2]
+        yield start1, end2, program[start2:end2] + program[start1:end1]
+
+
+def check_incremental(program):
+    """Compares reparsing edits of program with parsing them from scratch."""
+    parser = IncrementalParser(cache=None)
+    previous, _ = capture(parser.parse, program)
+    if isinstance(previous, str):
+        return []
+    mismatches = []
+    for start, end, text in edits(previous):
+        new_program = program[:start] + text + program[end:]
+        expected = capture(tree, brewparse.Parser(generated=False), new_program)
+        for method, args in (
+            (parser.edit, (start, end, text)),
+            (parser.update, (new_program,)),
+        ):
+            actual = capture(incremental_tree, parser, method, previous, *args)
+            if actual != expected:
+                mismatches.append(
+                    f"Incremental {method.__name__}() differs from a full parse"
+                    f" after replacing {program[start:end]!r} with {text!r}"
+                )
+    return mismatches
+
+
+CHECKS = [check_lexer, check_parser, check_incremental]
+
+
+def check(programs):
+    """Returns a (name, mismatch) pair for every disagreement found."""
+    mismatches = []
+    for name, program in programs:
+        for check_program in CHECKS:
+            mismatches.extend((name, message) for message in check_program(program))
+    return mismatches
+
+
+def main(paths):
+    """Checks the programs in paths, or the samples when there are none."""
+    if paths:
+        programs = []
+        for path in paths:
+            with open(path) as program_file:
+                programs.append((path, program_file.read()))
+    else:
+        programs = [(f"sample {index}", sample) for index, sample in enumerate(SAMPLES)]
+    mismatches = check(programs)
+    for name, message in mismatches:
+        print(f"{name}: {message}")
+    print(f"{len(programs)} programs, {len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,119 @@
+from copy import copy
+
+from brewvalues import TRUE
+from element import Element
+
+
+class Folder:
+    """Simplifies a parsed v4 program before it is compiled.
+
+    Operators whose operands are all literals are evaluated once with the
+    interpreter's own operations, so the folded value is exactly what the
+    program would have computed. Anything that raises (ill-typed operands,
+    division by zero) is left in place to fail at runtime as before. If
+    and while statements with literal conditions are pruned, but a taken
+    if keeps its block since the block still scopes its variables.
+
+    Parsed trees are shared through the parse cache, so nodes are never
+    changed in place: a changed node is a copy, and unchanged subtrees are
+    reused as they are.
+    """
+
+    literal_types = {"int", "string", "bool", "nil"}
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def fold_program(self, program):
+        return self.fold_fields(program)
+
+    def fold_fields(self, node):
+        node_copy = None
+        for key, value in node.items():
+            if isinstance(value, Element):
+                folded = self.fold(value)
+            elif isinstance(value, list):
+                folded = self.fold_list(value)
+            else:
+                continue
+            if folded is not value:
+                if node_copy is None:
+                    node_copy = copy(node)
+                setattr(node_copy, key, folded)
+        if node_copy is None:
+            return node
+        return node_copy
+
+    def fold_list(self, items):
+        folded = []
+        changed = False
+        for item in items:
+            if isinstance(item, Element):
+                folded_item = self.fold_statement(item)
+            else:
+                folded_item = item
+            if folded_item is not item:
+                changed = True
+            if folded_item is not None:
+                folded.append(folded_item)
+        if changed:
+            return folded
+        return items
+
+    def fold_statement(self, statement):
+        # Returns None when the statement can be dropped
+        match statement.elem_type:
+            case "if":
+                return self.fold_if(statement)
+            case "while":
+                statement = self.fold(statement)
+                if self.literal_bool(statement.get("condition")) is False:
+                    return None
+                return statement
+        return self.fold(statement)
+
+    def fold_if(self, if_block):
+        if_block = self.fold_fields(if_block)
+        condition = self.literal_bool(if_block.get("condition"))
+        if condition is None:
+            return if_block
+        statements = if_block.get("statements")
+        if not condition:
+            statements = if_block.get("else_statements")
+            if not statements:
+                return None
+        if_copy = copy(if_block)
+        if_copy.condition = TRUE
+        if_copy.statements = statements
+        if_copy.else_statements = None
+        return if_copy
+
+    def literal_bool(self, expression):
+        # The condition's truth value, or None if it is not a usable literal
+        if expression.elem_type not in self.literal_types:
+            return None
+        try:
+            return self.interpreter.to_bool(expression).get("val")
+        except TypeError:
+            return None
+
+    def fold(self, node):
+        node = self.fold_fields(node)
+        interpreter = self.interpreter
+        operator = node.elem_type
+        if operator in interpreter.unary_operations:
+            operands = (node.get("op1"),)
+            operation = interpreter.unary_operations[operator]
+        elif operator in interpreter.binary_operations:
+            operands = (node.get("op1"), node.get("op2"))
+            operation = interpreter.binary_operations[operator]
+        else:
+            return node
+
+        for operand in operands:
+            if operand.elem_type not in self.literal_types:
+                return node
+        try:
+            return operation(*operands)
+        except (TypeError, ZeroDivisionError):
+            return node
@@ -0,0 +1,576 @@
+import ast
+import builtins
+import copy
+import inspect
+import os
+import sys
+import textwrap
+
+from element import Node
+
+OUTPUT_NAME = "brewlalr.py"
+
+
+class GrammarError(Exception):
+    pass
+
+
+def helper_functions(module):
+    # Module functions other than rules that take the production as their
+    # first argument, like position() and collapse_items()
+    helpers = {}
+    for name, value in vars(module).items():
+        if (
+            inspect.isfunction(value)
+            and value.__module__ == module.__name__
+            and not name.startswith("p_")
+        ):
+            params = list(inspect.signature(value).parameters)
+            if params and params[0] == "p":
+                helpers[name] = value
+    return helpers
+
+
+def function_tree(function):
+    tree = ast.parse(textwrap.dedent(inspect.getsource(function)))
+    return tree.body[0]
+
+
+def body_statements(function_def):
+    # Drops the docstring
+    body = function_def.body
+    if (
+        body
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    ):
+        body = body[1:]
+    return body
+
+
+def is_production(node):
+    return isinstance(node, ast.Name) and node.id == "p"
+
+
+def constant_index(node):
+    if not isinstance(node, ast.Constant) or type(node.value) is not int:
+        raise GrammarError(f"Unsupported production index {ast.unparse(node)}")
+    return node.value
+
+
+class Substitute(ast.NodeTransformer):
+    # Replaces a helper's parameters with the arguments it was called with
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+
+    def visit_Name(self, node):
+        if node.id in self.arguments and isinstance(node.ctx, ast.Load):
+            return copy.deepcopy(self.arguments[node.id])
+        return node
+
+
+class Reduction(ast.NodeTransformer):
+    """Translates one rule function into the reduction of one production.
+
+    References to the production p become references to the symbols the
+    reduction receives: p[0] is the result, p[i] a symbol's value and
+    p.lineno(i) and p.lexpos(i) its position. Helpers that take p are
+    inlined and len(p) becomes a constant, after which branches on it are
+    decided statically. Nodes are built by factories that fill in their
+    slots, skipping Node.__init__ and its keyword arguments.
+    """
+
+    def __init__(self, symbols, terminals, located, helpers, namespace, factories):
+        # symbols are the right-hand side of the production
+        self.symbols = symbols
+        self.terminals = terminals
+        self.located = located
+        self.helpers = helpers
+        self.namespace = namespace
+        # Node classes built so far, by factory name
+        self.factories = factories
+        self.sets_location = False
+
+    def parameter(self, index):
+        return f"p{index}"
+
+    def has_position(self, index):
+        symbol = self.symbols[index - 1]
+        return symbol in self.terminals or symbol in self.located
+
+    def symbol_value(self, index):
+        if index == 0:
+            return ast.Name("result", ast.Load())
+        if not 1 <= index <= len(self.symbols):
+            raise GrammarError(f"p[{index}] is out of range")
+        value = ast.Name(self.parameter(index), ast.Load())
+        if self.has_position(index):
+            return ast.Attribute(value, "value", ast.Load())
+        return value
+
+    def symbol_location(self, index, attribute):
+        if self.has_position(index):
+            return ast.Attribute(
+                ast.Name(self.parameter(index), ast.Load()), attribute, ast.Load()
+            )
+        # PLY reports 0 for symbols that were never given a position
+        return ast.Constant(0)
+
+    def translate(self, statements):
+        translated = []
+        for statement in statements:
+            translated.extend(self.translate_statement(statement))
+        return translated
+
+    def translate_statement(self, statement):
+        if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Call):
+            call = statement.value
+            helper = self.helper_call(call)
+            if helper is not None:
+                return self.translate(self.inline(helper, call))
+            if (
+                isinstance(call.func, ast.Attribute)
+                and is_production(call.func.value)
+                and call.func.attr in {"set_lineno", "set_lexpos"}
+            ):
+                if constant_index(call.args[0]) != 0:
+                    raise GrammarError("Only p[0] can be given a position")
+                self.sets_location = True
+                name = "lineno" if call.func.attr == "set_lineno" else "lexpos"
+                return [
+                    ast.Assign([ast.Name(name, ast.Store())], self.visit(call.args[1]))
+                ]
+        if isinstance(statement, ast.If):
+            statement.test = self.visit(statement.test)
+            decided = decide(statement.test)
+            if decided is not None:
+                return self.translate(statement.body if decided else statement.orelse)
+            statement.body = self.translate(statement.body)
+            statement.orelse = self.translate(statement.orelse)
+            return [statement]
+        return [self.visit(statement)]
+
+    def helper_call(self, call):
+        if (
+            isinstance(call.func, ast.Name)
+            and call.func.id in self.helpers
+            and call.args
+            and is_production(call.args[0])
+        ):
+            return self.helpers[call.func.id]
+        return None
+
+    def inline(self, helper, call):
+        function_def = function_tree(helper)
+        params = [arg.arg for arg in function_def.args.args]
+        if len(call.args) != len(params) or call.keywords:
+            raise GrammarError(f"Unsupported call of {function_def.name}()")
+        arguments = dict(zip(params[1:], call.args[1:]))
+        substitute = Substitute(arguments)
+        return [
+            substitute.visit(statement) for statement in body_statements(function_def)
+        ]
+
+    def visit_Call(self, node):
+        helper = self.helper_call(node)
+        if helper is not None:
+            statements = self.inline(helper, node)
+            if len(statements) != 1 or not isinstance(statements[0], ast.Return):
+                raise GrammarError(
+                    f"{helper.__name__}() must be a single return to be used "
+                    "in an expression"
+                )
+            return self.visit(statements[0].value)
+        if (
+            isinstance(node.func, ast.Name)
+            and node.func.id == "len"
+            and len(node.args) == 1
+            and is_production(node.args[0])
+        ):
+            return ast.Constant(len(self.symbols) + 1)
+        if (
+            isinstance(node.func, ast.Attribute)
+            and is_production(node.func.value)
+            and node.func.attr in {"lineno", "lexpos"}
+        ):
+            return self.symbol_location(constant_index(node.args[0]), node.func.attr)
+        node = self.generic_visit(node)
+        cls = self.node_class(node)
+        if cls is not None:
+            return self.new_node(cls, node)
+        return node
+
+    def node_class(self, call):
+        if not isinstance(call.func, ast.Name):
+            return None
+        cls = self.namespace.get(call.func.id)
+        if (
+            isinstance(cls, type)
+            and issubclass(cls, Node)
+            and cls.__init__ is Node.__init__
+        ):
+            return cls
+        return None
+
+    def new_node(self, cls, call):
+        # Same arguments as Node.__init__, passed by slot instead of keyword
+        keywords = {keyword.arg: keyword.value for keyword in call.keywords}
+        if (
+            not 1 <= len(call.args) <= 2
+            or None in keywords
+            or any(isinstance(arg, ast.Starred) for arg in call.args)
+            or not set(keywords) <= set(cls.__slots__)
+        ):
+            raise GrammarError(f"Unsupported arguments to {cls.__name__}")
+        args = list(call.args)
+        if len(args) == 1:
+            args.append(ast.Constant(None))
+        for key in cls.__slots__:
+            args.append(keywords.get(key, ast.Constant(None)))
+        name = f"new_{cls.__name__}"
+        self.factories[name] = cls
+        return ast.Call(ast.Name(name, ast.Load()), args, [])
+
+    def visit_Subscript(self, node):
+        if is_production(node.value):
+            index = constant_index(node.slice)
+            if isinstance(node.ctx, ast.Store):
+                if index != 0:
+                    raise GrammarError(f"Only p[0] can be assigned, not p[{index}]")
+                return ast.Name("result", ast.Store())
+            return self.symbol_value(index)
+        return self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        if (
+            node.attr == "lexdata"
+            and isinstance(node.value, ast.Attribute)
+            and node.value.attr == "lexer"
+            and is_production(node.value.value)
+        ):
+            return ast.Name("lexdata", ast.Load())
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id == "p":
+            raise GrammarError("Unsupported use of the production p")
+        return node
+
+
+def decide(test):
+    # The value of a test made only of constants, or None
+    for node in ast.walk(test):
+        if not isinstance(
+            node, (ast.Constant, ast.Compare, ast.BoolOp, ast.UnaryOp)
+        ) and not isinstance(node, (ast.cmpop, ast.boolop, ast.unaryop)):
+            return None
+    expression = ast.fix_missing_locations(ast.Expression(test))
+    return bool(eval(compile(expression, "<grammar>", "eval")))
+
+
+class Generator:
+    """Emits a Brewin-specific LALR parser from the grammar in brewparse.
+
+    The generated module holds PLY's action and goto tables as flat tuples
+    and one reduction function per production, translated from the rule
+    functions so that it builds the AST nodes directly. Its parse() runs
+    the same shift/reduce loop as PLY, including when tokens are read and
+    how syntax errors are reported and recovered from, so ASTs and error
+    output are identical.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.parser = module.parser
+        self.productions = self.parser.productions
+        self.nonterminals = sorted({production.name for production in self.productions})
+        self.terminals = sorted(
+            {name for actions in self.parser.action.values() for name in actions}
+        )
+        self.helpers = helper_functions(module)
+        self.imports = {}
+        self.factories = {}
+        self.check_grammar()
+        self.located = self.find_located()
+
+    def check_grammar(self):
+        # Error recovery is generated for grammars without error rules and
+        # empty productions, where PLY's recovery always ends up discarding
+        # the offending token and starting over
+        for production in self.productions[1:]:
+            if production.len == 0:
+                raise GrammarError(f"Empty production {production.str}")
+            if "error" in self.rhs(production):
+                raise GrammarError(f"Error rule {production.str}")
+
+    def rhs(self, production):
+        return production.str.split("->")[1].split()
+
+    def rule_function(self, production):
+        return vars(self.module)[production.func]
+
+    def find_located(self):
+        # Nonterminals that a rule gives a position with p.set_lineno(0, ...)
+        located = set()
+        for production in self.productions[1:]:
+            for node in ast.walk(function_tree(self.rule_function(production))):
+                if (
+                    isinstance(node, ast.Attribute)
+                    and node.attr in {"set_lineno", "set_lexpos"}
+                    and is_production(node.value)
+                ):
+                    located.add(production.name)
+        return located
+
+    def reduction(self, index, production):
+        symbols = self.rhs(production)
+        reduction = Reduction(
+            symbols,
+            self.terminals,
+            self.located,
+            self.helpers,
+            vars(self.module),
+            self.factories,
+        )
+        function_def = function_tree(self.rule_function(production))
+        body = reduction.translate(body_statements(function_def))
+        if production.name in self.located:
+            if not reduction.sets_location:
+                body.insert(0, ast.parse("lineno = lexpos = 0").body[0])
+            body.append(ast.parse("return Symbol(result, lineno, lexpos)").body[0])
+        else:
+            body.append(ast.parse("return result").body[0])
+        params = ["lexdata"] + [
+            reduction.parameter(i) for i in range(1, len(symbols) + 1)
+        ]
+        reduce_def = ast.parse(f"def reduce_{index}({', '.join(params)}): pass")
+        reduce_def = reduce_def.body[0]
+        reduce_def.body = body
+        ast.fix_missing_locations(reduce_def)
+        self.add_imports(reduce_def, params)
+        return f"# {production.str}\n{ast.unparse(reduce_def)}"
+
+    def add_imports(self, function_def, params):
+        assigned = set(params) | {"result", "lineno", "lexpos", "Symbol"}
+        assigned.update(self.factories)
+        for node in ast.walk(function_def):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                assigned.add(node.id)
+        for node in ast.walk(function_def):
+            if (
+                isinstance(node, ast.Name)
+                and isinstance(node.ctx, ast.Load)
+                and node.id not in assigned
+                and not hasattr(builtins, node.id)
+            ):
+                value = vars(self.module).get(node.id)
+                source = getattr(value, "__module__", None)
+                if source is None or source == self.module.__name__:
+                    raise GrammarError(f"Cannot import {node.id} into the parser")
+                self.imports.setdefault(source, set()).add(node.id)
+
+    def factory(self, name, cls):
+        self.imports.setdefault(cls.__module__, set()).add(cls.__name__)
+        fields = ["elem_type", "position", *cls.__slots__]
+        lines = [f"def {name}({', '.join(fields)}):", f"    node = new({cls.__name__})"]
+        lines.extend(f"    node.{field} = {field}" for field in fields)
+        lines.append("    return node")
+        return "\n".join(lines)
+
+    def table(self, name, values, comment):
+        # Kept out of black's way, which would put every entry on its own line
+        lines = [f"# {comment}", "# fmt: off", f"{name} = ("]
+        line = "   "
+        for value in values:
+            item = f" {value!r},"
+            if len(line) + len(item) > 79:
+                lines.append(line)
+                line = "   "
+            line += item
+        if line.strip():
+            lines.append(line)
+        lines.extend([")", "# fmt: on"])
+        return "\n".join(lines)
+
+    def generate(self):
+        terminal_indexes = {name: index for index, name in enumerate(self.terminals)}
+        nonterminal_indexes = {
+            name: index for index, name in enumerate(self.nonterminals)
+        }
+        # One extra column for token types the grammar does not know
+        width = len(self.terminals) + 1
+        state_count = len(self.parser.action)
+        action = [None] * (state_count * width)
+        for state, actions in self.parser.action.items():
+            for name, value in actions.items():
+                action[state * width + terminal_indexes[name]] = value
+        goto = [None] * (state_count * len(self.nonterminals))
+        for state, gotos in self.parser.goto.items():
+            for name, value in gotos.items():
+                goto[state * len(self.nonterminals) + nonterminal_indexes[name]] = value
+        defaulted = [
+            self.parser.defaulted_states.get(state) for state in range(state_count)
+        ]
+
+        reductions = [
+            self.reduction(index, production)
+            for index, production in enumerate(self.productions)
+            if index
+        ]
+        reduction_table = ["None"] + [
+            f"(reduce_{index}, {production.len}, {nonterminal_indexes[production.name]})"
+            for index, production in enumerate(self.productions)
+            if index
+        ]
+        start = self.productions[0]
+        accept = "symstack[-1]"
+        if self.rhs(start)[0] in self.located:
+            accept += ".value"
+
+        factories = [
+            self.factory(name, cls) for name, cls in sorted(self.factories.items())
+        ]
+        imports = "\n".join(
+            f"from {source} import {', '.join(sorted(names))}"
+            for source, names in sorted(self.imports.items())
+        )
+        sections = [
+            HEADER.format(module=self.module.__name__),
+            imports,
+            f'GRAMMAR_KEY = "{self.module.grammar_key}"',
+            "\n".join(
+                [
+                    f"TERMINALS = {terminal_indexes!r}",
+                    f"END = {terminal_indexes['$end']}",
+                    f"UNKNOWN = {width - 1}",
+                    f"WIDTH = {width}",
+                    f"NONTERMINAL_COUNT = {len(self.nonterminals)}",
+                ]
+            ),
+            self.table(
+                "ACTION",
+                action,
+                "state * WIDTH + terminal: > 0 shifts, < 0 reduces, 0 accepts",
+            ),
+            self.table("GOTO", goto, "state * NONTERMINAL_COUNT + nonterminal"),
+            self.table(
+                "DEFAULTED", defaulted, "Reductions made without reading a token"
+            ),
+            SYMBOL,
+            "new = object.__new__",
+            *factories,
+            *reductions,
+            "# production: (reduction, length, nonterminal)\nREDUCTIONS = (\n"
+            + "".join(f"    {entry},\n" for entry in reduction_table)
+            + ")",
+            DRIVER.replace("ACCEPT", accept),
+        ]
+        return "\n\n\n".join(section for section in sections if section) + "\n"
+
+
+HEADER = """# Generated by brewgen.py from the grammar in {module}.py; do not edit.
+# Run python brewgen.py to regenerate it after changing the grammar.
+\"\"\"Brewin-specific LALR parser, see brewgen.Generator.\"\"\""""
+
+SYMBOL = '''class Symbol:
+    """A nonterminal that its rule gave a position."""
+
+    __slots__ = ("value", "lineno", "lexpos")
+
+    def __init__(self, value, lineno, lexpos):
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos'''
+
+DRIVER = '''def parse(data, lexer, errorfunc):
+    """Parses data with tokens from lexer, like PLY's LRParser.parse.
+
+    errorfunc is called with the offending token (None at the end of the
+    input) for every syntax error outside the recovery window, as PLY's
+    p_error would be. Returns None if the input cannot be parsed.
+    """
+    action = ACTION
+    goto = GOTO
+    defaulted = DEFAULTED
+    reductions = REDUCTIONS
+    terminals = TERMINALS
+    lexer.input(data)
+    get_token = lexer.token
+    statestack = [0]
+    symstack = []
+    state = 0
+    token = None
+    column = None
+    errorcount = 0
+    while True:
+        t = defaulted[state]
+        if t is None:
+            if column is None:
+                token = get_token()
+                if token is None:
+                    column = END
+                else:
+                    column = terminals.get(token.type, UNKNOWN)
+            t = action[state * WIDTH + column]
+            if t is None:
+                if not errorcount:
+                    if column == END:
+                        errorfunc(None)
+                    else:
+                        if not hasattr(token, "lexer"):
+                            token.lexer = lexer
+                        errorfunc(token)
+                errorcount = 3
+                if column == END:
+                    return None
+                # Nothing can shift the error token, so PLY unwinds the
+                # whole stack and drops the token
+                del statestack[1:]
+                del symstack[:]
+                state = 0
+                column = None
+                continue
+        if t > 0:
+            statestack.append(t)
+            symstack.append(token)
+            state = t
+            column = None
+            if errorcount:
+                errorcount -= 1
+        elif t < 0:
+            reduction, length, nonterminal = reductions[-t]
+            value = reduction(data, *symstack[-length:])
+            del symstack[-length:]
+            del statestack[-length:]
+            symstack.append(value)
+            state = goto[statestack[-1] * NONTERMINAL_COUNT + nonterminal]
+            statestack.append(state)
+        else:
+            return ACCEPT'''
+
+
+def generate(module=None, path=None):
+    """Writes the generated parser module and returns its path."""
+    if module is None:
+        import brewparse as module
+    if path is None:
+        path = os.path.join(
+            os.path.dirname(os.path.abspath(module.__file__)), OUTPUT_NAME
+        )
+    source = Generator(module).generate()
+    try:
+        import black
+    except ImportError:
+        # Formatting is cosmetic, so black stays optional
+        pass
+    else:
+        source = black.format_str(source, mode=black.Mode())
+    with open(path, "w") as output_file:
+        output_file.write(source)
+    return path
+
+
+if __name__ == "__main__":
+    print(generate(path=(sys.argv[1:2] or [None])[0]))
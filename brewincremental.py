@@ -0,0 +1,278 @@
+import hashlib
+
+import brewcache
+import brewparse
+from brewscan import TableLexer
+from element import COLUMN_BITS, Node, ProgramNode
+from intbase import InterpreterBase
+
+
+class SourceTree:
+    """A parsed program along with where each of its functions came from.
+
+    spans holds a (start, end, digest) entry for every function in
+    tree.functions: the offsets of its text in program, running from its
+    func keyword up to the next function or the end of the program, and a
+    hash of that text. spans is None when the program did not parse
+    cleanly or had illegal characters, in which case the next edit
+    reparses everything so their messages are printed again.
+    """
+
+    def __init__(self, program, tree, spans):
+        self.program = program
+        self.tree = tree
+        self.spans = spans
+
+
+class QuietParser(brewparse.Parser):
+    # Syntax errors in a piece of a program only mean a full reparse is due,
+    # which reports them itself
+    def error(self, p):
+        self.syntax_errors.append(brewparse.syntax_error_message(p))
+
+
+class QuietLexer(TableLexer):
+    # Counts illegal characters without reporting them
+    def illegal(self, character):
+        self.illegal_characters += 1
+
+
+def digest(text):
+    return hashlib.sha256(text.encode()).digest()
+
+
+def shift_lines(value, line_delta):
+    """Returns a copy of a tree with every position moved by line_delta lines."""
+    if isinstance(value, Node):
+        copy = Node.__new__(type(value))
+        copy.elem_type = value.elem_type
+        copy.position = value.position
+        if value.position is not None:
+            copy.position += line_delta << COLUMN_BITS
+        for key in value.__slots__:
+            setattr(copy, key, shift_lines(getattr(value, key), line_delta))
+        return copy
+    if isinstance(value, list):
+        return [shift_lines(item, line_delta) for item in value]
+    return value
+
+
+class IncrementalParser:
+    """Reparses edited programs by reusing the functions an edit left alone.
+
+    parse() parses a whole program. edit() and update() take the
+    SourceTree of the previous version and only parse the functions the
+    change touched: functions before it are shared with the previous tree
+    as they are, and ones after it too unless lines were added or removed,
+    in which case they are copied with their positions shifted. Within the
+    touched stretch, a function whose text hashes the same as one it
+    replaced, such as one that was moved, is reused instead of parsed.
+    Whenever a piece does not parse cleanly on its own, the whole program
+    is parsed again, so trees and syntax errors always match those of a
+    full parse.
+
+    Clean trees are added to cache, so running an interpreter on the new
+    source finds them there instead of parsing it again. Like a Parser, an
+    IncrementalParser is meant for one thread at a time.
+    """
+
+    def __init__(self, lexer=None, cache=brewcache.default_cache):
+        self.parser = brewparse.Parser(lexer)
+        self.lexer = QuietLexer()
+        self.piece_parser = QuietParser(self.lexer)
+        self.cache = cache
+        # Messages reported while parsing the most recent program
+        self.syntax_errors = []
+
+    def parse(self, program):
+        tree = self.parser.parse(program)
+        self.syntax_errors = self.parser.syntax_errors
+        spans = None
+        if not (self.syntax_errors or self.parser.illegal_characters):
+            chunks = self.split(program, 0, len(program), 1)
+            if chunks is not None and len(chunks) == len(tree.functions):
+                spans = [
+                    (start, end, digest(program[start:end]))
+                    for start, end, line in chunks
+                ]
+        return self.finish(program, tree, spans)
+
+    def update(self, previous, program):
+        """Reparses program, a new version of the source of previous."""
+        old_program = previous.program
+        # Longest common prefix and then suffix, found by comparing slices
+        shortest = min(len(old_program), len(program))
+        low, high = 0, shortest
+        while low < high:
+            middle = (low + high + 1) // 2
+            if old_program[:middle] == program[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        prefix = low
+        low, high = 0, shortest - prefix
+        while low < high:
+            middle = (low + high + 1) // 2
+            if (
+                old_program[len(old_program) - middle :]
+                == program[len(program) - middle :]
+            ):
+                low = middle
+            else:
+                high = middle - 1
+        suffix = low
+        return self.edit(
+            previous,
+            prefix,
+            len(old_program) - suffix,
+            program[prefix : len(program) - suffix],
+        )
+
+    def edit(self, previous, start, end, text):
+        """Reparses previous with program[start:end] replaced by text."""
+        old_program = previous.program
+        if not 0 <= start <= end <= len(old_program):
+            raise ValueError("Edit is outside the program")
+        program = old_program[:start] + text + old_program[end:]
+        spans = previous.spans
+        if spans is None:
+            return self.parse(program)
+        functions = previous.tree.functions
+        offset_delta = len(text) - (end - start)
+        line_delta = text.count("\n") - old_program.count("\n", start, end)
+
+        # The first function whose text (with what follows it) the edit
+        # touches; the edit itself may lie before the first function
+        first = 0
+        while first < len(spans) and spans[first][1] <= start:
+            first += 1
+        if first < len(spans) and spans[first][0] <= start:
+            region_start = spans[first][0]
+            region_line = functions[first].line
+        elif first < len(spans):
+            region_start, region_line = 0, 1
+        else:
+            region_start = start
+            region_line = program.count("\n", 0, start) + 1
+
+        # Functions from the first one past the edit that still starts on
+        # the same column are kept; their text is unchanged
+        last = first + 1
+        while last < len(spans):
+            old_start = spans[last][0]
+            if old_start >= end:
+                new_start = old_start + offset_delta
+                column = new_start - program.rfind("\n", 0, new_start)
+                if column == functions[last].column:
+                    break
+            last += 1
+        if last < len(spans):
+            region_end = spans[last][0] + offset_delta
+        else:
+            region_end = len(program)
+
+        pieces = self.reparse(
+            program,
+            region_start,
+            region_end,
+            region_line,
+            functions[first:last],
+            spans[first:last],
+        )
+        if pieces is None:
+            return self.parse(program)
+        region_functions, region_spans = pieces
+        if not (first or region_functions or last < len(spans)):
+            # A program needs a function, so let the parser report it
+            return self.parse(program)
+
+        kept_functions = functions[last:]
+        if line_delta:
+            kept_functions = [
+                shift_lines(function, line_delta) for function in kept_functions
+            ]
+        tree = ProgramNode(
+            InterpreterBase.PROGRAM_DEF,
+            functions=functions[:first] + region_functions + kept_functions,
+        )
+        spans = (
+            spans[:first]
+            + region_spans
+            + [
+                (span_start + offset_delta, span_end + offset_delta, span_digest)
+                for span_start, span_end, span_digest in spans[last:]
+            ]
+        )
+        self.syntax_errors = []
+        return self.finish(program, tree, spans)
+
+    def reparse(self, program, start, end, line, old_functions, old_spans):
+        # Parses the functions in program[start:end], reusing old ones with
+        # the same text and column, or returns None if that is not sound
+        chunks = self.split(program, start, end, line)
+        if chunks is None or self.lexer.illegal_characters:
+            return None
+        if not chunks and start < end:
+            return None
+        reusable = {
+            (span[2], function.column): function
+            for function, span in zip(old_functions, old_spans)
+        }
+
+        functions = []
+        spans = []
+        for chunk_start, chunk_end, chunk_line in chunks:
+            text = program[chunk_start:chunk_end]
+            text_digest = digest(text)
+            column = chunk_start - program.rfind("\n", 0, chunk_start)
+            function = reusable.get((text_digest, column))
+            if function is not None:
+                if function.line != chunk_line:
+                    function = shift_lines(function, chunk_line - function.line)
+            else:
+                # Padding keeps the columns on the first line right
+                try:
+                    tree = self.piece_parser.parse(
+                        " " * (column - 1) + text, chunk_line
+                    )
+                except SyntaxError:
+                    return None
+                if self.piece_parser.syntax_errors or len(tree.functions) != 1:
+                    return None
+                function = tree.functions[0]
+            functions.append(function)
+            spans.append((chunk_start, chunk_end, text_digest))
+        return functions, spans
+
+    def split(self, program, start, end, line):
+        """Returns the (start, end, line) of each function in program[start:end].
+
+        Functions are found by their func keyword outside any braces, and
+        run up to the next one. Returns None if there are tokens before
+        the first function.
+        """
+        lexer = self.lexer
+        lexer.input(program)
+        lexer.lexpos = start
+        lexer.lexlen = end
+        lexer.lineno = line
+        chunks = []
+        depth = 0
+        for token in lexer:
+            if token.type == "LBRACE":
+                depth += 1
+            elif token.type == "RBRACE":
+                depth -= 1
+            elif token.type == "FUNC" and depth == 0:
+                if chunks:
+                    chunks[-1][1] = token.lexpos
+                chunks.append([token.lexpos, end, token.lineno])
+                continue
+            if not chunks:
+                return None
+        return [tuple(chunk) for chunk in chunks]
+
+    def finish(self, program, tree, spans):
+        if self.cache is not None and spans is not None:
+            self.cache.add(program, tree)
+        return SourceTree(program, tree, spans)
@@ -0,0 +1,1248 @@
+# Generated by brewgen.py from the grammar in brewparse.py; do not edit.
+# Run python brewgen.py to regenerate it after changing the grammar.
+"""Brewin-specific LALR parser, see brewgen.Generator."""
+
+
+from element import (
+    AssignmentNode,
+    BinaryNode,
+    EmptyNode,
+    FuncNode,
+    FunctionCallNode,
+    IfNode,
+    LambdaNode,
+    MethodCallNode,
+    NameNode,
+    ProgramNode,
+    ReturnNode,
+    UnaryNode,
+    ValueNode,
+    WhileNode,
+    token_position,
+)
+from intbase import InterpreterBase
+
+
+GRAMMAR_KEY = "d855fd5225dd7cd6b2c31178fcf17821"
+
+
+TERMINALS = {
+    "$end": 0,
+    "AND": 1,
+    "ASSIGN": 2,
+    "AT": 3,
+    "COMMA": 4,
+    "DIVIDE": 5,
+    "DOT": 6,
+    "ELSE": 7,
+    "EQ": 8,
+    "FALSE": 9,
+    "FUNC": 10,
+    "GREATER": 11,
+    "GREATER_EQ": 12,
+    "IF": 13,
+    "LAMBDA": 14,
+    "LBRACE": 15,
+    "LESS": 16,
+    "LESS_EQ": 17,
+    "LPAREN": 18,
+    "MINUS": 19,
+    "MULTIPLY": 20,
+    "NAME": 21,
+    "NIL": 22,
+    "NOT": 23,
+    "NOT_EQ": 24,
+    "NUMBER": 25,
+    "OR": 26,
+    "PLUS": 27,
+    "RBRACE": 28,
+    "REF": 29,
+    "RETURN": 30,
+    "RPAREN": 31,
+    "SEMI": 32,
+    "STRING": 33,
+    "TRUE": 34,
+    "WHILE": 35,
+}
+END = 0
+UNKNOWN = 36
+WIDTH = 37
+NONTERMINAL_COUNT = 12
+
+
+# state * WIDTH + terminal: > 0 shifts, < 0 reduces, 0 accepts
+# fmt: off
+ACTION = (
+    None, None, None, None, None, None, None, None, None, None, 4, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None, 0,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None, -1,
+    None, None, None, None, None, None, None, None, None, 4, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, -3, None,
+    None, None, None, None, None, None, None, None, -3, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, 6, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, -2, None, None,
+    None, None, None, None, None, None, None, -2, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 7, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, 8, None, None, None, None, None, None,
+    None, 12, None, 10, None, None, None, None, None, None, None, None, None,
+    -10, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, -10, None, None, None, None, None, None, None, None,
+    None, 14, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 13, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, 15, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None, -9,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, -9, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, 16, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 17, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, 8, None, None, None, None, None, None, None, 12,
+    None, None, None, None, None, None, None, None, None, None, 35, None, None,
+    None, None, None, 33, None, None, None, 25, 37, None, None, None, 20, 29,
+    None, 19, 34, 28, None, 30, None, None, None, None, 27, None, None, 36, 32,
+    26, None, None, None, None, None, -11, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, -11, None, None, None,
+    None, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, 25, 37, None, None, None, 20, 29, None, 19, 34, 28, None, 30,
+    None, None, None, None, 27, None, None, 36, 32, 26, None, None, None, None,
+    None, -8, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, -8, None, None, None, None, None, None, -16, -16, None,
+    None, -16, 39, None, -16, None, None, -16, -16, None, None, None, -16, -16,
+    40, -16, -16, None, None, None, -16, None, -16, -16, None, None, None,
+    None, -16, None, None, None, None, None, None, None, 35, None, None, None,
+    None, None, 33, None, None, None, None, 37, None, None, None, 20, 29, None,
+    43, 34, 28, None, 30, None, None, None, None, None, None, None, 36, 32,
+    None, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, 25, 37, None, None, None, 20, 29, None, 19, 34, 28, None, 30,
+    None, None, 44, None, 27, None, None, 36, 32, 26, None, None, None, None,
+    -13, None, None, None, None, None, -13, None, None, None, -13, -13, None,
+    None, None, -13, -13, None, -13, -13, -13, None, -13, None, None, -13,
+    None, -13, None, None, -13, -13, -13, None, None, -45, 46, None, None, -45,
+    None, None, -45, None, None, -45, -45, None, None, None, -45, -45, None,
+    -45, -45, None, None, None, -45, None, -45, -45, None, None, None, None,
+    -45, None, None, None, None, None, 59, None, None, None, 57, None, None,
+    48, None, None, 49, 52, None, None, None, 50, 53, None, 55, 56, None, None,
+    None, 51, None, 58, 54, None, None, None, None, 47, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, 60, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, 61, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 35, None, None, None, None, None, 33, None, None, None,
+    None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30, None, None,
+    None, None, None, None, 63, 36, 32, None, None, None, None, None, 35, None,
+    None, None, None, None, 33, None, None, None, None, 37, None, None, None,
+    20, 29, None, 43, 34, 28, None, 30, None, None, None, None, None, None,
+    None, 36, 32, None, None, None, None, None, 35, None, None, None, None,
+    None, 33, None, None, None, None, 37, None, None, None, 20, 29, None, 43,
+    34, 28, None, 30, None, None, None, None, None, None, None, 36, 32, None,
+    None, None, -38, None, None, -38, -38, None, None, -38, None, None, -38,
+    -38, None, None, None, -38, -38, None, -38, -38, None, None, None, -38,
+    None, -38, -38, None, None, None, -38, -38, None, None, None, None, None,
+    -39, None, None, -39, -39, None, None, -39, None, None, -39, -39, None,
+    None, None, -39, -39, None, -39, -39, None, None, None, -39, None, -39,
+    -39, None, None, None, -39, -39, None, None, None, None, None, -40, None,
+    None, -40, -40, None, None, -40, None, None, -40, -40, None, None, None,
+    -40, -40, None, -40, -40, None, None, None, -40, None, -40, -40, None,
+    None, None, -40, -40, None, None, None, None, None, -41, None, None, -41,
+    -41, None, None, -41, None, None, -41, -41, None, None, None, -41, -41,
+    None, -41, -41, None, None, None, -41, None, -41, -41, None, None, None,
+    -41, -41, None, None, None, None, None, -42, None, None, -42, -42, None,
+    None, -42, None, None, -42, -42, None, None, None, -42, -42, None, -42,
+    -42, None, None, None, -42, None, -42, -42, None, None, None, -42, -42,
+    None, None, None, None, None, -43, None, None, -43, -43, None, None, -43,
+    None, None, -43, -43, None, None, None, -43, -43, None, -43, -43, None,
+    None, None, -43, None, -43, -43, None, None, None, -43, -43, None, None,
+    None, None, None, -44, None, None, -44, -44, None, None, -44, None, None,
+    -44, -44, None, None, None, -44, -44, None, -44, -44, None, None, None,
+    -44, None, -44, -44, None, None, None, -44, -44, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, 66, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 35, None, None, None, None, None, 33, None, None, None,
+    25, 37, None, None, None, 20, 29, None, 19, 34, 28, None, 30, None, None,
+    67, None, 27, None, None, 36, 32, 26, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, 68, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 35, None, None,
+    None, None, None, 33, None, None, None, None, 37, None, None, None, 20, 29,
+    None, 43, 34, 28, None, 30, None, None, None, None, None, 70, None, 36, 32,
+    None, None, None, 59, None, None, None, 57, None, None, 48, None, None, 49,
+    52, None, None, None, 50, 53, None, 55, 56, None, None, None, 51, None, 58,
+    54, None, None, None, 72, None, None, None, None, None, None, -45, None,
+    None, -45, -45, None, None, -45, None, None, -45, -45, None, None, None,
+    -45, -45, None, -45, -45, None, None, None, -45, None, -45, -45, None,
+    None, None, -45, -45, None, None, None, None, None, -16, None, None, -16,
+    -16, 73, None, -16, None, None, -16, -16, None, None, None, -16, -16, 40,
+    -16, -16, None, None, None, -16, None, -16, -16, None, None, None, -16,
+    -16, None, None, None, None, -5, None, None, None, None, None, None, None,
+    None, None, -5, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, -12, None, None, None, None,
+    None, -12, None, None, None, -12, -12, None, None, None, -12, -12, None,
+    -12, -12, -12, None, -12, None, None, -12, None, -12, None, None, -12, -12,
+    -12, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30,
+    None, None, None, None, None, None, None, 36, 32, None, None, None, None,
+    None, -20, None, None, None, None, None, -20, None, None, None, -20, -20,
+    None, None, None, -20, -20, None, -20, -20, -20, None, -20, None, None,
+    -20, None, -20, None, None, -20, -20, -20, None, None, None, None, 35,
+    None, None, None, None, None, 33, None, None, None, None, 37, None, None,
+    None, 20, 29, None, 43, 34, 28, None, 30, None, None, None, None, None,
+    None, None, 36, 32, None, None, None, None, None, 35, None, None, None,
+    None, None, 33, None, None, None, None, 37, None, None, None, 20, 29, None,
+    43, 34, 28, None, 30, None, None, None, None, None, None, None, 36, 32,
+    None, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30,
+    None, None, None, None, None, None, None, 36, 32, None, None, None, None,
+    None, 35, None, None, None, None, None, 33, None, None, None, None, 37,
+    None, None, None, 20, 29, None, 43, 34, 28, None, 30, None, None, None,
+    None, None, None, None, 36, 32, None, None, None, None, None, 35, None,
+    None, None, None, None, 33, None, None, None, None, 37, None, None, None,
+    20, 29, None, 43, 34, 28, None, 30, None, None, None, None, None, None,
+    None, 36, 32, None, None, None, None, None, 35, None, None, None, None,
+    None, 33, None, None, None, None, 37, None, None, None, 20, 29, None, 43,
+    34, 28, None, 30, None, None, None, None, None, None, None, 36, 32, None,
+    None, None, None, None, 35, None, None, None, None, None, 33, None, None,
+    None, None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30, None,
+    None, None, None, None, None, None, 36, 32, None, None, None, None, None,
+    35, None, None, None, None, None, 33, None, None, None, None, 37, None,
+    None, None, 20, 29, None, 43, 34, 28, None, 30, None, None, None, None,
+    None, None, None, 36, 32, None, None, None, None, None, 35, None, None,
+    None, None, None, 33, None, None, None, None, 37, None, None, None, 20, 29,
+    None, 43, 34, 28, None, 30, None, None, None, None, None, None, None, 36,
+    32, None, None, None, None, None, 35, None, None, None, None, None, 33,
+    None, None, None, None, 37, None, None, None, 20, 29, None, 43, 34, 28,
+    None, 30, None, None, None, None, None, None, None, 36, 32, None, None,
+    None, None, None, 35, None, None, None, None, None, 33, None, None, None,
+    None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30, None, None,
+    None, None, None, None, None, 36, 32, None, None, None, None, None, 35,
+    None, None, None, None, None, 33, None, None, None, None, 37, None, None,
+    None, 20, 29, None, 43, 34, 28, None, 30, None, None, None, None, None,
+    None, None, 36, 32, None, None, None, None, None, 35, None, None, None,
+    None, None, 33, None, None, None, None, 37, None, None, None, 20, 29, None,
+    43, 34, 28, None, 30, None, None, None, None, None, None, None, 36, 32,
+    None, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, None, 37, None, None, None, 20, 29, None, 43, 34, 28, None, 30,
+    None, None, None, None, None, None, None, 36, 32, None, None, None, 59,
+    None, None, None, 57, None, None, 48, None, None, 49, 52, None, None, None,
+    50, 53, None, 55, 56, None, None, None, 51, None, 58, 54, None, None, None,
+    None, 89, None, None, None, None, None, None, None, -22, None, None, None,
+    None, None, -22, None, None, None, -22, -22, None, None, None, -22, -22,
+    None, -22, -22, -22, None, -22, None, None, -22, None, -22, None, None,
+    -22, -22, -22, None, None, -23, None, None, -23, -23, None, None, -23,
+    None, None, -23, -23, None, None, None, -23, -23, None, -23, -23, None,
+    None, None, -23, None, -23, -23, None, None, None, -23, -23, None, None,
+    None, None, None, -24, None, None, -24, -24, None, None, -24, None, None,
+    -24, -24, None, None, None, -24, -24, None, -24, -24, None, None, None,
+    -24, None, -24, -24, None, None, None, -24, -24, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, 8, None, None, None,
+    None, None, None, None, 12, None, 91, None, None, None, None, None, -4,
+    None, None, None, None, None, None, None, None, None, -4, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    -15, -15, None, None, -15, None, None, -15, None, None, -15, -15, None,
+    None, None, -15, -15, 92, -15, -15, None, None, None, -15, None, -15, -15,
+    None, None, None, None, -15, None, None, None, None, None, None, None,
+    None, 94, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 93, None, None, None, None, None, None, -47, None, None,
+    -47, -47, None, None, -47, None, None, -47, -47, None, None, None, -47,
+    -47, None, -47, -47, None, None, None, -47, None, -47, -47, None, None,
+    None, -47, -47, None, None, None, None, None, 59, None, None, -51, 57,
+    None, None, 48, None, None, 49, 52, None, None, None, 50, 53, None, 55, 56,
+    None, None, None, 51, None, 58, 54, None, None, None, -51, None, None,
+    None, None, None, None, -35, None, None, -35, -35, None, None, -35, None,
+    None, -35, -35, None, None, None, -35, -35, None, -35, -35, None, None,
+    None, -35, None, -35, -35, None, None, None, -35, -35, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 95, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, 59, None, None, None, 57, None, None, 48, None, None, 49, 52,
+    None, None, None, 50, 53, None, 55, 56, None, None, None, 51, None, 58, 54,
+    None, None, None, None, 96, None, None, None, None, None, -25, None, None,
+    -25, 57, None, None, -25, None, None, -25, -25, None, None, None, -25, -25,
+    None, 55, 56, None, None, None, -25, None, -25, 54, None, None, None, -25,
+    -25, None, None, None, None, None, -26, None, None, -26, 57, None, None,
+    -26, None, None, -26, -26, None, None, None, -26, -26, None, 55, 56, None,
+    None, None, -26, None, -26, 54, None, None, None, -26, -26, None, None,
+    None, None, None, -27, None, None, -27, 57, None, None, -27, None, None,
+    -27, -27, None, None, None, -27, -27, None, 55, 56, None, None, None, -27,
+    None, -27, 54, None, None, None, -27, -27, None, None, None, None, None,
+    -28, None, None, -28, 57, None, None, -28, None, None, -28, -28, None,
+    None, None, -28, -28, None, 55, 56, None, None, None, -28, None, -28, 54,
+    None, None, None, -28, -28, None, None, None, None, None, -29, None, None,
+    -29, 57, None, None, -29, None, None, -29, -29, None, None, None, -29, -29,
+    None, 55, 56, None, None, None, -29, None, -29, 54, None, None, None, -29,
+    -29, None, None, None, None, None, -30, None, None, -30, 57, None, None,
+    -30, None, None, -30, -30, None, None, None, -30, -30, None, 55, 56, None,
+    None, None, -30, None, -30, 54, None, None, None, -30, -30, None, None,
+    None, None, None, -31, None, None, -31, 57, None, None, -31, None, None,
+    -31, -31, None, None, None, -31, -31, None, -31, 56, None, None, None, -31,
+    None, -31, -31, None, None, None, -31, -31, None, None, None, None, None,
+    -32, None, None, -32, 57, None, None, -32, None, None, -32, -32, None,
+    None, None, -32, -32, None, -32, 56, None, None, None, -32, None, -32, -32,
+    None, None, None, -32, -32, None, None, None, None, None, -33, None, None,
+    -33, -33, None, None, -33, None, None, -33, -33, None, None, None, -33,
+    -33, None, -33, -33, None, None, None, -33, None, -33, -33, None, None,
+    None, -33, -33, None, None, None, None, None, -34, None, None, -34, -34,
+    None, None, -34, None, None, -34, -34, None, None, None, -34, -34, None,
+    -34, -34, None, None, None, -34, None, -34, -34, None, None, None, -34,
+    -34, None, None, None, None, None, 59, None, None, -36, 57, None, None, 48,
+    None, None, 49, 52, None, None, None, 50, 53, None, 55, 56, None, None,
+    None, 51, None, -36, 54, None, None, None, -36, -36, None, None, None,
+    None, None, -37, None, None, -37, 57, None, None, 48, None, None, 49, 52,
+    None, None, None, 50, 53, None, 55, 56, None, None, None, 51, None, -37,
+    54, None, None, None, -37, -37, None, None, None, None, None, 59, None,
+    None, None, 57, None, None, 48, None, None, 49, 52, None, None, None, 50,
+    53, None, 55, 56, None, None, None, 51, None, 58, 54, None, None, None, 97,
+    None, None, None, None, None, None, 59, None, None, None, 57, None, None,
+    48, None, None, 49, 52, None, None, None, 50, 53, None, 55, 56, None, None,
+    None, 51, None, 58, 54, None, None, None, 98, None, None, None, None, None,
+    None, None, None, -21, None, None, None, None, None, -21, None, None, None,
+    -21, -21, None, None, None, -21, -21, None, -21, -21, -21, None, -21, None,
+    None, -21, None, -21, None, None, -21, -21, -21, None, None, None, None,
+    None, 14, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 99, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, 100,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None, 35,
+    None, None, None, None, None, 33, None, None, None, None, 37, None, None,
+    None, 20, 29, None, 43, 34, 28, None, 30, None, None, None, None, None,
+    102, None, 36, 32, None, None, None, -46, None, None, -46, -46, None, None,
+    -46, None, None, -46, -46, None, None, None, -46, -46, None, -46, -46,
+    None, None, None, -46, None, -46, -46, None, None, None, -46, -46, None,
+    None, None, None, None, None, None, 35, None, None, None, None, None, 33,
+    None, None, None, None, 37, None, None, None, 20, 29, None, 43, 34, 28,
+    None, 30, None, None, None, None, None, None, None, 36, 32, None, None,
+    None, -15, None, None, -15, -15, None, None, -15, None, None, -15, -15,
+    None, None, None, -15, -15, 92, -15, -15, None, None, None, -15, None, -15,
+    -15, None, None, None, -15, -15, None, None, None, None, None, None, None,
+    -14, None, None, None, None, None, -14, None, None, None, -14, -14, None,
+    None, None, -14, -14, None, -14, -14, -14, None, -14, None, None, -14,
+    None, -14, None, None, -14, -14, -14, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 104, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, 105,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    106, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, 35, None, None, None, None, None, 33, None, None, None, 25, 37, None,
+    None, None, 20, 29, None, 19, 34, 28, None, 30, None, None, None, None, 27,
+    None, None, 36, 32, 26, None, None, None, None, None, 94, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, 108,
+    None, None, None, None, None, None, -49, None, None, -49, -49, None, None,
+    -49, None, None, -49, -49, None, None, None, -49, -49, None, -49, -49,
+    None, None, None, -49, None, -49, -49, None, None, None, -49, -49, None,
+    None, None, None, None, 59, None, None, -50, 57, None, None, 48, None,
+    None, 49, 52, None, None, None, 50, 53, None, 55, 56, None, None, None, 51,
+    None, 58, 54, None, None, None, -50, None, None, None, None, None, None,
+    None, None, 35, None, None, None, None, None, 33, None, None, None, 25, 37,
+    None, None, None, 20, 29, None, 19, 34, 28, None, 30, None, None, None,
+    None, 27, None, None, 36, 32, 26, None, None, None, None, 35, None, None,
+    None, None, None, 33, None, None, None, 25, 37, None, None, None, 20, 29,
+    None, 19, 34, 28, None, 30, None, None, None, None, 27, None, None, 36, 32,
+    26, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, 25, 37, None, None, None, 20, 29, None, 19, 34, 28, None, 30,
+    None, None, None, None, 27, None, None, 36, 32, 26, None, None, None, None,
+    35, None, None, None, None, None, 33, None, None, None, 25, 37, None, None,
+    None, 20, 29, None, 19, 34, 28, None, 30, None, None, 112, None, 27, None,
+    None, 36, 32, 26, None, None, -48, None, None, -48, -48, None, None, -48,
+    None, None, -48, -48, None, None, None, -48, -48, None, -48, -48, None,
+    None, None, -48, None, -48, -48, None, None, None, -48, -48, None, None,
+    None, None, None, None, None, 35, None, None, None, None, None, 33, None,
+    None, None, 25, 37, None, None, None, 20, 29, None, 19, 34, 28, None, 30,
+    None, None, 113, None, 27, None, None, 36, 32, 26, None, None, None, None,
+    35, None, None, None, None, None, 33, None, None, None, 25, 37, None, None,
+    None, 20, 29, None, 19, 34, 28, None, 30, None, None, 114, None, 27, None,
+    None, 36, 32, 26, None, None, None, None, 35, None, None, None, None, None,
+    33, None, None, None, 25, 37, None, None, None, 20, 29, None, 19, 34, 28,
+    None, 30, None, None, 115, None, 27, None, None, 36, 32, 26, None, None,
+    -7, None, None, -7, -7, None, None, -7, None, None, -7, -7, None, None,
+    None, -7, -7, None, -7, -7, None, None, None, -7, None, -7, -7, None, None,
+    None, -7, -7, None, None, None, None, None, None, None, -17, None, None,
+    None, 116, None, -17, None, None, None, -17, -17, None, None, None, -17,
+    -17, None, -17, -17, -17, None, -17, None, None, -17, None, -17, None,
+    None, -17, -17, -17, None, None, None, None, -19, None, None, None, None,
+    None, -19, None, None, None, -19, -19, None, None, None, -19, -19, None,
+    -19, -19, -19, None, -19, None, None, -19, None, -19, None, None, -19, -19,
+    -19, None, None, -6, None, None, -6, -6, None, None, -6, None, None, -6,
+    -6, None, None, None, -6, -6, None, -6, -6, None, None, None, -6, None, -6,
+    -6, None, None, None, -6, -6, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    117, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, 35, None, None, None, None, None, 33, None, None, None, 25, 37, None,
+    None, None, 20, 29, None, 19, 34, 28, None, 30, None, None, None, None, 27,
+    None, None, 36, 32, 26, None, None, None, None, 35, None, None, None, None,
+    None, 33, None, None, None, 25, 37, None, None, None, 20, 29, None, 19, 34,
+    28, None, 30, None, None, 119, None, 27, None, None, 36, 32, 26, None,
+    None, None, None, -18, None, None, None, None, None, -18, None, None, None,
+    -18, -18, None, None, None, -18, -18, None, -18, -18, -18, None, -18, None,
+    None, -18, None, -18, None, None, -18, -18, -18, None,
+)
+# fmt: on
+
+
+# state * NONTERMINAL_COUNT + nonterminal
+# fmt: off
+GOTO = (
+    None, None, None, None, None, 3, 2, None, 1, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 5, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None, 11,
+    9, None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 18, None, None,
+    None, None, None, None, None, None, None, None, 24, None, None, None, None,
+    31, None, 22, 21, 23, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, 24, None, None, None, None, 31, None, 22, 38,
+    23, None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, 41, None, None, None, None, 31, None, None, None, 42, None,
+    None, 24, None, None, None, None, 31, None, 45, None, 23, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, 62, None,
+    None, None, None, 31, None, None, None, 42, None, None, 64, None, None,
+    None, None, 31, None, None, None, 42, None, None, 65, None, None, None,
+    None, 31, None, None, None, 42, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, 24, None, None, None, None, 31,
+    None, 45, None, 23, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, 69, 71, None, None, None, None, 31, None, None,
+    None, 42, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, 74, None, None, None, None, 31, None, None, None, 42,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, 75, None, None, None, None, 31, None, None, None, 42, None,
+    None, 76, None, None, None, None, 31, None, None, None, 42, None, None, 77,
+    None, None, None, None, 31, None, None, None, 42, None, None, 78, None,
+    None, None, None, 31, None, None, None, 42, None, None, 79, None, None,
+    None, None, 31, None, None, None, 42, None, None, 80, None, None, None,
+    None, 31, None, None, None, 42, None, None, 81, None, None, None, None, 31,
+    None, None, None, 42, None, None, 82, None, None, None, None, 31, None,
+    None, None, 42, None, None, 83, None, None, None, None, 31, None, None,
+    None, 42, None, None, 84, None, None, None, None, 31, None, None, None, 42,
+    None, None, 85, None, None, None, None, 31, None, None, None, 42, None,
+    None, 86, None, None, None, None, 31, None, None, None, 42, None, None, 87,
+    None, None, None, None, 31, None, None, None, 42, None, None, 88, None,
+    None, None, None, 31, None, None, None, 42, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, 11, 90, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, 101, 71, None, None, None, None,
+    31, None, None, None, 42, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, 103, None, None, None, None, 31, None,
+    None, None, 42, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, 24, None, None, None, None, 31, None, 22, 107, 23,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, 24, None, None, None, None, 31, None, 22, 109, 23, None, None,
+    24, None, None, None, None, 31, None, 22, 110, 23, None, None, 24, None,
+    None, None, None, 31, None, 22, 111, 23, None, None, 24, None, None, None,
+    None, 31, None, 45, None, 23, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, 24, None, None, None, None, 31,
+    None, 45, None, 23, None, None, 24, None, None, None, None, 31, None, 45,
+    None, 23, None, None, 24, None, None, None, None, 31, None, 45, None, 23,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, 24, None, None, None, None, 31, None, 22, 118, 23, None, None,
+    24, None, None, None, None, 31, None, 45, None, 23, None, None, None, None,
+    None, None, None, None, None, None, None, None,
+)
+# fmt: on
+
+
+# Reductions made without reading a token
+# fmt: off
+DEFAULTED = (
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+    None, None, None, None, None, None, None, None, None, None, None, None,
+)
+# fmt: on
+
+
+class Symbol:
+    """A nonterminal that its rule gave a position."""
+
+    __slots__ = ("value", "lineno", "lexpos")
+
+    def __init__(self, value, lineno, lexpos):
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+
+new = object.__new__
+
+
+def new_AssignmentNode(elem_type, position, name, expression):
+    node = new(AssignmentNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.name = name
+    node.expression = expression
+    return node
+
+
+def new_BinaryNode(elem_type, position, op1, op2):
+    node = new(BinaryNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.op1 = op1
+    node.op2 = op2
+    return node
+
+
+def new_EmptyNode(elem_type, position):
+    node = new(EmptyNode)
+    node.elem_type = elem_type
+    node.position = position
+    return node
+
+
+def new_FuncNode(elem_type, position, name, args, statements):
+    node = new(FuncNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.name = name
+    node.args = args
+    node.statements = statements
+    return node
+
+
+def new_FunctionCallNode(elem_type, position, name, args):
+    node = new(FunctionCallNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.name = name
+    node.args = args
+    return node
+
+
+def new_IfNode(elem_type, position, condition, statements, else_statements):
+    node = new(IfNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.condition = condition
+    node.statements = statements
+    node.else_statements = else_statements
+    return node
+
+
+def new_LambdaNode(elem_type, position, args, statements):
+    node = new(LambdaNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.args = args
+    node.statements = statements
+    return node
+
+
+def new_MethodCallNode(elem_type, position, objref, name, args):
+    node = new(MethodCallNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.objref = objref
+    node.name = name
+    node.args = args
+    return node
+
+
+def new_NameNode(elem_type, position, name):
+    node = new(NameNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.name = name
+    return node
+
+
+def new_ProgramNode(elem_type, position, functions):
+    node = new(ProgramNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.functions = functions
+    return node
+
+
+def new_ReturnNode(elem_type, position, expression):
+    node = new(ReturnNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.expression = expression
+    return node
+
+
+def new_UnaryNode(elem_type, position, op1):
+    node = new(UnaryNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.op1 = op1
+    return node
+
+
+def new_ValueNode(elem_type, position, val):
+    node = new(ValueNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.val = val
+    return node
+
+
+def new_WhileNode(elem_type, position, condition, statements):
+    node = new(WhileNode)
+    node.elem_type = elem_type
+    node.position = position
+    node.condition = condition
+    node.statements = statements
+    return node
+
+
+# program -> funcs
+def reduce_1(lexdata, p1):
+    result = new_ProgramNode(InterpreterBase.PROGRAM_DEF, None, p1)
+    return result
+
+
+# funcs -> funcs func
+def reduce_2(lexdata, p1, p2):
+    result = p1
+    result.append(p2)
+    return result
+
+
+# funcs -> func
+def reduce_3(lexdata, p1):
+    result = [p1]
+    return result
+
+
+# func -> FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
+def reduce_4(lexdata, p1, p2, p3, p4, p5, p6, p7, p8):
+    result = new_FuncNode(
+        InterpreterBase.FUNC_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p2.value,
+        p4,
+        p7,
+    )
+    return result
+
+
+# func -> FUNC NAME LPAREN RPAREN LBRACE statements RBRACE
+def reduce_5(lexdata, p1, p2, p3, p4, p5, p6, p7):
+    result = new_FuncNode(
+        InterpreterBase.FUNC_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p2.value,
+        [],
+        p6,
+    )
+    return result
+
+
+# lambda -> LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE
+def reduce_6(lexdata, p1, p2, p3, p4, p5, p6, p7):
+    result = new_LambdaNode(
+        InterpreterBase.LAMBDA_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p3,
+        p6,
+    )
+    return result
+
+
+# lambda -> LAMBDA LPAREN RPAREN LBRACE statements RBRACE
+def reduce_7(lexdata, p1, p2, p3, p4, p5, p6):
+    result = new_LambdaNode(
+        InterpreterBase.LAMBDA_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        [],
+        p5,
+    )
+    return result
+
+
+# formal_args -> formal_args COMMA formal_arg
+def reduce_8(lexdata, p1, p2, p3):
+    result = p1
+    result.append(p3)
+    return result
+
+
+# formal_args -> formal_arg
+def reduce_9(lexdata, p1):
+    result = [p1]
+    return result
+
+
+# formal_arg -> NAME
+def reduce_10(lexdata, p1):
+    result = new_NameNode(
+        InterpreterBase.ARG_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p1.value
+    )
+    return result
+
+
+# formal_arg -> REF NAME
+def reduce_11(lexdata, p1, p2):
+    result = new_NameNode(
+        InterpreterBase.REFARG_DEF,
+        token_position(lexdata, p2.lineno, p2.lexpos),
+        p2.value,
+    )
+    return result
+
+
+# statements -> statements statement
+def reduce_12(lexdata, p1, p2):
+    result = p1
+    result.append(p2)
+    return result
+
+
+# statements -> statement
+def reduce_13(lexdata, p1):
+    result = [p1]
+    return result
+
+
+# statement -> variable ASSIGN expression SEMI
+def reduce_14(lexdata, p1, p2, p3, p4):
+    result = new_AssignmentNode(
+        "=", token_position(lexdata, p1.lineno, p1.lexpos), p1.value, p3
+    )
+    return result
+
+
+# variable -> NAME DOT NAME
+def reduce_15(lexdata, p1, p2, p3):
+    result = p1.value + "." + p3.value
+    lineno = p1.lineno
+    lexpos = p1.lexpos
+    return Symbol(result, lineno, lexpos)
+
+
+# variable -> NAME
+def reduce_16(lexdata, p1):
+    result = p1.value
+    lineno = p1.lineno
+    lexpos = p1.lexpos
+    return Symbol(result, lineno, lexpos)
+
+
+# statement -> IF LPAREN expression RPAREN LBRACE statements RBRACE
+def reduce_17(lexdata, p1, p2, p3, p4, p5, p6, p7):
+    result = new_IfNode(
+        InterpreterBase.IF_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p3,
+        p6,
+        None,
+    )
+    return result
+
+
+# statement -> IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
+def reduce_18(lexdata, p1, p2, p3, p4, p5, p6, p7, p8, p9, p10, p11):
+    result = new_IfNode(
+        InterpreterBase.IF_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p3,
+        p6,
+        p10,
+    )
+    return result
+
+
+# statement -> WHILE LPAREN expression RPAREN LBRACE statements RBRACE
+def reduce_19(lexdata, p1, p2, p3, p4, p5, p6, p7):
+    result = new_WhileNode(
+        InterpreterBase.WHILE_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p3, p6
+    )
+    return result
+
+
+# statement -> expression SEMI
+def reduce_20(lexdata, p1, p2):
+    result = p1
+    return result
+
+
+# statement -> RETURN expression SEMI
+def reduce_21(lexdata, p1, p2, p3):
+    expr = p2
+    result = new_ReturnNode(
+        InterpreterBase.RETURN_DEF, token_position(lexdata, p1.lineno, p1.lexpos), expr
+    )
+    return result
+
+
+# statement -> RETURN SEMI
+def reduce_22(lexdata, p1, p2):
+    expr = None
+    result = new_ReturnNode(
+        InterpreterBase.RETURN_DEF, token_position(lexdata, p1.lineno, p1.lexpos), expr
+    )
+    return result
+
+
+# expression -> NOT expression
+def reduce_23(lexdata, p1, p2):
+    result = new_UnaryNode(
+        InterpreterBase.NOT_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p2
+    )
+    return result
+
+
+# expression -> MINUS expression
+def reduce_24(lexdata, p1, p2):
+    result = new_UnaryNode(
+        InterpreterBase.NEG_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p2
+    )
+    return result
+
+
+# expression -> expression EQ expression
+def reduce_25(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression GREATER expression
+def reduce_26(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression LESS expression
+def reduce_27(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression NOT_EQ expression
+def reduce_28(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression GREATER_EQ expression
+def reduce_29(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression LESS_EQ expression
+def reduce_30(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression PLUS expression
+def reduce_31(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression MINUS expression
+def reduce_32(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression MULTIPLY expression
+def reduce_33(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression DIVIDE expression
+def reduce_34(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> LPAREN expression RPAREN
+def reduce_35(lexdata, p1, p2, p3):
+    result = p2
+    return result
+
+
+# expression -> expression OR expression
+def reduce_36(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> expression AND expression
+def reduce_37(lexdata, p1, p2, p3):
+    result = new_BinaryNode(
+        p2.value, token_position(lexdata, p2.lineno, p2.lexpos), p1, p3
+    )
+    return result
+
+
+# expression -> NUMBER
+def reduce_38(lexdata, p1):
+    result = new_ValueNode(
+        InterpreterBase.INT_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p1.value
+    )
+    return result
+
+
+# expression -> lambda
+def reduce_39(lexdata, p1):
+    result = p1
+    return result
+
+
+# expression -> TRUE
+def reduce_40(lexdata, p1):
+    bool_val = p1.value == InterpreterBase.TRUE_DEF
+    result = new_ValueNode(
+        InterpreterBase.BOOL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        bool_val,
+    )
+    return result
+
+
+# expression -> FALSE
+def reduce_41(lexdata, p1):
+    bool_val = p1.value == InterpreterBase.TRUE_DEF
+    result = new_ValueNode(
+        InterpreterBase.BOOL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        bool_val,
+    )
+    return result
+
+
+# expression -> NIL
+def reduce_42(lexdata, p1):
+    result = new_EmptyNode(
+        InterpreterBase.NIL_DEF, token_position(lexdata, p1.lineno, p1.lexpos)
+    )
+    return result
+
+
+# expression -> AT
+def reduce_43(lexdata, p1):
+    result = new_EmptyNode(
+        InterpreterBase.OBJ_DEF, token_position(lexdata, p1.lineno, p1.lexpos)
+    )
+    return result
+
+
+# expression -> STRING
+def reduce_44(lexdata, p1):
+    result = new_ValueNode(
+        InterpreterBase.STRING_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p1.value,
+    )
+    return result
+
+
+# expression -> variable
+def reduce_45(lexdata, p1):
+    result = new_NameNode(
+        InterpreterBase.VAR_DEF, token_position(lexdata, p1.lineno, p1.lexpos), p1.value
+    )
+    return result
+
+
+# expression -> NAME LPAREN args RPAREN
+def reduce_46(lexdata, p1, p2, p3, p4):
+    result = new_FunctionCallNode(
+        InterpreterBase.FCALL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p1.value,
+        p3,
+    )
+    return result
+
+
+# expression -> NAME LPAREN RPAREN
+def reduce_47(lexdata, p1, p2, p3):
+    result = new_FunctionCallNode(
+        InterpreterBase.FCALL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p1.value,
+        [],
+    )
+    return result
+
+
+# expression -> NAME DOT NAME LPAREN args RPAREN
+def reduce_48(lexdata, p1, p2, p3, p4, p5, p6):
+    result = new_MethodCallNode(
+        InterpreterBase.MCALL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p1.value,
+        p3.value,
+        p5,
+    )
+    return result
+
+
+# expression -> NAME DOT NAME LPAREN RPAREN
+def reduce_49(lexdata, p1, p2, p3, p4, p5):
+    result = new_MethodCallNode(
+        InterpreterBase.MCALL_DEF,
+        token_position(lexdata, p1.lineno, p1.lexpos),
+        p1.value,
+        p3.value,
+        [],
+    )
+    return result
+
+
+# args -> args COMMA expression
+def reduce_50(lexdata, p1, p2, p3):
+    result = p1
+    result.append(p3)
+    return result
+
+
+# args -> expression
+def reduce_51(lexdata, p1):
+    result = [p1]
+    return result
+
+
+# production: (reduction, length, nonterminal)
+REDUCTIONS = (
+    None,
+    (reduce_1, 1, 8),
+    (reduce_2, 2, 6),
+    (reduce_3, 1, 6),
+    (reduce_4, 8, 5),
+    (reduce_5, 7, 5),
+    (reduce_6, 7, 7),
+    (reduce_7, 6, 7),
+    (reduce_8, 3, 4),
+    (reduce_9, 1, 4),
+    (reduce_10, 1, 3),
+    (reduce_11, 2, 3),
+    (reduce_12, 2, 10),
+    (reduce_13, 1, 10),
+    (reduce_14, 4, 9),
+    (reduce_15, 3, 11),
+    (reduce_16, 1, 11),
+    (reduce_17, 7, 9),
+    (reduce_18, 11, 9),
+    (reduce_19, 7, 9),
+    (reduce_20, 2, 9),
+    (reduce_21, 3, 9),
+    (reduce_22, 2, 9),
+    (reduce_23, 2, 2),
+    (reduce_24, 2, 2),
+    (reduce_25, 3, 2),
+    (reduce_26, 3, 2),
+    (reduce_27, 3, 2),
+    (reduce_28, 3, 2),
+    (reduce_29, 3, 2),
+    (reduce_30, 3, 2),
+    (reduce_31, 3, 2),
+    (reduce_32, 3, 2),
+    (reduce_33, 3, 2),
+    (reduce_34, 3, 2),
+    (reduce_35, 3, 2),
+    (reduce_36, 3, 2),
+    (reduce_37, 3, 2),
+    (reduce_38, 1, 2),
+    (reduce_39, 1, 2),
+    (reduce_40, 1, 2),
+    (reduce_41, 1, 2),
+    (reduce_42, 1, 2),
+    (reduce_43, 1, 2),
+    (reduce_44, 1, 2),
+    (reduce_45, 1, 2),
+    (reduce_46, 4, 2),
+    (reduce_47, 3, 2),
+    (reduce_48, 6, 2),
+    (reduce_49, 5, 2),
+    (reduce_50, 3, 1),
+    (reduce_51, 1, 1),
+)
+
+
+def parse(data, lexer, errorfunc):
+    """Parses data with tokens from lexer, like PLY's LRParser.parse.
+
+    errorfunc is called with the offending token (None at the end of the
+    input) for every syntax error outside the recovery window, as PLY's
+    p_error would be. Returns None if the input cannot be parsed.
+    """
+    action = ACTION
+    goto = GOTO
+    defaulted = DEFAULTED
+    reductions = REDUCTIONS
+    terminals = TERMINALS
+    lexer.input(data)
+    get_token = lexer.token
+    statestack = [0]
+    symstack = []
+    state = 0
+    token = None
+    column = None
+    errorcount = 0
+    while True:
+        t = defaulted[state]
+        if t is None:
+            if column is None:
+                token = get_token()
+                if token is None:
+                    column = END
+                else:
+                    column = terminals.get(token.type, UNKNOWN)
+            t = action[state * WIDTH + column]
+            if t is None:
+                if not errorcount:
+                    if column == END:
+                        errorfunc(None)
+                    else:
+                        if not hasattr(token, "lexer"):
+                            token.lexer = lexer
+                        errorfunc(token)
+                errorcount = 3
+                if column == END:
+                    return None
+                # Nothing can shift the error token, so PLY unwinds the
+                # whole stack and drops the token
+                del statestack[1:]
+                del symstack[:]
+                state = 0
+                column = None
+                continue
+        if t > 0:
+            statestack.append(t)
+            symstack.append(token)
+            state = t
+            column = None
+            if errorcount:
+                errorcount -= 1
+        elif t < 0:
+            reduction, length, nonterminal = reductions[-t]
+            value = reduction(data, *symstack[-length:])
+            del symstack[-length:]
+            del statestack[-length:]
+            symstack.append(value)
+            state = goto[statestack[-1] * NONTERMINAL_COUNT + nonterminal]
+            statestack.append(state)
+        else:
+            return symstack[-1]
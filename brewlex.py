@@ -1,4 +1,6 @@
-from ply import lex
+import sys
+
+import brewtables
 
 reserved = (
     "FUNC",
@@ -123,8 +125,11 @@ def t_STRING(t):
 
 def t_error(t):
     print(f"Illegal character {t.value[0]}")
+    t.lexer.illegal_characters += 1
     t.lexer.skip(1)
 
 
-# Build the lexer
-lex.lex()
+# Build the lexer, loading its tables from the cache when possible
+lexer = brewtables.lexer(sys.modules[__name__])
+# Counted by t_error, so a parser can tell the input was not clean
+lexer.illegal_characters = 0
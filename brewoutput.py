@@ -0,0 +1,95 @@
+import hashlib
+import sys
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class OutputSink(ABC):
+    """Receives every line an interpreter outputs in place of output_log.
+
+    Pass one as output_sink to an Interpreter; console_output and
+    output_log are then bypassed entirely. Sinks that hold back output
+    are flushed by flush() or by leaving a with block.
+    """
+
+    @abstractmethod
+    def write(self, value):
+        pass
+
+    def flush(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+
+class BufferedSink(OutputSink):
+    """Writes lines to a stream in blocks rather than one print per line."""
+
+    def __init__(self, stream=None, block_lines=4096):
+        self.stream = stream if stream is not None else sys.stdout
+        self.block_lines = block_lines
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(str(value))
+        if len(self.lines) >= self.block_lines:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.lines.append("")
+            self.stream.write("\n".join(self.lines))
+            self.lines = []
+        self.stream.flush()
+
+
+class RingBufferSink(OutputSink):
+    """Keeps only the last max_lines lines, plus a count of all of them."""
+
+    def __init__(self, max_lines=1000):
+        self.lines = deque(maxlen=max_lines)
+        self.line_count = 0
+
+    def write(self, value):
+        self.lines.append(value)
+        self.line_count += 1
+
+
+class CallbackSink(OutputSink):
+    """Hands each line to callback as soon as it is output."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, value):
+        self.callback(value)
+
+
+class HashingSink(OutputSink):
+    """Keeps a running digest of the output instead of the output itself.
+
+    Each line is hashed as str(line) followed by a newline, so the digest
+    matches digest_lines() of the expected lines.
+    """
+
+    def __init__(self, algorithm="sha256"):
+        self.hash = hashlib.new(algorithm)
+        self.line_count = 0
+
+    def write(self, value):
+        self.hash.update(f"{value}\n".encode())
+        self.line_count += 1
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def digest_lines(lines, algorithm="sha256"):
+    sink = HashingSink(algorithm)
+    for line in lines:
+        sink.write(line)
+    return sink.hexdigest()
@@ -1,7 +1,29 @@
-from element import Element
+import sys
+import threading
+from copy import copy
+
+import brewlex
+import brewtables
+import element
+from element import (
+    token_position,
+    AssignmentNode,
+    BinaryNode,
+    EmptyNode,
+    FuncNode,
+    FunctionCallNode,
+    IfNode,
+    LambdaNode,
+    MethodCallNode,
+    NameNode,
+    ProgramNode,
+    ReturnNode,
+    UnaryNode,
+    ValueNode,
+    WhileNode,
+)
 from brewlex import *
 from intbase import InterpreterBase
-from ply import yacc
 
 # Parsing rules
 
@@ -15,6 +37,11 @@ precedence = (
 )
 
 
+def position(p, index):
+    # Line and column of the p[index] token
+    return token_position(p.lexer.lexdata, p.lineno(index), p.lexpos(index))
+
+
 def collapse_items(p, group_index, singleton_index):
     if len(p) == 2:
         p[0] = [p[1]]
@@ -25,7 +52,7 @@ def collapse_items(p, group_index, singleton_index):
 
 def p_program(p):
     "program : funcs"
-    p[0] = Element(InterpreterBase.PROGRAM_DEF, functions=p[1])
+    p[0] = ProgramNode(InterpreterBase.PROGRAM_DEF, functions=p[1])
 
 
 def p_funcs(p):
@@ -38,18 +65,34 @@ def p_func(p):
     """func : FUNC NAME LPAREN formal_args RPAREN LBRACE statements RBRACE
     | FUNC NAME LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 9:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=p[4], statements=p[7])
+        p[0] = FuncNode(
+            InterpreterBase.FUNC_DEF,
+            position(p, 1),
+            name=p[2],
+            args=p[4],
+            statements=p[7],
+        )
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.FUNC_DEF, name=p[2], args=[], statements=p[6])
+        p[0] = FuncNode(
+            InterpreterBase.FUNC_DEF,
+            position(p, 1),
+            name=p[2],
+            args=[],
+            statements=p[6],
+        )
 
 
 def p_lambda(p):
     """lambda : LAMBDA LPAREN formal_args RPAREN LBRACE statements RBRACE
     | LAMBDA LPAREN RPAREN LBRACE statements RBRACE"""
     if len(p) == 8:  # handle with 1+ formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=p[3], statements=p[6])
+        p[0] = LambdaNode(
+            InterpreterBase.LAMBDA_DEF, position(p, 1), args=p[3], statements=p[6]
+        )
     else:  # handle no formal args
-        p[0] = Element(InterpreterBase.LAMBDA_DEF, args=[], statements=p[5])
+        p[0] = LambdaNode(
+            InterpreterBase.LAMBDA_DEF, position(p, 1), args=[], statements=p[5]
+        )
 
 
 def p_formal_args(p):
@@ -60,12 +103,12 @@ def p_formal_args(p):
 
 def p_formal_arg(p):
     "formal_arg : NAME"
-    p[0] = Element(InterpreterBase.ARG_DEF, name=p[1])
+    p[0] = NameNode(InterpreterBase.ARG_DEF, position(p, 1), name=p[1])
 
 
 def p_formal_ref_arg(p):
     "formal_arg : REF NAME"
-    p[0] = Element(InterpreterBase.REFARG_DEF, name=p[2])
+    p[0] = NameNode(InterpreterBase.REFARG_DEF, position(p, 2), name=p[2])
 
 
 def p_statements(p):
@@ -76,7 +119,7 @@ def p_statements(p):
 
 def p_statement___assign(p):
     "statement : variable ASSIGN expression SEMI"
-    p[0] = Element("=", name=p[1], expression=p[3])
+    p[0] = AssignmentNode("=", position(p, 1), name=p[1], expression=p[3])
 
 
 def p_variable(p):
@@ -86,6 +129,9 @@ def p_variable(p):
         p[0] = p[1] + "." + p[3]
     else:
         p[0] = p[1]
+    # Nonterminals carry no position unless one is set on them
+    p.set_lineno(0, p.lineno(1))
+    p.set_lexpos(0, p.lexpos(1))
 
 
 def p_statement_if(p):
@@ -93,15 +139,17 @@ def p_statement_if(p):
     | IF LPAREN expression RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
     """
     if len(p) == 8:
-        p[0] = Element(
+        p[0] = IfNode(
             InterpreterBase.IF_DEF,
+            position(p, 1),
             condition=p[3],
             statements=p[6],
             else_statements=None,
         )
     else:
-        p[0] = Element(
+        p[0] = IfNode(
             InterpreterBase.IF_DEF,
+            position(p, 1),
             condition=p[3],
             statements=p[6],
             else_statements=p[10],
@@ -110,7 +158,9 @@ def p_statement_if(p):
 
 def p_statement_while(p):
     "statement : WHILE LPAREN expression RPAREN LBRACE statements RBRACE"
-    p[0] = Element(InterpreterBase.WHILE_DEF, condition=p[3], statements=p[6])
+    p[0] = WhileNode(
+        InterpreterBase.WHILE_DEF, position(p, 1), condition=p[3], statements=p[6]
+    )
 
 
 def p_statement_expr(p):
@@ -125,17 +175,17 @@ def p_statement_return(p):
         expr = p[2]
     else:
         expr = None
-    p[0] = Element(InterpreterBase.RETURN_DEF, expression=expr)
+    p[0] = ReturnNode(InterpreterBase.RETURN_DEF, position(p, 1), expression=expr)
 
 
 def p_expression_not(p):
     "expression : NOT expression"
-    p[0] = Element(InterpreterBase.NOT_DEF, op1=p[2])
+    p[0] = UnaryNode(InterpreterBase.NOT_DEF, position(p, 1), op1=p[2])
 
 
 def p_expression_uminus(p):
     "expression : MINUS expression %prec UMINUS"
-    p[0] = Element(InterpreterBase.NEG_DEF, op1=p[2])
+    p[0] = UnaryNode(InterpreterBase.NEG_DEF, position(p, 1), op1=p[2])
 
 
 def p_arith_expression_binop(p):
@@ -149,7 +199,7 @@ def p_arith_expression_binop(p):
     | expression MINUS expression
     | expression MULTIPLY expression
     | expression DIVIDE expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinaryNode(p[2], position(p, 2), op1=p[1], op2=p[3])
 
 
 def p_expression_group(p):
@@ -160,12 +210,12 @@ def p_expression_group(p):
 def p_expression_and_or(p):
     """expression : expression OR expression
     | expression AND expression"""
-    p[0] = Element(p[2], op1=p[1], op2=p[3])
+    p[0] = BinaryNode(p[2], position(p, 2), op1=p[1], op2=p[3])
 
 
 def p_expression_number(p):
     "expression : NUMBER"
-    p[0] = Element(InterpreterBase.INT_DEF, val=p[1])
+    p[0] = ValueNode(InterpreterBase.INT_DEF, position(p, 1), val=p[1])
 
 
 def p_expression_lambda(p):
@@ -177,47 +227,55 @@ def p_expression_bool(p):
     """expression : TRUE
     | FALSE"""
     bool_val = p[1] == InterpreterBase.TRUE_DEF
-    p[0] = Element(InterpreterBase.BOOL_DEF, val=bool_val)
+    p[0] = ValueNode(InterpreterBase.BOOL_DEF, position(p, 1), val=bool_val)
 
 
 def p_expression_nil(p):
     "expression : NIL"
-    p[0] = Element(InterpreterBase.NIL_DEF)
+    p[0] = EmptyNode(InterpreterBase.NIL_DEF, position(p, 1))
 
 
 def p_expression_obj(
     p,
 ):  # e.g. a = @;   ### creates a new dictionary/object and stores in a
     "expression : AT"
-    p[0] = Element(InterpreterBase.OBJ_DEF)
+    p[0] = EmptyNode(InterpreterBase.OBJ_DEF, position(p, 1))
 
 
 def p_expression_string(p):
     "expression : STRING"
-    p[0] = Element(InterpreterBase.STRING_DEF, val=p[1])
+    p[0] = ValueNode(InterpreterBase.STRING_DEF, position(p, 1), val=p[1])
 
 
 def p_expression_variable(p):
     "expression : variable"
-    p[0] = Element(InterpreterBase.VAR_DEF, name=p[1])
+    p[0] = NameNode(InterpreterBase.VAR_DEF, position(p, 1), name=p[1])
 
 
 def p_func_call(p):
     """expression : NAME LPAREN args RPAREN
     | NAME LPAREN RPAREN"""
     if len(p) == 5:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=p[3])
+        p[0] = FunctionCallNode(
+            InterpreterBase.FCALL_DEF, position(p, 1), name=p[1], args=p[3]
+        )
     else:
-        p[0] = Element(InterpreterBase.FCALL_DEF, name=p[1], args=[])
+        p[0] = FunctionCallNode(
+            InterpreterBase.FCALL_DEF, position(p, 1), name=p[1], args=[]
+        )
 
 
 def p_method_call(p):
     """expression : NAME DOT NAME LPAREN args RPAREN
     | NAME DOT NAME LPAREN RPAREN"""
     if len(p) == 7:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=p[5])
+        p[0] = MethodCallNode(
+            InterpreterBase.MCALL_DEF, position(p, 1), objref=p[1], name=p[3], args=p[5]
+        )
     else:
-        p[0] = Element(InterpreterBase.MCALL_DEF, objref=p[1], name=p[3], args=[])
+        p[0] = MethodCallNode(
+            InterpreterBase.MCALL_DEF, position(p, 1), objref=p[1], name=p[3], args=[]
+        )
 
 
 def p_expression_args(p):
@@ -226,20 +284,96 @@ def p_expression_args(p):
     collapse_items(p, 1, 3)
 
 
-def p_error(p):
+def syntax_error_message(p):
     if p:
-        print(f"Syntax error at '{p.value}'")
-    else:
-        print("Syntax error at EOF")
+        return f"Syntax error at '{p.value}'"
+    return "Syntax error at EOF"
+
+
+def p_error(p):
+    print(syntax_error_message(p))
+
+
+class Parser:
+    """Parses programs using its own lexer and LR parser instances.
+
+    PLY keeps the state of a parse on the lexer and parser objects, so a
+    thread must not share them with another. A Parser clones both from the
+    module's prebuilt instances, which only copies references to their
+    tables. A single Parser is still meant for one thread at a time.
+
+    Any object with the PLY lexer interface can stand in for the lexer,
+    such as a brewscan.TableLexer. Parses go through the parser generated
+    by brewgen when it is up to date with this grammar, and through PLY
+    otherwise or when generated is False; both build the same trees.
+    """
+
+    def __init__(self, lexer=None, generated=True):
+        self.lexer = lexer if lexer is not None else brewlex.lexer.clone()
+        self.parser = copy(parser)
+        self.parser.errorfunc = self.error
+        self.generated = generated
+        # Messages reported while parsing the most recent program
+        self.syntax_errors = []
+        self.illegal_characters = 0
+
+    def error(self, p):
+        message = syntax_error_message(p)
+        self.syntax_errors.append(message)
+        print(message)
+
+    def parse(self, program, lineno=1):
+        # lineno is the line program starts on, for parsing part of a file
+        self.syntax_errors = []
+        self.lexer.lineno = lineno
+        self.lexer.illegal_characters = 0
+        generated_parse = generated_parser() if self.generated else None
+        if generated_parse is not None:
+            ast = generated_parse(program, self.lexer, self.error)
+        else:
+            ast = self.parser.parse(program, lexer=self.lexer)
+        self.illegal_characters = self.lexer.illegal_characters
+        if ast is None:
+            raise SyntaxError("Syntax error")
+        return ast
+
+
+generated_parsers = []
+
+
+def generated_parser():
+    """Returns the generated parse function, or None if it is missing or stale."""
+    if not generated_parsers:
+        try:
+            import brewlalr
+
+            current = brewlalr.GRAMMAR_KEY == grammar_key
+        except (ImportError, AttributeError):
+            current = False
+        generated_parsers.append(brewlalr.parse if current else None)
+    return generated_parsers[0]
+
+
+thread_parsers = threading.local()
+
+
+def thread_parser():
+    """Returns the Parser owned by the calling thread."""
+    if not hasattr(thread_parsers, "parser"):
+        thread_parsers.parser = Parser()
+    return thread_parsers.parser
 
 
 # exported function
-def parse_program(program):
-    ast = yacc.parse(program)
-    if ast is None:
-        raise SyntaxError("Syntax error")
-    return ast
+def parse_program(program, lexer=None):
+    if lexer is None:
+        return thread_parser().parse(program)
+    return Parser(lexer).parse(program)
+
 
+# generate our parser, loading its tables from the cache when possible
+parser = brewtables.parser(sys.modules[__name__])
 
-# generate our parser
-yacc.yacc()
+# Identifies the trees this module builds: brewlalr and stored trees are only
+# used when they were made from the same rules and node classes
+grammar_key = brewtables.source_key(sys.modules[__name__], element)
@@ -0,0 +1,106 @@
+import time
+
+
+class FunctionProfile:
+    __slots__ = (
+        "label",
+        "calls",
+        "inclusive_time",
+        "exclusive_time",
+        "allocations",
+        "inclusive_allocations",
+        "active",
+    )
+
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+        self.inclusive_time = 0.0
+        self.exclusive_time = 0.0
+        # Objects and closures created while this function was innermost
+        self.allocations = 0
+        self.inclusive_allocations = 0
+        # Calls currently running, so recursion is not counted twice
+        self.active = 0
+
+
+class Profiler:
+    """Collects per-function call counts, wall time and allocations.
+
+    Named functions are keyed by name and arity, closures by the lambda
+    they were made from. Inclusive figures cover callees too, counted once
+    however deep a function recurses; exclusive ones do not.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.profiles = {}
+        self.lambdas = []
+        self.stack = []
+        self.allocation_count = 0
+
+    def profile(self, function_def):
+        if function_def.elem_type == "closure":
+            statements = function_def.get("statements")
+            # Closures that deep-copy their body carry the id of the lambda
+            # they came from instead
+            key = function_def.get("lambda_id") or id(statements)
+            if key not in self.profiles:
+                # Keeps the lambda alive so its id is never reused
+                self.lambdas.append(statements)
+                label = f"lambda#{len(self.lambdas)}/{len(function_def.get('args'))}"
+                self.profiles[key] = FunctionProfile(label)
+        else:
+            key = (function_def.get("name"), len(function_def.get("args")))
+            if key not in self.profiles:
+                self.profiles[key] = FunctionProfile(f"{key[0]}/{key[1]}")
+        return self.profiles[key]
+
+    def enter(self, function_def):
+        profile = self.profile(function_def)
+        profile.calls += 1
+        profile.active += 1
+        # profile, start time, callee time, allocations at start, callee
+        # allocations
+        self.stack.append([profile, self.clock(), 0.0, self.allocation_count, 0])
+
+    def exit(self):
+        (
+            profile,
+            start,
+            callee_time,
+            allocation_start,
+            callee_allocations,
+        ) = self.stack.pop()
+        elapsed = self.clock() - start
+        allocations = self.allocation_count - allocation_start
+        profile.exclusive_time += elapsed - callee_time
+        profile.allocations += allocations - callee_allocations
+        profile.active -= 1
+        if not profile.active:
+            profile.inclusive_time += elapsed
+            profile.inclusive_allocations += allocations
+        if self.stack:
+            self.stack[-1][2] += elapsed
+            self.stack[-1][4] += allocations
+
+    def allocate(self):
+        self.allocation_count += 1
+
+    def rows(self, sort="inclusive_time"):
+        return sorted(
+            self.profiles.values(), key=lambda row: getattr(row, sort), reverse=True
+        )
+
+    def report(self, sort="inclusive_time", limit=None):
+        lines = [
+            f"{'function':<24}{'calls':>10}{'inclusive s':>14}{'exclusive s':>14}"
+            f"{'allocs':>10}{'incl allocs':>13}"
+        ]
+        for row in self.rows(sort)[:limit]:
+            lines.append(
+                f"{row.label:<24}{row.calls:>10}{row.inclusive_time:>14.6f}"
+                f"{row.exclusive_time:>14.6f}{row.allocations:>10}"
+                f"{row.inclusive_allocations:>13}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,151 @@
+from element import Element
+
+
+class Resolver:
+    """Assigns every name a program can bind or look up a fixed slot index.
+
+    Brewin is dynamically scoped, so a name cannot be tied to a particular
+    frame at parse time; instead each distinct name gets one slot and the
+    interpreter keeps a stack of live bindings per slot.
+    """
+
+    implicit_names = ("this",)
+
+    def __init__(self):
+        self.slots = {}
+        self.names = []
+        for name in self.implicit_names:
+            self.slot(name)
+
+    def slot(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.names)
+            self.names.append(name)
+        return self.slots[name]
+
+    def resolve(self, element):
+        for key, value in element.items():
+            if key in {"name", "objref"} and isinstance(value, str):
+                self.slot(value)
+                # Dotted names also bind the object variable itself
+                if "." in value:
+                    self.slot(value.split(".")[0])
+            elif isinstance(value, Element):
+                self.resolve(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Element):
+                        self.resolve(item)
+
+
+class NameUsage:
+    """Works out which slots running a function or lambda may name.
+
+    Each body is scanned once for the slots it names and the funcs it calls
+    by name, and a call's extent follows those calls. Method calls and
+    calls through variables could reach anything, so bodies containing them
+    have no known extent. Tail calls use this to tell when a caller's
+    bindings can no longer be seen, and closures to capture only the free
+    variables their lambda may name.
+    """
+
+    def __init__(self, program, function_defs, slots, builtin_functions):
+        self.function_defs = function_defs
+        self.slots = slots
+        self.builtin_functions = builtin_functions
+        # Builtins only resolve to a variable if their name is ever bound
+        self.bound_names = set()
+        self.find_bound_names(program)
+        self.bodies = {}
+        self.extents = {}
+        self.captures = {}
+
+    def find_bound_names(self, element):
+        if element.elem_type in {"=", "arg", "refarg"}:
+            self.bound_names.add(element.get("name"))
+        for _, value in element.items():
+            if isinstance(value, Element):
+                self.find_bound_names(value)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, Element):
+                        self.find_bound_names(item)
+
+    def scan(self, statements):
+        # Returns (named slots, statically called funcs), or None when the
+        # body may run code that cannot be known in advance
+        key = id(statements)
+        if key not in self.bodies:
+            named = set()
+            callees = []
+            pending = list(statements or [])
+            dynamic = False
+            while pending and not dynamic:
+                element = pending.pop()
+                match element.elem_type:
+                    case "mcall":
+                        dynamic = True
+                    case "fcall":
+                        dynamic = not self.add_callee(element, callees)
+                for name_key in ("name", "objref"):
+                    name = element.get(name_key)
+                    if isinstance(name, str):
+                        named.add(self.slots[name])
+                        if "." in name:
+                            named.add(self.slots[name.split(".")[0]])
+                for _, value in element.items():
+                    if isinstance(value, Element):
+                        pending.append(value)
+                    elif isinstance(value, list):
+                        pending.extend(
+                            item for item in value if isinstance(item, Element)
+                        )
+            result = None if dynamic else (named, callees)
+            self.bodies[key] = (statements, result)
+        return self.bodies[key][1]
+
+    def add_callee(self, function, callees):
+        name = function.get("name")
+        overloads = self.function_defs.get(name, {})
+        if len(function.get("args")) in overloads:
+            callees.append(overloads[len(function.get("args"))])
+            return True
+        return name in self.builtin_functions and name not in self.bound_names
+
+    def extent(self, function_def):
+        # Every slot the call may name, or None if that is unknown
+        key = id(function_def.get("statements"))
+        if key not in self.extents:
+            named = set()
+            seen = set()
+            pending = [function_def]
+            while pending:
+                callee = pending.pop()
+                statements = callee.get("statements")
+                if id(statements) in seen:
+                    continue
+                seen.add(id(statements))
+                scanned = self.scan(statements)
+                if scanned is None:
+                    named = None
+                    break
+                named |= scanned[0]
+                pending.extend(scanned[1])
+            self.extents[key] = (function_def, named)
+        return self.extents[key][1]
+
+    def captured_slots(self, lambda_def):
+        # The slots a closure made from lambda_def may name, less its own
+        # parameters, or None if it may name any slot
+        key = id(lambda_def.get("statements"))
+        if key not in self.captures:
+            extent = self.extent(lambda_def)
+            if extent is not None:
+                extent = sorted(
+                    extent.difference(
+                        self.slots[param.get("name")]
+                        for param in lambda_def.get("args")
+                    )
+                )
+            self.captures[key] = (lambda_def, extent)
+        return self.captures[key][1]
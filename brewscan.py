@@ -0,0 +1,178 @@
+import re
+from copy import copy
+
+from brewlex import reserved_map, t_NAME, t_NUMBER
+
+# How the first character of a token is handled
+IGNORE = 0
+NEWLINE = 1
+DIGIT = 2
+LETTER = 3
+SINGLE = 4
+PAIR = 5
+SLASH = 6
+QUOTE = 7
+ILLEGAL = 8
+
+# Characters that are a token on their own
+single_types = {
+    "(": "LPAREN",
+    ")": "RPAREN",
+    "{": "LBRACE",
+    "}": "RBRACE",
+    ",": "COMMA",
+    ".": "DOT",
+    ";": "SEMI",
+    "@": "AT",
+    "+": "PLUS",
+    "-": "MINUS",
+    "*": "MULTIPLY",
+}
+
+# Characters that may start a two-character operator: the second character,
+# the operator's type, and the type of the first character alone, if any
+pair_types = {
+    "=": ("=", "EQ", "ASSIGN"),
+    "!": ("=", "NOT_EQ", "NOT"),
+    ">": ("=", "GREATER_EQ", "GREATER"),
+    "<": ("=", "LESS_EQ", "LESS"),
+    "&": ("&", "AND", None),
+    "|": ("|", "OR", None),
+}
+
+character_classes = {" ": IGNORE, "\t": IGNORE, "\n": NEWLINE, "/": SLASH, '"': QUOTE}
+for character in "0123456789":
+    character_classes[character] = DIGIT
+for character in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_":
+    character_classes[character] = LETTER
+for character in single_types:
+    character_classes[character] = SINGLE
+for character in pair_types:
+    character_classes[character] = PAIR
+
+# Runs are matched with the same expressions as the PLY rules
+number_pattern = re.compile(t_NUMBER.__doc__)
+name_pattern = re.compile(t_NAME.__doc__)
+newline_pattern = re.compile(r"\n+")
+
+
+class Token:
+    """A token with the attributes the PLY parser reads from a LexToken."""
+
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __init__(self, token_type, value, lineno, lexpos):
+        self.type = token_type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __str__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+    def __repr__(self):
+        return str(self)
+
+
+class TableLexer:
+    """Tokenizes Brewin in one pass without PLY's master regex.
+
+    The first character of each token picks its handler from a table of
+    character classes, so most tokens cost a dict lookup and no callback.
+    Produces the same tokens, line numbers, positions and "Illegal
+    character" messages as the PLY lexer in brewlex, and has the parts of
+    its interface the parser uses, so it can be passed to parse_program.
+    """
+
+    def __init__(self):
+        self.lexdata = ""
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lineno = 1
+        self.illegal_characters = 0
+
+    def clone(self):
+        return copy(self)
+
+    def input(self, data):
+        if not isinstance(data, str):
+            raise ValueError("Expected a string")
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+        self.illegal_characters = 0
+
+    def token(self):
+        data = self.lexdata
+        length = self.lexlen
+        pos = self.lexpos
+        while pos < length:
+            character = data[pos]
+            kind = character_classes.get(character)
+            if kind is None:
+                # \d also matches digits outside ASCII
+                kind = DIGIT if character.isdecimal() else ILLEGAL
+
+            if kind == IGNORE:
+                pos += 1
+                continue
+            if kind == LETTER:
+                value = name_pattern.match(data, pos).group()
+                self.lexpos = pos + len(value)
+                return Token(reserved_map.get(value, "NAME"), value, self.lineno, pos)
+            if kind == SINGLE:
+                self.lexpos = pos + 1
+                return Token(single_types[character], character, self.lineno, pos)
+            if kind == NEWLINE:
+                end = newline_pattern.match(data, pos).end()
+                self.lineno += end - pos
+                pos = end
+                continue
+            if kind == DIGIT:
+                value = number_pattern.match(data, pos).group()
+                self.lexpos = pos + len(value)
+                return Token("NUMBER", int(value), self.lineno, pos)
+            if kind == PAIR:
+                second, pair_type, single_type = pair_types[character]
+                if data.startswith(second, pos + 1):
+                    self.lexpos = pos + 2
+                    return Token(pair_type, data[pos : pos + 2], self.lineno, pos)
+                if single_type is not None:
+                    self.lexpos = pos + 1
+                    return Token(single_type, character, self.lineno, pos)
+            elif kind == SLASH:
+                if data.startswith("*", pos + 1):
+                    end = data.find("*/", pos + 2)
+                    if end >= 0:
+                        self.lineno += data.count("\n", pos, end)
+                        pos = end + 2
+                        continue
+                # An unclosed comment is a division and a multiplication
+                self.lexpos = pos + 1
+                return Token("DIVIDE", character, self.lineno, pos)
+            elif kind == QUOTE:
+                end = data.find('"', pos + 1)
+                if end >= 0 and data.find("\n", pos + 1, end) < 0:
+                    self.lexpos = end + 1
+                    return Token("STRING", data[pos + 1 : end], self.lineno, pos)
+                # Without a closing quote on its line, " is a literal
+                self.lexpos = pos + 1
+                return Token(character, character, self.lineno, pos)
+
+            self.illegal(character)
+            pos += 1
+        self.lexpos = pos
+        return None
+
+    def illegal(self, character):
+        print(f"Illegal character {character}")
+        self.illegal_characters += 1
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        token = self.token()
+        if token is None:
+            raise StopIteration
+        return token
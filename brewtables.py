@@ -0,0 +1,271 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import types
+
+from ply import lex, yacc
+
+# Bump whenever the layout of the pickled tables changes
+TABLE_VERSION = 1
+
+TABLE_DIR_VARIABLE = "BREWIN_TABLE_DIR"
+
+
+def table_dir():
+    directory = os.environ.get(TABLE_DIR_VARIABLE)
+    if directory:
+        return directory
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+
+def table_path(kind, key, directory=None):
+    return os.path.join(directory or table_dir(), f"{kind}-{key}.pickle")
+
+
+def rule_functions(module, prefix):
+    # Rule functions in definition order, which is the order PLY uses
+    functions = [
+        value
+        for name, value in vars(module).items()
+        if name.startswith(prefix) and inspect.isfunction(value)
+    ]
+    functions.sort(key=lambda function: function.__code__.co_firstlineno)
+    return [(function.__name__, function.__doc__) for function in functions]
+
+
+def table_key(*parts):
+    """Hashes everything the generated tables depend on.
+
+    Only the rule names, patterns and productions go into the key, so the
+    tables survive edits to rule bodies but never outlive a grammar change
+    or a PLY upgrade.
+    """
+    digest = hashlib.sha256()
+    for part in (TABLE_VERSION, lex.__version__, lex.__tabversion__) + parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:32]
+
+
+def lexer_key(module):
+    strings = sorted(
+        (name, value)
+        for name, value in vars(module).items()
+        if name.startswith("t_") and isinstance(value, str)
+    )
+    return table_key(
+        "lex",
+        tuple(module.tokens),
+        tuple(getattr(module, "literals", "")),
+        strings,
+        rule_functions(module, "t_"),
+    )
+
+
+def parser_key(module):
+    return table_key(
+        "yacc",
+        yacc.__tabversion__,
+        getattr(module, "start", None),
+        tuple(module.tokens),
+        tuple(getattr(module, "precedence", ())),
+        rule_functions(module, "p_"),
+    )
+
+
+def source_key(*modules):
+    """Hashes the full source of modules.
+
+    Unlike the table keys this changes with any edit, rule bodies included,
+    for what is built from what the rules do rather than just the grammar.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as source_file:
+            digest.update(source_file.read())
+        digest.update(b"\0")
+    return table_key("source", digest.hexdigest())
+
+
+def read_tables(path):
+    with open(path, "rb") as table_file:
+        return pickle.load(table_file)
+
+
+def write_file(path, data):
+    # Write to a private file first so concurrent readers never see a
+    # partial file
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary_path, "wb") as output_file:
+            output_file.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        # An unwritable cache just means the next process rebuilds too
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return False
+    return True
+
+
+def write_tables(path, tables):
+    return write_file(path, pickle.dumps(tables, pickle.HIGHEST_PROTOCOL))
+
+
+def lexer_tables(lexer):
+    """Converts a built lexer into plain data (the lextab module layout)."""
+    statere = {}
+    for state, rules in lexer.lexstatere.items():
+        statere[state] = [
+            (text, lex._funcs_to_names(function, names))
+            for (_, function), text, names in zip(
+                rules, lexer.lexstateretext[state], lexer.lexstaterenames[state]
+            )
+        ]
+    return {
+        "_tabversion": lex.__tabversion__,
+        "_lextokens": tuple(sorted(lexer.lextokens)),
+        "_lexreflags": int(lexer.lexreflags),
+        "_lexliterals": lexer.lexliterals,
+        "_lexstateinfo": lexer.lexstateinfo,
+        "_lexstatere": statere,
+        "_lexstateignore": lexer.lexstateignore,
+        "_lexstateerrorf": {
+            state: function.__name__ if function else None
+            for state, function in lexer.lexstateerrorf.items()
+        },
+        "_lexstateeoff": {
+            state: function.__name__ if function else None
+            for state, function in lexer.lexstateeoff.items()
+        },
+    }
+
+
+def parser_tables(parser):
+    """Converts a built parser into plain data (the parsetab layout)."""
+    productions = []
+    for production in parser.productions:
+        if production.func:
+            productions.append(
+                (
+                    production.str,
+                    production.name,
+                    production.len,
+                    production.func,
+                    os.path.basename(production.file),
+                    production.line,
+                )
+            )
+        else:
+            productions.append(
+                (str(production), production.name, production.len, None, None, None)
+            )
+    # Sorted so the same grammar always pickles to the same bytes
+    return {
+        "action": {
+            state: dict(sorted(actions.items()))
+            for state, actions in sorted(parser.action.items())
+        },
+        "goto": {
+            state: dict(sorted(gotos.items()))
+            for state, gotos in sorted(parser.goto.items())
+        },
+        "productions": productions,
+    }
+
+
+def load_lexer(module, path):
+    lextab = types.ModuleType("lextab")
+    for name, value in read_tables(path).items():
+        setattr(lextab, name, value)
+    lextab._lextokens = set(lextab._lextokens)
+    lexer = lex.Lexer()
+    lexer.lexoptimize = True
+    lexer.readtab(lextab, vars(module))
+    return lexer
+
+
+def load_parser(module, path):
+    tables = read_tables(path)
+    table = yacc.LRTable()
+    table.lr_method = "LALR"
+    table.lr_action = tables["action"]
+    table.lr_goto = tables["goto"]
+    table.lr_productions = [
+        yacc.MiniProduction(*production) for production in tables["productions"]
+    ]
+    table.bind_callables(vars(module))
+    return yacc.LRParser(table, getattr(module, "p_error", None))
+
+
+def build_lexer(module):
+    return lex.lex(module=module)
+
+
+def build_parser(module):
+    return yacc.yacc(module=module, debug=False, write_tables=False)
+
+
+def cached(kind, module, key, load, build, to_tables):
+    path = table_path(kind, key)
+    try:
+        return load(module, path)
+    except Exception:
+        # Missing, stale or unreadable tables: build from the grammar
+        pass
+    built = build(module)
+    write_tables(path, to_tables(built))
+    return built
+
+
+def lexer(module):
+    """Returns the lexer for a brewlex-style module, using cached tables."""
+    return cached(
+        "brewlex", module, lexer_key(module), load_lexer, build_lexer, lexer_tables
+    )
+
+
+def parser(module):
+    """Returns the parser for a brewparse-style module, using cached tables."""
+    return cached(
+        "brewparse",
+        module,
+        parser_key(module),
+        load_parser,
+        build_parser,
+        parser_tables,
+    )
+
+
+def build(directory=None):
+    """Regenerates both tables from the grammar and drops any stale ones.
+
+    Meant to be run once ahead of time (python brewtables.py [directory])
+    so that no interpreter process ever has to generate them.
+    """
+    if directory:
+        os.environ[TABLE_DIR_VARIABLE] = directory
+    import brewlex
+    import brewparse
+
+    paths = []
+    for kind, key, tables in (
+        ("brewlex", lexer_key(brewlex), lexer_tables(build_lexer(brewlex))),
+        ("brewparse", parser_key(brewparse), parser_tables(build_parser(brewparse))),
+    ):
+        path = table_path(kind, key)
+        if not write_tables(path, tables):
+            raise OSError(f"Could not write {path}")
+        for name in os.listdir(os.path.dirname(path)):
+            if name.startswith(f"{kind}-") and name != os.path.basename(path):
+                os.remove(os.path.join(os.path.dirname(path), name))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    for path in build(*sys.argv[1:2]):
+        print(path)
@@ -0,0 +1,40 @@
+class TailCall:
+    """Returned in place of a value by a `return f(...)` that reuses its frame.
+
+    The engine that ran the body exits the caller and then enters
+    function_def with the arguments already bound in the caller's scope.
+    block is the (TypeError message, line) of the innermost if/while around
+    the return, which the callee inherits since that block is already closed.
+    """
+
+    __slots__ = ("function_def", "arg_variables", "this_variable", "block")
+
+    def __init__(self, function_def, arg_variables, this_variable, block):
+        self.function_def = function_def
+        self.arg_variables = arg_variables
+        self.this_variable = this_variable
+        self.block = block
+
+
+class TailCalls:
+    """Decides when a call in tail position can replace its caller's frame.
+
+    Brewin is dynamically scoped, so a callee sees every binding its caller
+    made. Dropping the caller first is only invisible when the callee (and
+    everything it may call) never names a slot that the caller bound and
+    the callee does not shadow with its own parameters. Which slots a call
+    may name comes from a brewresolve.NameUsage.
+    """
+
+    def __init__(self, name_usage):
+        self.name_usage = name_usage
+
+    def reuses_frame(self, frame_scopes, function_def, pushed_slots):
+        # frame_scopes are the caller's function and open block scopes;
+        # pushed_slots are the bindings the callee will shadow them with
+        hidden = set().union(*frame_scopes)
+        hidden.difference_update(pushed_slots)
+        if not hidden:
+            return True
+        extent = self.name_usage.extent(function_def)
+        return extent is not None and hidden.isdisjoint(extent)
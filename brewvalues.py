@@ -0,0 +1,43 @@
+from element import Element
+
+
+class Constant(Element):
+    """A value Element that is shared rather than copied.
+
+    Interpreters never mutate a value once it is created, so nil, true,
+    false and small ints can each be a single instance for the whole
+    process instead of a fresh allocation per result.
+    """
+
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+NIL = Constant("nil")
+TRUE = Constant("bool", val=True)
+FALSE = Constant("bool", val=False)
+
+SMALL_INT_MIN = -256
+SMALL_INT_MAX = 1024
+SMALL_INTS = tuple(
+    Constant("int", val=val) for val in range(SMALL_INT_MIN, SMALL_INT_MAX + 1)
+)
+
+
+def bool_value(val):
+    if val is True:
+        return TRUE
+    if val is False:
+        return FALSE
+    return Element("bool", val=val)
+
+
+def int_value(val):
+    if type(val) is int and SMALL_INT_MIN <= val <= SMALL_INT_MAX:
+        return SMALL_INTS[val - SMALL_INT_MIN]
+    return Element("int", val=val)
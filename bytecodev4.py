@@ -0,0 +1,616 @@
+from brewvalues import FALSE, NIL, TRUE
+from element import Element
+from intbase import ErrorType
+
+# Opcodes; operands are register numbers, constant pool indexes, variable
+# slots or jump targets
+LOAD_CONST = 0  # dst, constant
+LOAD_VAR = 1  # dst, slot
+LOAD_MEMBER = 2  # dst, object slot, member cache
+STORE_VAR = 3  # src, slot
+STORE_MEMBER = 4  # src, object slot, member name
+UNARY = 5  # dst, operator, src
+BINARY = 6  # dst, operator, src1, src2
+JUMP = 7  # target
+JUMP_IF_FALSE = 8  # src, target
+ENTER_SCOPE = 9  # error message for TypeErrors raised inside the block
+EXIT_SCOPE = 10
+RETURN = 11  # src
+RETURN_NIL = 12
+NEW_OBJECT = 13  # dst
+MAKE_CLOSURE = 14  # dst, lambda
+RESOLVE_FUNCTION = 15  # function, call site, builtin target
+RESOLVE_METHOD = 16  # function, call site
+BIND_REFERENCE = 17  # function, call site, arg index, target
+BIND_VALUE = 18  # function, call site, arg index, src
+CALL = 19  # dst, function, call site
+CALL_METHOD = 20  # dst, function, call site
+CALL_BUILTIN = 21  # dst, call site, first arg register
+TAIL_CALL = 22  # dst, function, call site
+TAIL_CALL_METHOD = 23  # dst, function, call site
+SHORT_CIRCUIT = 24  # dst, deciding constant, src, target
+
+
+class CallSite:
+    def __init__(self, function, slots):
+        self.name = function.get("name")
+        self.args = function.get("args")
+        self.arg_count = len(self.args)
+        self.slot = slots.get(self.name)
+        self.object_slot = slots.get(function.get("objref"))
+        self.arg_slots = [slots.get(arg.get("name")) for arg in self.args]
+
+
+class Code:
+    def __init__(self):
+        self.instructions = []
+        self.constants = []
+        # Source line of each instruction, for errors raised while it runs
+        self.lines = []
+        self.register_count = 0
+
+
+class Assembler:
+    """Lowers the statements of one func or lambda Element into a Code object.
+
+    Registers only hold temporaries; variables stay in the interpreter's
+    dynamically scoped variable table. A function's result register and the
+    list of bound arguments always occupy two consecutive registers.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.code = Code()
+        self.next_register = 0
+        self.constant_indexes = {}
+        self.line = None
+
+    def assemble_body(self, statements):
+        self.assemble_block(statements)
+        self.emit(RETURN_NIL)
+        return self.code
+
+    def assemble_expression(self, expression):
+        register = self.allocate()
+        self.assemble_expression_into(expression, register)
+        self.emit(RETURN, register)
+        return self.code
+
+    def emit(self, *instruction):
+        self.code.instructions.append(instruction)
+        self.code.lines.append(self.line)
+        return len(self.code.instructions) - 1
+
+    def emit_at(self, node, *instruction):
+        # Operators and variables report errors at their own line
+        line = self.line
+        self.line = node.line or line
+        index = self.emit(*instruction)
+        self.line = line
+        return index
+
+    def patch(self, index, *operands):
+        opcode = self.code.instructions[index][0]
+        self.code.instructions[index] = (opcode, *operands)
+
+    def constant(self, value):
+        # Literal Elements are pooled by identity, everything else by value
+        key = id(value) if isinstance(value, Element) else (type(value), value)
+        if key not in self.constant_indexes:
+            self.constant_indexes[key] = len(self.code.constants)
+            self.code.constants.append(value)
+        return self.constant_indexes[key]
+
+    def allocate(self, count=1):
+        register = self.next_register
+        self.next_register += count
+        self.code.register_count = max(self.code.register_count, self.next_register)
+        return register
+
+    def free(self, count=1):
+        self.next_register -= count
+
+    def assemble_block(self, statements):
+        for statement in statements or []:
+            self.assemble_statement(statement)
+
+    def assemble_statement(self, statement):
+        line = self.line
+        self.line = statement.line or line
+        match statement.elem_type:
+            case "if":
+                self.assemble_if(statement)
+            case "while":
+                self.assemble_while(statement)
+            case "return":
+                expression = statement.get("expression")
+                if expression:
+                    register = self.allocate()
+                    # Returned calls may replace the current frame
+                    if expression.elem_type == "fcall":
+                        self.assemble_function_call(expression, register, TAIL_CALL)
+                    elif expression.elem_type == "mcall":
+                        self.assemble_method_call(
+                            expression, register, TAIL_CALL_METHOD
+                        )
+                    else:
+                        self.assemble_expression_into(expression, register)
+                    self.emit(RETURN, register)
+                    self.free()
+                else:
+                    self.emit(RETURN_NIL)
+            case "fcall" | "mcall":
+                register = self.allocate()
+                self.assemble_expression_into(statement, register)
+                self.free()
+            case "=":
+                self.assemble_assignment(statement)
+        self.line = line
+
+    def assemble_if(self, if_block):
+        message = self.constant("If condition does not evaluate to a boolean")
+        self.emit(ENTER_SCOPE, message)
+        register = self.allocate()
+        self.assemble_expression_into(if_block.get("condition"), register)
+        jump_to_else = self.emit(JUMP_IF_FALSE, register, None)
+        self.free()
+        self.assemble_block(if_block.get("statements"))
+        else_statements = if_block.get("else_statements")
+        if else_statements:
+            jump_to_end = self.emit(JUMP, None)
+            self.patch(jump_to_else, register, len(self.code.instructions))
+            self.assemble_block(else_statements)
+            self.patch(jump_to_end, len(self.code.instructions))
+        else:
+            self.patch(jump_to_else, register, len(self.code.instructions))
+        self.emit(EXIT_SCOPE)
+
+    def assemble_while(self, while_block):
+        message = self.constant("While condition does not evaluate to a boolean")
+        self.emit(ENTER_SCOPE, message)
+        start = len(self.code.instructions)
+        register = self.allocate()
+        self.assemble_expression_into(while_block.get("condition"), register)
+        jump_to_end = self.emit(JUMP_IF_FALSE, register, None)
+        self.free()
+        self.assemble_block(while_block.get("statements"))
+        self.emit(JUMP, start)
+        self.patch(jump_to_end, register, len(self.code.instructions))
+        self.emit(EXIT_SCOPE)
+
+    def assemble_assignment(self, assignment):
+        name = assignment.get("name")
+        register = self.allocate()
+        self.assemble_expression_into(assignment.get("expression"), register)
+        if "." in name:
+            object_name, member_name = name.split(".")
+            self.emit(
+                STORE_MEMBER,
+                register,
+                self.interpreter.slots[object_name],
+                self.constant(member_name),
+            )
+        else:
+            self.emit(STORE_VAR, register, self.interpreter.slots[name])
+        self.free()
+
+    def assemble_expression_into(self, expression, dst):
+        match expression.elem_type:
+            case "neg" | "!":
+                src = self.allocate()
+                self.assemble_expression_into(expression.get("op1"), src)
+                self.emit_at(
+                    expression, UNARY, dst, self.constant(expression.elem_type), src
+                )
+                self.free()
+            case "+" | "-" | "*" | "/" | "==" | "!=" | "<" | ">" | "<=" | ">=" | "||" | "&&":
+                src1 = self.allocate()
+                src2 = self.allocate()
+                self.assemble_expression_into(expression.get("op1"), src1)
+                skip = None
+                if self.interpreter.short_circuit and expression.elem_type in {
+                    "&&",
+                    "||",
+                }:
+                    decisive = self.constant(
+                        TRUE if expression.elem_type == "||" else FALSE
+                    )
+                    skip = self.emit(SHORT_CIRCUIT, dst, decisive, src1, None)
+                # Otherwise strict evaluation
+                self.assemble_expression_into(expression.get("op2"), src2)
+                self.emit_at(
+                    expression,
+                    BINARY,
+                    dst,
+                    self.constant(expression.elem_type),
+                    src1,
+                    src2,
+                )
+                if skip is not None:
+                    self.patch(skip, dst, decisive, src1, len(self.code.instructions))
+                self.free(2)
+            case "fcall":
+                self.assemble_function_call(expression, dst)
+            case "mcall":
+                self.assemble_method_call(expression, dst)
+            case "lambda":
+                self.interpreter.engine.compile_body(expression)
+                self.emit(MAKE_CLOSURE, dst, self.constant(expression))
+            case "@":
+                self.emit(NEW_OBJECT, dst)
+            case "var":
+                name = expression.get("name")
+                if "." in name:
+                    object_name, member_name = name.split(".")
+                    self.emit(
+                        LOAD_MEMBER,
+                        dst,
+                        self.interpreter.slots[object_name],
+                        self.constant(
+                            self.interpreter.create_member_cache(member_name)
+                        ),
+                    )
+                else:
+                    self.emit_at(
+                        expression, LOAD_VAR, dst, self.interpreter.slots[name]
+                    )
+            case "int" | "string" | "bool" | "nil":
+                self.emit(LOAD_CONST, dst, self.constant(expression))
+            case _:
+                self.emit(LOAD_CONST, dst, self.constant(None))
+
+    def assemble_arguments(self, callee, site, site_index):
+        for index, arg in enumerate(site.args):
+            skip = None
+            if site.arg_slots[index] is not None:
+                skip = self.emit(BIND_REFERENCE, callee, site_index, index, None)
+            register = self.allocate()
+            self.assemble_expression_into(arg, register)
+            self.emit(BIND_VALUE, callee, site_index, index, register)
+            self.free()
+            if skip is not None:
+                target = len(self.code.instructions)
+                self.patch(skip, callee, site_index, index, target)
+
+    def assemble_function_call(self, function, dst, call=CALL):
+        site = CallSite(function, self.interpreter.slots)
+        site_index = self.constant(site)
+        callee = self.allocate(2)
+        resolve = self.emit(RESOLVE_FUNCTION, callee, site_index, None)
+        self.assemble_arguments(callee, site, site_index)
+        self.emit(call, dst, callee, site_index)
+
+        if site.name in self.interpreter.builtin_functions:
+            jump_to_end = self.emit(JUMP, None)
+            self.patch(resolve, callee, site_index, len(self.code.instructions))
+            first = self.allocate(site.arg_count)
+            # inputi and inputs reject extra arguments before evaluating them
+            if site.name == "print" or site.arg_count <= 1:
+                for index, arg in enumerate(site.args):
+                    self.assemble_expression_into(arg, first + index)
+            self.emit(CALL_BUILTIN, dst, site_index, first)
+            self.free(site.arg_count)
+            self.patch(jump_to_end, len(self.code.instructions))
+        self.free(2)
+
+    def assemble_method_call(self, function, dst, call=CALL_METHOD):
+        site = CallSite(function, self.interpreter.slots)
+        site.member = self.interpreter.create_member_cache(site.name)
+        site_index = self.constant(site)
+        callee = self.allocate(2)
+        self.emit(RESOLVE_METHOD, callee, site_index)
+        self.assemble_arguments(callee, site, site_index)
+        self.emit(call, dst, callee, site_index)
+        self.free(2)
+
+
+class Frame:
+    """A suspended Brewin call on the VirtualMachine's explicit stack."""
+
+    __slots__ = (
+        "code",
+        "registers",
+        "blocks",
+        "pc",
+        "dst",
+        "scope_base",
+        "block",
+    )
+
+    def __init__(
+        self,
+        code,
+        dst=None,
+        scope_base=0,
+        block=None,
+    ):
+        self.code = code
+        self.registers = [None] * code.register_count
+        # ENTER_SCOPE instruction indexes of the if/while scopes open in this
+        # frame
+        self.blocks = []
+        self.pc = 0
+        # Caller register that receives the return value
+        self.dst = dst
+        # Index in the interpreter's scopes of this call's function scope
+        self.scope_base = scope_base
+        # TypeError (message, line) inherited from frames this one replaced
+        self.block = block
+
+
+class VirtualMachine:
+    """Runs v4 programs lowered to flat bytecode in a single dispatch loop.
+
+    Each func or lambda body is assembled once into a Code object with its
+    own constant pool; jumps are absolute instruction indexes and returns
+    leave the loop directly instead of unwinding with an exception.
+
+    Brewin calls do not recurse in Python: the caller's Frame is pushed
+    onto a list and the loop carries on in the callee, so call depth is
+    bounded only by the interpreter's max_depth.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.bodies = {}
+
+    def compile_body(self, function_def):
+        statements = function_def.get("statements")
+        key = id(statements)
+        if key not in self.bodies:
+            code = Assembler(self.interpreter).assemble_body(statements)
+            self.bodies[key] = (statements, code)
+        return self.bodies[key][1]
+
+    def run_body(self, function_def):
+        return self.execute(self.compile_body(function_def))
+
+    def run_expression(self, expression):
+        return self.execute(Assembler(self.interpreter).assemble_expression(expression))
+
+    def execute(self, code):
+        interpreter = self.interpreter
+        variables = interpreter.variables
+        unary_operations = interpreter.unary_operations
+        binary_operations = interpreter.binary_operations
+        frames = []
+        frame = Frame(code)
+        instructions = code.instructions
+        constants = code.constants
+        registers = frame.registers
+        blocks = frame.blocks
+        pc = 0
+        depth = interpreter.depth
+        scope_count = len(interpreter.scopes)
+
+        try:
+            while True:
+                instruction = instructions[pc]
+                pc += 1
+                opcode = instruction[0]
+                if opcode == LOAD_VAR:
+                    stack = variables[instruction[2]]
+                    if stack:
+                        registers[instruction[1]] = stack[-1].element
+                    else:
+                        registers[instruction[1]] = interpreter.evaluate_variable(
+                            instruction[2], frame.code.lines[pc - 1]
+                        )
+                elif opcode == LOAD_CONST:
+                    registers[instruction[1]] = constants[instruction[2]]
+                elif opcode == BINARY:
+                    _, dst, operator, src1, src2 = instruction
+                    operator = constants[operator]
+                    value1 = registers[src1]
+                    value2 = registers[src2]
+                    try:
+                        registers[dst] = binary_operations[operator](value1, value2)
+                    except TypeError:
+                        interpreter.error(
+                            ErrorType.TYPE_ERROR,
+                            interpreter.binary_type_error(operator, value1, value2),
+                            line_num=frame.code.lines[pc - 1],
+                        )
+                elif opcode == STORE_VAR:
+                    stack = variables[instruction[2]]
+                    value = registers[instruction[1]]
+                    if not stack:
+                        interpreter.push_variable(
+                            instruction[2], interpreter.create_variable(value)
+                        )
+                    else:
+                        stack[-1].element = value
+                elif opcode == JUMP_IF_FALSE:
+                    if not interpreter.to_bool(registers[instruction[1]]).get("val"):
+                        pc = instruction[2]
+                elif opcode == JUMP:
+                    pc = instruction[1]
+                elif opcode == RESOLVE_FUNCTION:
+                    _, callee, site, builtin = instruction
+                    site = constants[site]
+                    function_def = interpreter.resolve_function(
+                        site.slot, site.arg_count
+                    )
+                    if function_def is None:
+                        pc = builtin
+                    else:
+                        registers[callee] = function_def
+                        registers[callee + 1] = []
+                elif opcode == BIND_REFERENCE:
+                    _, callee, site, index, target = instruction
+                    param = registers[callee].get("args")[index]
+                    arg_variable = interpreter.bind_reference(
+                        param, constants[site].arg_slots[index]
+                    )
+                    if arg_variable is not None:
+                        registers[callee + 1].append(arg_variable)
+                        pc = target
+                elif opcode == BIND_VALUE:
+                    _, callee, site, index, src = instruction
+                    param = registers[callee].get("args")[index]
+                    registers[callee + 1].append(
+                        interpreter.bind_value(
+                            param, constants[site].arg_slots[index], registers[src]
+                        )
+                    )
+                elif (
+                    opcode == CALL
+                    or opcode == CALL_METHOD
+                    or opcode == TAIL_CALL
+                    or opcode == TAIL_CALL_METHOD
+                ):
+                    _, dst, callee, site = instruction
+                    function_def = registers[callee]
+                    this_variable = None
+                    if opcode == CALL_METHOD or opcode == TAIL_CALL_METHOD:
+                        this_variable = variables[constants[site].object_slot][-1]
+                    block = None
+                    if (
+                        opcode >= TAIL_CALL
+                        and frames
+                        and interpreter.reuses_frame(
+                            frame.scope_base, function_def, this_variable
+                        )
+                    ):
+                        # Leave this frame first; the callee returns straight
+                        # to our caller, whose copy of the value is skipped
+                        # as the callee's own return already copies it
+                        for _ in blocks:
+                            interpreter.delete_scope()
+                        if blocks:
+                            block = self.block(frame.code, blocks[-1])
+                        else:
+                            block = frame.block
+                        interpreter.exit_function()
+                        dst = frame.dst
+                    else:
+                        frame.pc = pc
+                        frames.append(frame)
+                    scope_base = len(interpreter.scopes)
+                    interpreter.enter_function(
+                        function_def, registers[callee + 1], this_variable
+                    )
+                    frame = Frame(
+                        self.compile_body(function_def),
+                        dst,
+                        scope_base,
+                        block,
+                    )
+                    instructions = frame.code.instructions
+                    constants = frame.code.constants
+                    registers = frame.registers
+                    blocks = frame.blocks
+                    pc = 0
+                elif opcode == RETURN or opcode == RETURN_NIL:
+                    if opcode == RETURN:
+                        value = interpreter.run_return(registers[instruction[1]])
+                    else:
+                        value = NIL
+                    for _ in blocks:
+                        interpreter.delete_scope()
+                    if not frames:
+                        return value
+                    interpreter.exit_function()
+                    dst = frame.dst
+                    frame = frames.pop()
+                    instructions = frame.code.instructions
+                    constants = frame.code.constants
+                    registers = frame.registers
+                    blocks = frame.blocks
+                    pc = frame.pc
+                    registers[dst] = value
+                elif opcode == ENTER_SCOPE:
+                    interpreter.create_scope()
+                    blocks.append(pc - 1)
+                elif opcode == EXIT_SCOPE:
+                    interpreter.delete_scope()
+                    blocks.pop()
+                elif opcode == UNARY:
+                    _, dst, operator, src = instruction
+                    operator = constants[operator]
+                    value1 = registers[src]
+                    try:
+                        registers[dst] = unary_operations[operator](value1)
+                    except TypeError:
+                        interpreter.error(
+                            ErrorType.TYPE_ERROR,
+                            f"Incompatible type for operation {operator}: {value1.elem_type}",
+                            line_num=frame.code.lines[pc - 1],
+                        )
+                elif opcode == LOAD_MEMBER:
+                    _, dst, object_slot, member = instruction
+                    object_object = interpreter.get_object(object_slot)
+                    registers[dst] = constants[member].get_member(
+                        interpreter, object_object
+                    )
+                elif opcode == STORE_MEMBER:
+                    _, src, object_slot, member_name = instruction
+                    object_object = interpreter.get_object(object_slot)
+                    object_object.assign_member(
+                        interpreter, constants[member_name], registers[src]
+                    )
+                elif opcode == RESOLVE_METHOD:
+                    _, callee, site = instruction
+                    site = constants[site]
+                    registers[callee] = interpreter.resolve_method(
+                        site.object_slot, site.member, site.arg_count
+                    )
+                    registers[callee + 1] = []
+                elif opcode == SHORT_CIRCUIT:
+                    # Operands that do not coerce fall through to BINARY,
+                    # which reports them once op2 has been evaluated
+                    _, dst, decisive, src, target = instruction
+                    decisive = constants[decisive]
+                    try:
+                        value = interpreter.to_bool(registers[src]).get("val")
+                    except TypeError:
+                        value = None
+                    if value == decisive.get("val"):
+                        registers[dst] = decisive
+                        pc = target
+                elif opcode == CALL_BUILTIN:
+                    _, dst, site, first = instruction
+                    site = constants[site]
+                    registers[dst] = interpreter.run_builtin(
+                        site.name, registers[first : first + site.arg_count]
+                    )
+                elif opcode == NEW_OBJECT:
+                    registers[instruction[1]] = interpreter.create_object()
+                elif opcode == MAKE_CLOSURE:
+                    registers[instruction[1]] = interpreter.evaluate_lambda(
+                        constants[instruction[2]]
+                    )
+        except TypeError:
+            # Mirrors the tree walker, where if/while blocks turn any
+            # TypeError raised inside them into a Brewin TYPE_ERROR; calls
+            # without an open block pass it on to their caller
+            while not frame.blocks and frame.block is None:
+                if not frames:
+                    raise
+                interpreter.exit_function()
+                frame = frames.pop()
+            block = frame.block
+            if frame.blocks:
+                block = self.block(frame.code, frame.blocks[-1])
+            interpreter.error(ErrorType.TYPE_ERROR, block[0], line_num=block[1])
+        except Exception as exception:
+            interpreter.locate_error(exception, frame.code.lines[pc - 1])
+            raise
+        finally:
+            # Returns leave nothing open; anything else leaving the loop,
+            # timeouts included, must close the calls and scopes it left
+            self.unwind(depth, scope_count)
+
+    def unwind(self, depth, scope_count):
+        # The suspended frames' calls and if/while scopes are all above the
+        # ones open when execute started, so popping back down to those
+        # counts closes them in order
+        interpreter = self.interpreter
+        while interpreter.depth > depth:
+            interpreter.exit_function()
+        while len(interpreter.scopes) > scope_count:
+            interpreter.delete_scope()
+
+    def block(self, code, index):
+        # The TypeError message and line of the if/while entered at index
+        return code.constants[code.instructions[index][1]], code.lines[index]
@@ -0,0 +1,455 @@
+from brewtail import TailCall
+from brewvalues import FALSE, NIL, TRUE
+from intbase import ErrorType
+
+
+class Compiler:
+    """Turns v4 AST Elements into trees of pre-bound Python closures.
+
+    Every node is compiled once into a zero-argument closure specialized by
+    node type (and operator), so running a program never re-dispatches on
+    elem_type. The closures call back into the interpreter for everything
+    that depends on runtime state (scopes, calls, objects).
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.bodies = {}
+
+    def compile_body(self, function_def):
+        # Keyed by the statements list so copies of a func or closure value
+        # share the body compiled for the original definition
+        statements = function_def.get("statements")
+        key = id(statements)
+        if key not in self.bodies:
+            self.bodies[key] = (statements, self.compile_block(statements))
+        return self.bodies[key][1]
+
+    def run_expression(self, expression):
+        return self.compile_expression(expression)()
+
+    def compile_block(self, statements, block=None):
+        # block is the (TypeError message, line) of the innermost enclosing
+        # if or while, which tail calls hand on to their callee
+        compiled = []
+        for statement in statements or []:
+            compiled_statement = self.compile_statement(statement, block)
+            if compiled_statement is not None:
+                compiled.append(compiled_statement)
+
+        if not compiled:
+            return lambda: None
+        if len(compiled) == 1:
+            return compiled[0]
+
+        compiled = tuple(compiled)
+
+        def run_block():
+            for statement in compiled:
+                value = statement()
+                if value is not None:
+                    return value
+
+        return run_block
+
+    # Compiled statements return None, except that a return statement
+    # returns its value (never None), which blocks pass straight up. Brewin
+    # errors that escape a statement without a line are given its line.
+
+    def compile_statement(self, statement, block=None):
+        match statement.elem_type:
+            case "if":
+                return self.compile_if(statement)
+            case "while":
+                return self.compile_while(statement)
+            case "return":
+                return self.compile_return(statement, block)
+            case "fcall" | "mcall":
+                interpreter = self.interpreter
+                line = statement.line
+                call = self.compile_expression(statement)
+
+                def run_call():
+                    try:
+                        call()
+                    except Exception as exception:
+                        interpreter.locate_error(exception, line)
+                        raise
+
+                return run_call
+            case "=":
+                return self.compile_assignment(statement)
+        # Other expression statements are never evaluated
+        return None
+
+    def compile_if(self, if_block):
+        interpreter = self.interpreter
+        message = "If condition does not evaluate to a boolean"
+        line = if_block.line
+        block = (message, line)
+        condition = self.compile_expression(if_block.get("condition"))
+        statements = self.compile_block(if_block.get("statements"), block)
+        else_statements = None
+        if if_block.get("else_statements"):
+            else_statements = self.compile_block(if_block.get("else_statements"), block)
+
+        def run_if():
+            interpreter.create_scope()
+            try:
+                if interpreter.to_bool(condition()).get("val"):
+                    return statements()
+                elif else_statements is not None:
+                    return else_statements()
+            except TypeError:
+                interpreter.error(ErrorType.TYPE_ERROR, message, line_num=line)
+            except Exception as exception:
+                interpreter.locate_error(exception, line)
+                raise
+            finally:
+                interpreter.delete_scope()
+
+        return run_if
+
+    def compile_while(self, while_block):
+        interpreter = self.interpreter
+        message = "While condition does not evaluate to a boolean"
+        line = while_block.line
+        condition = self.compile_expression(while_block.get("condition"))
+        statements = self.compile_block(while_block.get("statements"), (message, line))
+
+        def run_while():
+            interpreter.create_scope()
+            try:
+                while interpreter.to_bool(condition()).get("val"):
+                    value = statements()
+                    if value is not None:
+                        return value
+            except TypeError:
+                interpreter.error(ErrorType.TYPE_ERROR, message, line_num=line)
+            except Exception as exception:
+                interpreter.locate_error(exception, line)
+                raise
+            finally:
+                interpreter.delete_scope()
+
+        return run_while
+
+    def compile_return(self, statement, block=None):
+        interpreter = self.interpreter
+        line = statement.line
+        expression = statement.get("expression")
+        if expression and expression.elem_type == "fcall":
+            return self.compile_tail_function_call(expression, block, line)
+        elif expression and expression.elem_type == "mcall":
+            return self.compile_tail_method_call(expression, block, line)
+        elif expression:
+            value = self.compile_expression(expression)
+
+            def run_return():
+                try:
+                    return interpreter.run_return(value())
+                except Exception as exception:
+                    interpreter.locate_error(exception, line)
+                    raise
+
+        else:
+
+            def run_return():
+                return interpreter.run_return(None)
+
+        return run_return
+
+    def compile_assignment(self, assignment):
+        interpreter = self.interpreter
+        line = assignment.line
+        name = assignment.get("name")
+        value = self.compile_expression(assignment.get("expression"))
+
+        if "." in name:
+            object_name, member_name = name.split(".")
+            object_slot = interpreter.slots[object_name]
+
+            def run_member_assignment():
+                try:
+                    result = value()
+                    object_object = interpreter.get_object(object_slot)
+                    object_object.assign_member(interpreter, member_name, result)
+                except Exception as exception:
+                    interpreter.locate_error(exception, line)
+                    raise
+
+            return run_member_assignment
+
+        slot = interpreter.slots[name]
+        stack = interpreter.variables[slot]
+
+        def run_assignment():
+            try:
+                result = value()
+            except Exception as exception:
+                interpreter.locate_error(exception, line)
+                raise
+            if not stack:
+                interpreter.push_variable(slot, interpreter.create_variable(result))
+            else:
+                stack[-1].element = result
+
+        return run_assignment
+
+    def compile_expression(self, expression):
+        match expression.elem_type:
+            case "neg" | "!":
+                return self.compile_unary_operation(expression)
+            case "+" | "-" | "*" | "/" | "==" | "!=" | "<" | ">" | "<=" | ">=" | "||" | "&&":
+                return self.compile_binary_operation(expression)
+            case "fcall":
+                return self.compile_function_call(expression)
+            case "mcall":
+                return self.compile_method_call(expression)
+            case "lambda":
+                return self.compile_lambda(expression)
+            case "@":
+                return self.interpreter.create_object
+            case "var":
+                return self.compile_variable(expression)
+            case "int" | "string" | "bool" | "nil":
+                return lambda: expression
+        return lambda: None
+
+    def compile_lambda(self, lambda_def):
+        interpreter = self.interpreter
+        self.compile_body(lambda_def)
+        return lambda: interpreter.evaluate_lambda(lambda_def)
+
+    def compile_variable(self, variable):
+        interpreter = self.interpreter
+        name = variable.get("name")
+
+        if "." in name:
+            object_name, member_name = name.split(".")
+            object_slot = interpreter.slots[object_name]
+            member = interpreter.create_member_cache(member_name)
+            return lambda: member.get_member(
+                interpreter, interpreter.get_object(object_slot)
+            )
+
+        slot = interpreter.slots[name]
+        stack = interpreter.variables[slot]
+        line = variable.line
+
+        def evaluate_variable():
+            if stack:
+                return stack[-1].element
+            return interpreter.evaluate_variable(slot, line)
+
+        return evaluate_variable
+
+    def compile_unary_operation(self, operation):
+        interpreter = self.interpreter
+        operator = operation.elem_type
+        line = operation.line
+        op1 = self.compile_expression(operation.get("op1"))
+        unary_operation = interpreter.unary_operations[operator]
+
+        def evaluate_unary_operation():
+            value1 = op1()
+            try:
+                return unary_operation(value1)
+            except TypeError:
+                interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    f"Incompatible type for operation {operator}: {value1.elem_type}",
+                    line_num=line,
+                )
+
+        return evaluate_unary_operation
+
+    def compile_binary_operation(self, operation):
+        interpreter = self.interpreter
+        operator = operation.elem_type
+        line = operation.line
+        op1 = self.compile_expression(operation.get("op1"))
+        op2 = self.compile_expression(operation.get("op2"))
+        binary_operation = interpreter.binary_operations[operator]
+
+        if interpreter.short_circuit and operator in {"&&", "||"}:
+            # op1 alone decides the result when it coerces to this value;
+            # otherwise op2 is evaluated and the operation runs as usual, so
+            # type errors are reported exactly as in strict mode
+            decisive = operator == "||"
+            result = TRUE if decisive else FALSE
+
+            def evaluate_logical_operation():
+                value1 = op1()
+                try:
+                    if interpreter.to_bool(value1).get("val") == decisive:
+                        return result
+                except TypeError:
+                    pass
+                value2 = op2()
+                try:
+                    return binary_operation(value1, value2)
+                except TypeError:
+                    interpreter.error(
+                        ErrorType.TYPE_ERROR,
+                        interpreter.binary_type_error(operator, value1, value2),
+                        line_num=line,
+                    )
+
+            return evaluate_logical_operation
+
+        def evaluate_binary_operation():
+            # Strict evaluation
+            value1 = op1()
+            value2 = op2()
+            try:
+                return binary_operation(value1, value2)
+            except TypeError:
+                interpreter.error(
+                    ErrorType.TYPE_ERROR,
+                    interpreter.binary_type_error(operator, value1, value2),
+                    line_num=line,
+                )
+
+        return evaluate_binary_operation
+
+    def compile_arguments(self, args):
+        slots = self.interpreter.slots
+        return tuple(
+            (slots.get(arg.get("name")), self.compile_expression(arg)) for arg in args
+        )
+
+    def compile_function_call(self, function):
+        interpreter = self.interpreter
+        name = function.get("name")
+        slot = interpreter.slots[name]
+        arg_count = len(function.get("args"))
+        args = self.compile_arguments(function.get("args"))
+        bind_reference = interpreter.bind_reference
+        bind_value = interpreter.bind_value
+        builtin = None
+        if name in interpreter.builtin_functions:
+            builtin = self.compile_builtin(name, args)
+
+        def evaluate_function_call():
+            function_def = interpreter.resolve_function(slot, arg_count)
+            if function_def is None:
+                return builtin()
+
+            arg_variables = []
+            for param, (arg_slot, arg) in zip(function_def.get("args"), args):
+                arg_variable = bind_reference(param, arg_slot)
+                if arg_variable is None:
+                    arg_variable = bind_value(param, arg_slot, arg())
+                arg_variables.append(arg_variable)
+            return interpreter.call_function(function_def, arg_variables)
+
+        return evaluate_function_call
+
+    def compile_method_call(self, function):
+        interpreter = self.interpreter
+        object_slot = interpreter.slots[function.get("objref")]
+        member = interpreter.create_member_cache(function.get("name"))
+        arg_count = len(function.get("args"))
+        args = self.compile_arguments(function.get("args"))
+        bind_reference = interpreter.bind_reference
+        bind_value = interpreter.bind_value
+        object_stack = interpreter.variables[object_slot]
+
+        def evaluate_method_call():
+            function_def = interpreter.resolve_method(object_slot, member, arg_count)
+            arg_variables = []
+            for param, (arg_slot, arg) in zip(function_def.get("args"), args):
+                arg_variable = bind_reference(param, arg_slot)
+                if arg_variable is None:
+                    arg_variable = bind_value(param, arg_slot, arg())
+                arg_variables.append(arg_variable)
+            return interpreter.call_function(
+                function_def, arg_variables, object_stack[-1]
+            )
+
+        return evaluate_method_call
+
+    # A returned call whose callee cannot observe the caller's bindings
+    # becomes a TailCall, which call_function runs after leaving the caller.
+    # The callee's own return already copies the value, so the caller's
+    # copy is skipped.
+
+    def compile_tail_function_call(self, function, block, line):
+        interpreter = self.interpreter
+        name = function.get("name")
+        slot = interpreter.slots[name]
+        arg_count = len(function.get("args"))
+        args = self.compile_arguments(function.get("args"))
+        bind_reference = interpreter.bind_reference
+        bind_value = interpreter.bind_value
+        builtin = None
+        if name in interpreter.builtin_functions:
+            builtin = self.compile_builtin(name, args)
+
+        def run_tail_function_call():
+            try:
+                function_def = interpreter.resolve_function(slot, arg_count)
+                if function_def is None:
+                    return interpreter.run_return(builtin())
+
+                arg_variables = []
+                for param, (arg_slot, arg) in zip(function_def.get("args"), args):
+                    arg_variable = bind_reference(param, arg_slot)
+                    if arg_variable is None:
+                        arg_variable = bind_value(param, arg_slot, arg())
+                    arg_variables.append(arg_variable)
+                if interpreter.reuses_frame(interpreter.frame_base, function_def):
+                    return TailCall(function_def, arg_variables, None, block)
+                return interpreter.run_return(
+                    interpreter.call_function(function_def, arg_variables)
+                )
+            except Exception as exception:
+                interpreter.locate_error(exception, line)
+                raise
+
+        return run_tail_function_call
+
+    def compile_tail_method_call(self, function, block, line):
+        interpreter = self.interpreter
+        object_slot = interpreter.slots[function.get("objref")]
+        member = interpreter.create_member_cache(function.get("name"))
+        arg_count = len(function.get("args"))
+        args = self.compile_arguments(function.get("args"))
+        bind_reference = interpreter.bind_reference
+        bind_value = interpreter.bind_value
+        object_stack = interpreter.variables[object_slot]
+
+        def run_tail_method_call():
+            try:
+                function_def = interpreter.resolve_method(
+                    object_slot, member, arg_count
+                )
+                arg_variables = []
+                for param, (arg_slot, arg) in zip(function_def.get("args"), args):
+                    arg_variable = bind_reference(param, arg_slot)
+                    if arg_variable is None:
+                        arg_variable = bind_value(param, arg_slot, arg())
+                    arg_variables.append(arg_variable)
+                this_variable = object_stack[-1]
+                if interpreter.reuses_frame(
+                    interpreter.frame_base, function_def, this_variable
+                ):
+                    return TailCall(function_def, arg_variables, this_variable, block)
+                return interpreter.run_return(
+                    interpreter.call_function(
+                        function_def, arg_variables, this_variable
+                    )
+                )
+            except Exception as exception:
+                interpreter.locate_error(exception, line)
+                raise
+
+        return run_tail_method_call
+
+    def compile_builtin(self, name, args):
+        interpreter = self.interpreter
+        values = tuple(value for _, value in args)
+        if name != "print" and len(values) > 1:
+            return lambda: interpreter.run_builtin(name, values)
+        return lambda: interpreter.run_builtin(name, [value() for value in values])
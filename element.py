@@ -1,18 +1,66 @@
+from copy import deepcopy
+
+
+# A source position is packed into one int as line << COLUMN_BITS | column
+COLUMN_BITS = 20
+COLUMN_MASK = (1 << COLUMN_BITS) - 1
+
+
+def pack_position(line, column):
+    return line << COLUMN_BITS | min(column, COLUMN_MASK)
+
+
+def token_position(text, line, lexpos):
+    # Columns are 1-based, counted from the last newline before lexpos
+    return pack_position(line, lexpos - text.rfind("\n", 0, lexpos))
+
+
 class Element:
+    __slots__ = ("elem_type", "dict")
+
+    # Only parsed Nodes know where they came from
+    position = None
+
     def __init__(self, elem_type, **kwargs):
         self.elem_type = elem_type
-        self.dict = {}
-        for key, value in kwargs.items():
-            self.dict[key] = value
+        self.dict = kwargs
 
     def get(self, key):
-        if key not in self.dict:
+        return self.dict.get(key)
+
+    def items(self):
+        return self.dict.items()
+
+    @property
+    def line(self):
+        if self.position is None:
+            return None
+        return self.position >> COLUMN_BITS
+
+    @property
+    def column(self):
+        if self.position is None:
             return None
-        return self.dict[key]
+        return self.position & COLUMN_MASK
+
+    # Slotted objects otherwise go through the much slower copyreg path
+
+    def __copy__(self):
+        copy = Element.__new__(type(self))
+        copy.elem_type = self.elem_type
+        copy.dict = dict(self.dict)
+        return copy
+
+    def __deepcopy__(self, memo):
+        copy = Element.__new__(type(self))
+        memo[id(self)] = copy
+        copy.elem_type = self.elem_type
+        copy.dict = deepcopy(self.dict, memo)
+        return copy
 
     def __str__(self):
         s = f"{self.elem_type}: "
-        for key, value in self.dict.items():
+        for key, value in self.items():
             s += key + ": " + self.__val(value) + ", "
         return s[0:-2]
 
@@ -27,3 +75,103 @@ class Element:
                 return "[" + s[0:-2] + "]"
             return "[" + s + "]"
         return str(v)
+
+
+class Node(Element):
+    """An Element whose fields live in __slots__ rather than a per-node dict.
+
+    Subclasses list their fields in __slots__; brewparse emits one of these
+    for every AST node. get() and elem_type behave as on a plain Element,
+    but the dict attribute is never set. position is not a field, so
+    items() and the serialized fields leave it out.
+    """
+
+    __slots__ = ("position",)
+
+    def __init__(self, elem_type, position=None, **kwargs):
+        self.elem_type = elem_type
+        self.position = position
+        for key in self.__slots__:
+            setattr(self, key, kwargs.get(key))
+
+    def get(self, key):
+        return getattr(self, key, None)
+
+    def items(self):
+        return ((key, getattr(self, key)) for key in self.__slots__)
+
+    def __copy__(self):
+        copy = Element.__new__(type(self))
+        copy.elem_type = self.elem_type
+        copy.position = self.position
+        for key in self.__slots__:
+            setattr(copy, key, getattr(self, key))
+        return copy
+
+    def __deepcopy__(self, memo):
+        copy = Element.__new__(type(self))
+        memo[id(self)] = copy
+        copy.elem_type = self.elem_type
+        copy.position = self.position
+        for key in self.__slots__:
+            setattr(copy, key, deepcopy(getattr(self, key), memo))
+        return copy
+
+
+class ProgramNode(Node):
+    __slots__ = ("functions",)
+
+
+class FuncNode(Node):
+    __slots__ = ("name", "args", "statements")
+
+
+class LambdaNode(Node):
+    __slots__ = ("args", "statements")
+
+
+class NameNode(Node):
+    # Formal arguments and variable reads
+    __slots__ = ("name",)
+
+
+class AssignmentNode(Node):
+    __slots__ = ("name", "expression")
+
+
+class IfNode(Node):
+    __slots__ = ("condition", "statements", "else_statements")
+
+
+class WhileNode(Node):
+    __slots__ = ("condition", "statements")
+
+
+class ReturnNode(Node):
+    __slots__ = ("expression",)
+
+
+class UnaryNode(Node):
+    __slots__ = ("op1",)
+
+
+class BinaryNode(Node):
+    __slots__ = ("op1", "op2")
+
+
+class ValueNode(Node):
+    # int, bool and string literals
+    __slots__ = ("val",)
+
+
+class EmptyNode(Node):
+    # nil literals and @
+    __slots__ = ()
+
+
+class FunctionCallNode(Node):
+    __slots__ = ("name", "args")
+
+
+class MethodCallNode(Node):
+    __slots__ = ("objref", "name", "args")
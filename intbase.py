@@ -9,6 +9,25 @@ class ErrorType(Enum):
     # Add others here
 
 
+# Lines of a file or mmap without their endings, or the items of any other
+# iterable, read no further ahead than asked for
+def input_lines(source):
+    if not hasattr(source, "readline"):
+        yield from source
+        return
+    while True:
+        line = source.readline()
+        if not line:
+            return
+        if isinstance(line, bytes):
+            line = line.decode()
+        if line.endswith("\n"):
+            line = line[:-1]
+            if line.endswith("\r"):
+                line = line[:-1]
+        yield line
+
+
 class InterpreterBase:
     # AST node types
     PROGRAM_DEF = "program"
@@ -34,17 +53,21 @@ class InterpreterBase:
     NOT_DEF = "!"
 
     # methods
-    def __init__(self, console_output=True, inp=None):
+    def __init__(self, console_output=True, inp=None, output_sink=None):
         self.console_output = console_output
         self.inp = inp  # if not none, then read input from passed-in list
+        # if not none, gets every output line instead of console and output_log
+        self.output_sink = output_sink
         self.reset()
 
     # Call to reset I/O for another run of the program
     def reset(self):
         self.output_log = []
         self.input_cursor = 0
+        self.input_lines = None
         self.error_type = None
         self.error_line = None
+        self.error_description = None
 
     # Students must implement this in their derived class
     def run(self, program):
@@ -54,6 +77,15 @@ class InterpreterBase:
         if not self.inp:
             return input()  # Get input from keyboard if not input list provided
 
+        if not isinstance(self.inp, (list, tuple)):
+            # iterators, files and mmaps are read one line at a time
+            if self.input_lines is None:
+                self.input_lines = input_lines(self.inp)
+            cur_input = next(self.input_lines, None)
+            if cur_input is not None:
+                self.input_cursor += 1
+            return cur_input
+
         if self.input_cursor < len(self.inp):
             cur_input = self.inp[self.input_cursor]
             self.input_cursor += 1
@@ -65,16 +97,30 @@ class InterpreterBase:
         # log the error before we throw
         self.error_line = line_num
         self.error_type = error_type
+        self.error_description = description
+        raise Exception(self.error_message())
 
-        if description:
-            description = ": " + description
+    def error_message(self):
+        if self.error_description:
+            description = ": " + self.error_description
         else:
             description = ""
-        if not line_num:
-            raise Exception(f"{error_type}{description}")
-        raise Exception(f"{error_type} on line {line_num}{description}")
+        if not self.error_line:
+            return f"{self.error_type}{description}"
+        return f"{self.error_type} on line {self.error_line}{description}"
+
+    # Gives an error raised without a line the line of the innermost
+    # statement it passes through; callers re-raise exception afterwards
+    def locate_error(self, exception, line_num):
+        if self.error_type is None or self.error_line or not line_num:
+            return
+        self.error_line = line_num
+        exception.args = (self.error_message(),)
 
     def output(self, v):
+        if self.output_sink is not None:
+            self.output_sink.write(v)
+            return
         if self.console_output:
             print(v)
         self.output_log.append(v)
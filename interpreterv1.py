@@ -1,4 +1,4 @@
-from brewparse import parse_program
+from brewcache import parse_program
 from element import Element
 from intbase import InterpreterBase, ErrorType
 
@@ -6,8 +6,10 @@ from intbase import InterpreterBase, ErrorType
 class Interpreter(InterpreterBase):
     builtin_functions = {"print", "inputi"}
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    def __init__(
+        self, console_output=True, inp=None, trace_output=False, output_sink=None
+    ):
+        super().__init__(console_output, inp, output_sink)
         self.trace_output = trace_output
 
         self.variables = {}
@@ -32,7 +34,11 @@ class Interpreter(InterpreterBase):
         elif name in self.builtin_functions:
             return self.run_builtin(function)
         else:
-            self.error(ErrorType.NAME_ERROR, f"No {name}() function was found")
+            self.error(
+                ErrorType.NAME_ERROR,
+                f"No {name}() function was found",
+                line_num=function.line,
+            )
 
     def run_builtin(self, function):
         name = function.get("name")
@@ -52,6 +58,7 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.NAME_ERROR,
                         "No inputi() function found that takes > 1 parameter",
+                        line_num=function.line,
                     )
                 return Element("int", val=int(self.get_input()))
 
@@ -79,7 +86,9 @@ class Interpreter(InterpreterBase):
                     return self.variables[name]
                 else:
                     self.error(
-                        ErrorType.NAME_ERROR, f"Variable {name} has not been defined"
+                        ErrorType.NAME_ERROR,
+                        f"Variable {name} has not been defined",
+                        line_num=expression.line,
                     )
             case "int" | "string":
                 return expression
@@ -89,7 +98,9 @@ class Interpreter(InterpreterBase):
         op2 = self.evaluate_expression(operation.get("op2"))
         if op1.elem_type == "string" or op2.elem_type == "string":
             self.error(
-                ErrorType.TYPE_ERROR, "Incompatible types for arithmetic operation"
+                ErrorType.TYPE_ERROR,
+                "Incompatible types for arithmetic operation",
+                line_num=operation.line,
             )
 
         match operation.elem_type:
@@ -1,24 +1,30 @@
-from brewparse import parse_program
+from brewcache import parse_program
+from brewprofile import Profiler
+from brewvalues import FALSE, NIL, TRUE, bool_value, int_value
 from element import Element
 from intbase import InterpreterBase, ErrorType
 
 
-class Return(Exception):
-    def __init__(self, value):
-        super().__init__()
-        self.value = value
-
-
 class Interpreter(InterpreterBase):
     builtin_functions = {"print", "inputi", "inputs"}
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        output_sink=None,
+        profile=False,
+    ):
+        super().__init__(console_output, inp, output_sink)
         self.trace_output = trace_output
+        # Per-function timings, see Profiler.report()
+        self.profiler = Profiler() if profile else None
 
         self.function_defs = {}
         self.variables = {}
         self.scopes = []
+        self.return_value = None
 
     def run(self, program):
         program_node = parse_program(program)
@@ -34,17 +40,26 @@ class Interpreter(InterpreterBase):
         self.run_function(main_function)
 
     def run_statement(self, statement):
+        # Returns True once a return statement has run, leaving its value in
+        # return_value for run_function
         match statement.elem_type:
             case "if":
-                self.run_if(statement)
+                return self.run_if(statement)
             case "while":
-                self.run_while(statement)
+                return self.run_while(statement)
             case "return":
-                self.run_return(statement)
+                return self.run_return(statement)
             case "fcall":
                 self.run_function(statement)
             case "=":
                 self.run_assignment(statement)
+        return False
+
+    def run_statements(self, statements):
+        for statement in statements:
+            if self.run_statement(statement):
+                return True
+        return False
 
     def create_scope(self):
         self.scopes.append([])
@@ -63,17 +78,18 @@ class Interpreter(InterpreterBase):
         condition = self.evaluate_expression(if_block.get("condition"))
         if condition.elem_type != "bool":
             self.error(
-                ErrorType.TYPE_ERROR, "If condition does not evaluate to a boolean"
+                ErrorType.TYPE_ERROR,
+                "If condition does not evaluate to a boolean",
+                line_num=if_block.line,
             )
 
         self.create_scope()
         try:
             if condition.get("val"):
-                for statement in statements:
-                    self.run_statement(statement)
+                return self.run_statements(statements)
             elif else_statements:
-                for statement in else_statements:
-                    self.run_statement(statement)
+                return self.run_statements(else_statements)
+            return False
         finally:
             self.delete_scope()
 
@@ -88,22 +104,24 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.TYPE_ERROR,
                         "While condition does not evaluate to a boolean",
+                        line_num=while_block.line,
                     )
 
                 if condition.get("val"):
-                    for statement in statements:
-                        self.run_statement(statement)
+                    if self.run_statements(statements):
+                        return True
                 else:
-                    break
+                    return False
         finally:
             self.delete_scope()
 
     def run_return(self, statement):
         expression = statement.get("expression")
         if expression:
-            raise Return(self.evaluate_expression(expression))
+            self.return_value = self.evaluate_expression(expression)
         else:
-            raise Return(Element("nil"))
+            self.return_value = NIL
+        return True
 
     def run_function(self, function):
         name = function.get("name")
@@ -120,13 +138,15 @@ class Interpreter(InterpreterBase):
                 self.variables[param_name].append(self.evaluate_expression(arg))
 
             self.create_scope()
+            if self.profiler is not None:
+                self.profiler.enter(function_def)
             try:
-                for statement in statements:
-                    self.run_statement(statement)
-                return Element("nil")
-            except Return as ret:
-                return ret.value
+                if self.run_statements(statements):
+                    return self.return_value
+                return NIL
             finally:
+                if self.profiler is not None:
+                    self.profiler.exit()
                 self.delete_scope()
 
                 for param in params:
@@ -141,6 +161,7 @@ class Interpreter(InterpreterBase):
             self.error(
                 ErrorType.NAME_ERROR,
                 f"No {name}() function found that takes {len(args)} parameters",
+                line_num=function.line,
             )
 
     def run_builtin(self, function):
@@ -150,7 +171,7 @@ class Interpreter(InterpreterBase):
         match name:
             case "print":
                 self.output("".join(self.fmt(arg) for arg in args))
-                return Element("nil")
+                return NIL
             case "inputi":
                 if len(args) == 1:
                     self.output(self.evaluate_expression(args[0]).get("val"))
@@ -158,8 +179,9 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.NAME_ERROR,
                         "No inputi() function found that takes > 1 parameter",
+                        line_num=function.line,
                     )
-                return Element("int", val=int(self.get_input()))
+                return int_value(int(self.get_input()))
             case "inputs":
                 if len(args) == 1:
                     self.output(self.evaluate_expression(args[0]).get("val"))
@@ -167,6 +189,7 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.NAME_ERROR,
                         "No inputs() function found that takes > 1 parameter",
+                        line_num=function.line,
                     )
                 return Element("string", val=self.get_input())
 
@@ -202,7 +225,9 @@ class Interpreter(InterpreterBase):
                     return self.variables[name][-1]
                 else:
                     self.error(
-                        ErrorType.NAME_ERROR, f"Variable {name} has not been defined"
+                        ErrorType.NAME_ERROR,
+                        f"Variable {name} has not been defined",
+                        line_num=expression.line,
                     )
             case "int" | "string" | "bool" | "nil":
                 return expression
@@ -214,18 +239,19 @@ class Interpreter(InterpreterBase):
             match operation.elem_type:
                 case "neg":
                     if op1.elem_type == "int":
-                        return Element("int", val=-op1.get("val"))
+                        return int_value(-op1.get("val"))
                     else:
                         raise TypeError
                 case "!":
                     if op1.elem_type == "bool":
-                        return Element("bool", val=not op1.get("val"))
+                        return bool_value(not op1.get("val"))
                     else:
                         raise TypeError
-        except:
+        except TypeError:
             self.error(
                 ErrorType.TYPE_ERROR,
                 f"Incompatible type for operation {operation.elem_type}: {op1.elem_type}",
+                line_num=operation.line,
             )
 
     def evaluate_binary_operation(self, operation):
@@ -237,68 +263,69 @@ class Interpreter(InterpreterBase):
             match operation.elem_type:
                 case "+":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("int", val=op1.get("val") + op2.get("val"))
+                        return int_value(op1.get("val") + op2.get("val"))
                     elif op1.elem_type == op2.elem_type == "string":
                         return Element("string", val=op1.get("val") + op2.get("val"))
                     else:
                         raise TypeError
                 case "-":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("int", val=op1.get("val") - op2.get("val"))
+                        return int_value(op1.get("val") - op2.get("val"))
                     else:
                         raise TypeError
                 case "*":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("int", val=op1.get("val") * op2.get("val"))
+                        return int_value(op1.get("val") * op2.get("val"))
                     else:
                         raise TypeError
                 case "/":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("int", val=op1.get("val") // op2.get("val"))
+                        return int_value(op1.get("val") // op2.get("val"))
                     else:
                         raise TypeError
                 case "==":
                     if op1.elem_type != op2.elem_type:
-                        return Element("bool", val=False)
+                        return FALSE
                     else:
-                        return Element("bool", val=op1.get("val") == op2.get("val"))
+                        return bool_value(op1.get("val") == op2.get("val"))
                 case "!=":
                     if op1.elem_type != op2.elem_type:
-                        return Element("bool", val=True)
+                        return TRUE
                     else:
-                        return Element("bool", val=op1.get("val") != op2.get("val"))
+                        return bool_value(op1.get("val") != op2.get("val"))
                 case "<":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") < op2.get("val"))
+                        return bool_value(op1.get("val") < op2.get("val"))
                     else:
                         raise TypeError
                 case ">":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") > op2.get("val"))
+                        return bool_value(op1.get("val") > op2.get("val"))
                     else:
                         raise TypeError
                 case "<=":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") <= op2.get("val"))
+                        return bool_value(op1.get("val") <= op2.get("val"))
                     else:
                         raise TypeError
                 case ">=":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") >= op2.get("val"))
+                        return bool_value(op1.get("val") >= op2.get("val"))
                     else:
                         raise TypeError
                 case "||":
                     if op1.elem_type == op2.elem_type == "bool":
-                        return Element("bool", val=op1.get("val") or op2.get("val"))
+                        return bool_value(op1.get("val") or op2.get("val"))
                     else:
                         raise TypeError
                 case "&&":
                     if op1.elem_type == op2.elem_type == "bool":
-                        return Element("bool", val=op1.get("val") and op2.get("val"))
+                        return bool_value(op1.get("val") and op2.get("val"))
                     else:
                         raise TypeError
         except TypeError:
             self.error(
                 ErrorType.TYPE_ERROR,
                 f"Incompatible types for operation {operation.elem_type}: {op1.elem_type} and {op2.elem_type}",
+                line_num=operation.line,
             )
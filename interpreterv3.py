@@ -1,6 +1,8 @@
 from copy import deepcopy
 
-from brewparse import parse_program
+from brewcache import parse_program
+from brewprofile import Profiler
+from brewvalues import FALSE, NIL, TRUE, bool_value, int_value
 from element import Element
 from intbase import InterpreterBase, ErrorType
 
@@ -11,22 +13,26 @@ class Variable:
         self.element = element
 
 
-class Return(Exception):
-    def __init__(self, value):
-        super().__init__()
-        self.value = value
-
-
 class Interpreter(InterpreterBase):
     builtin_functions = {"print", "inputi", "inputs"}
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        output_sink=None,
+        profile=False,
+    ):
+        super().__init__(console_output, inp, output_sink)
         self.trace_output = trace_output
+        # Per-function timings, see Profiler.report()
+        self.profiler = Profiler() if profile else None
 
         self.function_defs = {}
         self.variables = {}
         self.scopes = []
+        self.return_value = None
 
     def run(self, program):
         program_node = parse_program(program)
@@ -41,17 +47,26 @@ class Interpreter(InterpreterBase):
         self.run_function(main_function)
 
     def run_statement(self, statement):
+        # Returns True once a return statement has run, leaving its value in
+        # return_value for run_function
         match statement.elem_type:
             case "if":
-                self.run_if(statement)
+                return self.run_if(statement)
             case "while":
-                self.run_while(statement)
+                return self.run_while(statement)
             case "return":
-                self.run_return(statement)
+                return self.run_return(statement)
             case "fcall":
                 self.run_function(statement)
             case "=":
                 self.run_assignment(statement)
+        return False
+
+    def run_statements(self, statements):
+        for statement in statements:
+            if self.run_statement(statement):
+                return True
+        return False
 
     def create_scope(self):
         self.scopes.append(set())
@@ -78,14 +93,15 @@ class Interpreter(InterpreterBase):
         try:
             condition = self.to_bool(if_block.get("condition"))
             if condition.get("val"):
-                for statement in statements:
-                    self.run_statement(statement)
+                return self.run_statements(statements)
             elif else_statements:
-                for statement in else_statements:
-                    self.run_statement(statement)
+                return self.run_statements(else_statements)
+            return False
         except TypeError:
             self.error(
-                ErrorType.TYPE_ERROR, "If condition does not evaluate to a boolean"
+                ErrorType.TYPE_ERROR,
+                "If condition does not evaluate to a boolean",
+                line_num=if_block.line,
             )
         finally:
             self.delete_scope()
@@ -97,13 +113,15 @@ class Interpreter(InterpreterBase):
             while True:
                 condition = self.to_bool(while_block.get("condition"))
                 if condition.get("val"):
-                    for statement in statements:
-                        self.run_statement(statement)
+                    if self.run_statements(statements):
+                        return True
                 else:
-                    break
+                    return False
         except TypeError:
             self.error(
-                ErrorType.TYPE_ERROR, "While condition does not evaluate to a boolean"
+                ErrorType.TYPE_ERROR,
+                "While condition does not evaluate to a boolean",
+                line_num=while_block.line,
             )
         finally:
             self.delete_scope()
@@ -111,9 +129,10 @@ class Interpreter(InterpreterBase):
     def run_return(self, statement):
         expression = statement.get("expression")
         if expression:
-            raise Return(deepcopy(self.evaluate_expression(expression)))
+            self.return_value = deepcopy(self.evaluate_expression(expression))
         else:
-            raise Return(Element("nil"))
+            self.return_value = NIL
+        return True
 
     def run_function(self, function):
         name = function.get("name")
@@ -129,12 +148,15 @@ class Interpreter(InterpreterBase):
 
             if function_def.elem_type not in {"func", "closure"}:
                 self.error(
-                    ErrorType.TYPE_ERROR, f"Variable {name} does not hold a function"
+                    ErrorType.TYPE_ERROR,
+                    f"Variable {name} does not hold a function",
+                    line_num=function.line,
                 )
             if len(params) != len(args):
                 self.error(
                     ErrorType.TYPE_ERROR,
                     f"{name} takes {len(params)} parameters: {len(args)} arguments given",
+                    line_num=function.line,
                 )
         elif name in self.builtin_functions:
             return self.run_builtin(function)
@@ -142,6 +164,7 @@ class Interpreter(InterpreterBase):
             self.error(
                 ErrorType.NAME_ERROR,
                 f"No {name}() function found that takes {len(args)} parameters",
+                line_num=function.line,
             )
 
         param_names = {param.get("name") for param in params}
@@ -171,13 +194,15 @@ class Interpreter(InterpreterBase):
             param_name = param.get("name")
             self.push_variable(param_name, arg_variable)
 
+        if self.profiler is not None:
+            self.profiler.enter(function_def)
         try:
-            for statement in statements:
-                self.run_statement(statement)
-            return Element("nil")
-        except Return as ret:
-            return ret.value
+            if self.run_statements(statements):
+                return self.return_value
+            return NIL
         finally:
+            if self.profiler is not None:
+                self.profiler.exit()
             if function_def.elem_type == "closure":
                 for capture_name in exposed_captures:
                     captures[capture_name] = self.variables[capture_name][-1].element
@@ -190,7 +215,7 @@ class Interpreter(InterpreterBase):
         match name:
             case "print":
                 self.output("".join(self.fmt(arg) for arg in args))
-                return Element("nil")
+                return NIL
             case "inputi":
                 if len(args) == 1:
                     self.output(self.evaluate_expression(args[0]).get("val"))
@@ -198,8 +223,9 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.NAME_ERROR,
                         "No inputi() function found that takes > 1 parameter",
+                        line_num=function.line,
                     )
-                return Element("int", val=int(self.get_input()))
+                return int_value(int(self.get_input()))
             case "inputs":
                 if len(args) == 1:
                     self.output(self.evaluate_expression(args[0]).get("val"))
@@ -207,6 +233,7 @@ class Interpreter(InterpreterBase):
                     self.error(
                         ErrorType.NAME_ERROR,
                         "No inputs() function found that takes > 1 parameter",
+                        line_num=function.line,
                     )
                 return Element("string", val=self.get_input())
 
@@ -224,7 +251,7 @@ class Interpreter(InterpreterBase):
             case "bool":
                 return element
             case "int":
-                return Element("bool", val=bool(element.get("val")))
+                return bool_value(bool(element.get("val")))
             case _:
                 raise TypeError
 
@@ -234,7 +261,7 @@ class Interpreter(InterpreterBase):
             case "int":
                 return element
             case "bool":
-                return Element("int", val=int(element.get("val")))
+                return int_value(int(element.get("val")))
             case _:
                 raise TypeError
 
@@ -259,18 +286,24 @@ class Interpreter(InterpreterBase):
             case "fcall":
                 return self.run_function(expression)
             case "lambda":
+                if self.profiler is not None:
+                    self.profiler.allocate()
                 captures = deepcopy(
                     {
                         name: values[-1].element
                         for name, values in self.variables.items()
                     }
                 )
-                return Element(
+                closure = Element(
                     "closure",
                     args=expression.get("args"),
                     statements=expression.get("statements"),
                     captures=captures,
                 )
+                if self.profiler is not None:
+                    # Copies of the closure keep the lambda it came from
+                    closure.dict["lambda_id"] = id(expression)
+                return closure
             case "var":  # Includes named functions and bound lambdas
                 name = expression.get("name")
                 if name in self.variables:
@@ -278,12 +311,16 @@ class Interpreter(InterpreterBase):
                 elif name in self.function_defs:
                     if len(self.function_defs[name]) != 1:
                         self.error(
-                            ErrorType.NAME_ERROR, f"{name}() function is ambiguous"
+                            ErrorType.NAME_ERROR,
+                            f"{name}() function is ambiguous",
+                            line_num=expression.line,
                         )
                     return next(iter(self.function_defs[name].values()))
                 else:
                     self.error(
-                        ErrorType.NAME_ERROR, f"Variable {name} has not been defined"
+                        ErrorType.NAME_ERROR,
+                        f"Variable {name} has not been defined",
+                        line_num=expression.line,
                     )
             case "int" | "string" | "bool" | "nil" | "func" | "closure":
                 return expression
@@ -294,16 +331,17 @@ class Interpreter(InterpreterBase):
             match operation.elem_type:
                 case "neg":
                     if op1.elem_type == "int":
-                        return Element("int", val=-op1.get("val"))
+                        return int_value(-op1.get("val"))
                     else:
                         raise TypeError
                 case "!":
                     op1 = self.to_bool(op1)
-                    return Element("bool", val=not op1.get("val"))
+                    return bool_value(not op1.get("val"))
         except TypeError:
             self.error(
                 ErrorType.TYPE_ERROR,
                 f"Incompatible type for operation {operation.elem_type}: {op1.elem_type}",
+                line_num=operation.line,
             )
 
     def evaluate_binary_operation(self, operation):
@@ -317,19 +355,19 @@ class Interpreter(InterpreterBase):
                         return Element("string", val=op1.get("val") + op2.get("val"))
                     op1 = self.to_int(op1)
                     op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") + op2.get("val"))
+                    return int_value(op1.get("val") + op2.get("val"))
                 case "-":
                     op1 = self.to_int(op1)
                     op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") - op2.get("val"))
+                    return int_value(op1.get("val") - op2.get("val"))
                 case "*":
                     op1 = self.to_int(op1)
                     op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") * op2.get("val"))
+                    return int_value(op1.get("val") * op2.get("val"))
                 case "/":
                     op1 = self.to_int(op1)
                     op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") // op2.get("val"))
+                    return int_value(op1.get("val") // op2.get("val"))
                 case "==":
                     if (op1.elem_type, op2.elem_type) in {
                         ("int", "bool"),
@@ -341,11 +379,11 @@ class Interpreter(InterpreterBase):
                             Element("==", op1=op1, op2=op2)
                         )
                     elif op1.elem_type != op2.elem_type:
-                        return Element("bool", val=False)
+                        return FALSE
                     elif op1.elem_type == "func" or op1.elem_type == "closure":
-                        return Element("bool", val=op1 is op2)
+                        return bool_value(op1 is op2)
                     else:
-                        return Element("bool", val=op1.get("val") == op2.get("val"))
+                        return bool_value(op1.get("val") == op2.get("val"))
                 case "!=":
                     if (op1.elem_type, op2.elem_type) in {
                         ("int", "bool"),
@@ -357,41 +395,42 @@ class Interpreter(InterpreterBase):
                             Element("!=", op1=op1, op2=op2)
                         )
                     elif op1.elem_type != op2.elem_type:
-                        return Element("bool", val=True)
+                        return TRUE
                     elif op1.elem_type == "func" or op1.elem_type == "closure":
-                        return Element("bool", val=op1 is not op2)
+                        return bool_value(op1 is not op2)
                     else:
-                        return Element("bool", val=op1.get("val") != op2.get("val"))
+                        return bool_value(op1.get("val") != op2.get("val"))
                 case "<":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") < op2.get("val"))
+                        return bool_value(op1.get("val") < op2.get("val"))
                     else:
                         raise TypeError
                 case ">":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") > op2.get("val"))
+                        return bool_value(op1.get("val") > op2.get("val"))
                     else:
                         raise TypeError
                 case "<=":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") <= op2.get("val"))
+                        return bool_value(op1.get("val") <= op2.get("val"))
                     else:
                         raise TypeError
                 case ">=":
                     if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") >= op2.get("val"))
+                        return bool_value(op1.get("val") >= op2.get("val"))
                     else:
                         raise TypeError
                 case "||":
                     op1 = self.to_bool(op1)
                     op2 = self.to_bool(op2)
-                    return Element("bool", val=op1.get("val") or op2.get("val"))
+                    return bool_value(op1.get("val") or op2.get("val"))
                 case "&&":
                     op1 = self.to_bool(op1)
                     op2 = self.to_bool(op2)
-                    return Element("bool", val=op1.get("val") and op2.get("val"))
+                    return bool_value(op1.get("val") and op2.get("val"))
         except TypeError:
             self.error(
                 ErrorType.TYPE_ERROR,
                 f"Incompatible types for operation {operation.elem_type}: {op1.elem_type} and {op2.elem_type}",
+                line_num=operation.line,
             )
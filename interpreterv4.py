@@ -1,6 +1,13 @@
-from copy import deepcopy
-
-from brewparse import parse_program
+from copy import copy
+
+from brewcache import parse_program
+from brewfold import Folder
+from brewprofile import Profiler
+from brewresolve import NameUsage, Resolver
+from brewtail import TailCall, TailCalls
+from brewvalues import FALSE, NIL, TRUE, bool_value, int_value
+from bytecodev4 import VirtualMachine
+from compilerv4 import Compiler
 from element import Element
 from intbase import InterpreterBase, ErrorType
 
@@ -10,22 +17,44 @@ class Variable:
         self.element = element
 
 
+class Shape:
+    """The member layout of an object: which names it has, at which index.
+
+    Objects that gained the same members in the same order share a Shape,
+    so a call site that has seen a Shape once can skip the name lookup.
+    Shapes are never changed; adding a member moves the object to a child.
+    """
+
+    def __init__(self, names=("proto",)):
+        self.names = names
+        self.indexes = {name: index for index, name in enumerate(names)}
+        self.transitions = {}
+
+    def add(self, member_name):
+        if member_name not in self.transitions:
+            self.transitions[member_name] = Shape(self.names + (member_name,))
+        return self.transitions[member_name]
+
+
 class Object:
-    def __init__(self):
-        self.members = {"proto": Element("nil")}
+    def __init__(self, shape):
+        # values[0] is always the prototype
+        self.shape = shape
+        self.values = [NIL]
+        self.is_prototype = False
 
     def get_member(self, interpreter, member_name):
         if member_name == "proto":
-            prototype = self.members["proto"]
+            prototype = self.values[0]
             if prototype.elem_type == "nil":
                 interpreter.error(
                     ErrorType.NAME_ERROR, f"Prototype has not been defined"
                 )
             return prototype
-        elif member_name in self.members:
-            return self.members[member_name]
+        elif member_name in self.shape.indexes:
+            return self.values[self.shape.indexes[member_name]]
         else:
-            prototype = self.members["proto"]
+            prototype = self.values[0]
             if prototype.elem_type != "nil":
                 return prototype.get("val").get_member(interpreter, member_name)
             else:
@@ -34,30 +63,158 @@ class Object:
                 )
 
     def assign_member(self, interpreter, member_name, value):
-        if member_name == "proto" and value.elem_type not in {"object", "nil"}:
-            interpreter.error(ErrorType.TYPE_ERROR, f"Prototype must be an object")
-        self.members[member_name] = value
-
-
-class Return(Exception):
-    def __init__(self, value):
-        super().__init__()
-        self.value = value
+        if member_name == "proto":
+            if value.elem_type not in {"object", "nil"}:
+                interpreter.error(ErrorType.TYPE_ERROR, f"Prototype must be an object")
+            if value.elem_type == "object":
+                value.get("val").is_prototype = True
+
+        index = self.shape.indexes.get(member_name)
+        if index is None or member_name == "proto":
+            # Cached prototype hits assume no prototype changed shape or chain
+            if self.is_prototype:
+                interpreter.prototype_epoch += 1
+        if index is None:
+            self.shape = self.shape.add(member_name)
+            self.values.append(value)
+        else:
+            self.values[index] = value
+
+
+class MemberCache:
+    """An inline cache for one member read or method call site.
+
+    Remembers the Shape of the last object looked up and where the member
+    was found: an index into the object itself, or an index into a
+    prototype further up the chain. Prototype hits stay valid while the
+    object keeps the same prototype and the interpreter's prototype epoch,
+    bumped whenever any prototype changes shape or chain, is unchanged.
+    """
+
+    def __init__(self, member_name):
+        self.member_name = member_name
+        self.shape = None
+        self.index = None
+        self.holder = None
+        self.prototype = None
+        self.epoch = None
+
+    def get_member(self, interpreter, object_object):
+        if object_object.shape is self.shape:
+            if self.holder is None:
+                return object_object.values[self.index]
+            if (
+                object_object.values[0] is self.prototype
+                and interpreter.prototype_epoch == self.epoch
+            ):
+                return self.holder.values[self.index]
+        return self.lookup(interpreter, object_object)
+
+    def lookup(self, interpreter, object_object):
+        if self.member_name == "proto":
+            return object_object.get_member(interpreter, self.member_name)
+
+        seen = set()
+        holder = object_object
+        while self.member_name not in holder.shape.indexes:
+            seen.add(id(holder))
+            prototype = holder.values[0]
+            if prototype.elem_type == "nil":
+                interpreter.error(
+                    ErrorType.NAME_ERROR, f"Member {self.member_name} not in object"
+                )
+            holder = prototype.get("val")
+            if id(holder) in seen:
+                # A cyclic chain; fail the way the uncached lookup does
+                return object_object.get_member(interpreter, self.member_name)
+
+        self.shape = object_object.shape
+        self.index = holder.shape.indexes[self.member_name]
+        if holder is object_object:
+            self.holder = None
+        else:
+            self.holder = holder
+            self.prototype = object_object.values[0]
+            self.epoch = interpreter.prototype_epoch
+        return holder.values[self.index]
 
 
 class Interpreter(InterpreterBase):
     builtin_functions = {"print", "inputi", "inputs"}
 
-    def __init__(self, console_output=True, inp=None, trace_output=False):
-        super().__init__(console_output, inp)
+    immutable_types = {"int", "bool", "string", "nil"}
+
+    backends = {"closure": Compiler, "bytecode": VirtualMachine}
+
+    default_max_depth = 10000
+
+    def __init__(
+        self,
+        console_output=True,
+        inp=None,
+        trace_output=False,
+        backend="closure",
+        max_depth=default_max_depth,
+        short_circuit=False,
+        output_sink=None,
+        profile=False,
+    ):
+        super().__init__(console_output, inp, output_sink)
         self.trace_output = trace_output
+        # Per-function timings, see Profiler.report()
+        self.profiler = Profiler() if profile else None
+        # && and || skip op2 once op1 decides the result; off by default
+        # since Brewin evaluates both operands
+        self.short_circuit = short_circuit
+        # Brewin call depth; None means only Python's own limit applies
+        self.max_depth = max_depth
+        self.depth = 0
 
         self.function_defs = {}
-        self.variables = {}
+        self.slots = {}
+        self.slot_names = []
+        self.variables = []
         self.scopes = []
+        # Index in scopes of the running call's function scope
+        self.frame_base = 0
+        self.name_usage = None
+        self.tail_calls = None
+        self.root_shape = Shape()
+        self.prototype_epoch = 0
+        if backend not in self.backends:
+            raise ValueError(f"Unknown backend {backend}")
+        self.engine = self.backends[backend](self)
+
+        self.unary_operations = {
+            "neg": self.negate,
+            "!": self.logical_not,
+        }
+        self.binary_operations = {
+            "+": self.add,
+            "-": self.subtract,
+            "*": self.multiply,
+            "/": self.divide,
+            "==": self.equal,
+            "!=": self.not_equal,
+            "<": self.less,
+            ">": self.greater,
+            "<=": self.less_equal,
+            ">=": self.greater_equal,
+            "||": self.logical_or,
+            "&&": self.logical_and,
+        }
+        # How operators coerce their operands before working on them
+        self.coercions = {
+            "+": self.to_int,
+            "-": self.to_int,
+            "*": self.to_int,
+            "/": self.to_int,
+            "||": self.to_bool,
+            "&&": self.to_bool,
+        }
 
     def run(self, program):
-        program_node = parse_program(program)
+        program_node = Folder(self).fold_program(parse_program(program))
         functions = program_node.get("functions")
         for function in functions:
             name = function.get("name")
@@ -66,440 +223,455 @@ class Interpreter(InterpreterBase):
             self.function_defs[name][len(params)] = function
 
         main_function = Element("fcall", name="main", args=[])
-        self.run_function(main_function)
-
-    def run_statement(self, statement):
-        match statement.elem_type:
-            case "if":
-                self.run_if(statement)
-            case "while":
-                self.run_while(statement)
-            case "return":
-                self.run_return(statement)
-            case "fcall" | "mcall":
-                self.run_function(statement)
-            case "=":
-                self.run_assignment(statement)
+
+        resolver = Resolver()
+        resolver.resolve(program_node)
+        resolver.resolve(main_function)
+        self.slots = resolver.slots
+        self.slot_names = resolver.names
+        # One stack of live bindings per slot, innermost binding last
+        self.variables[:] = [[] for _ in self.slot_names]
+        self.name_usage = NameUsage(
+            program_node, self.function_defs, self.slots, self.builtin_functions
+        )
+        self.tail_calls = TailCalls(self.name_usage)
+
+        for function in functions:
+            self.engine.compile_body(function)
+
+        self.engine.run_expression(main_function)
 
     def create_scope(self):
         self.scopes.append(set())
 
     def delete_scope(self):
-        for variable_name in self.scopes[-1]:
-            self.pop_variable(variable_name)
-        self.scopes.pop()
-
-    def push_variable(self, variable_name, variable):
-        self.scopes[-1].add(variable_name)
-        self.variables.setdefault(variable_name, [])
-        self.variables[variable_name].append(variable)
-
-    def pop_variable(self, variable_name):
-        self.variables[variable_name].pop()
-        if not self.variables[variable_name]:
-            del self.variables[variable_name]
-
-    def run_if(self, if_block):
-        statements = if_block.get("statements")
-        else_statements = if_block.get("else_statements")
-        self.create_scope()
-        try:
-            condition = self.to_bool(if_block.get("condition"))
-            if condition.get("val"):
-                for statement in statements:
-                    self.run_statement(statement)
-            elif else_statements:
-                for statement in else_statements:
-                    self.run_statement(statement)
-        except TypeError:
+        for slot in self.scopes.pop():
+            self.variables[slot].pop()
+
+    def push_variable(self, slot, variable):
+        self.scopes[-1].add(slot)
+        self.variables[slot].append(variable)
+
+    def create_variable(self, value):
+        return Variable(value)
+
+    def create_object(self):
+        if self.profiler is not None:
+            self.profiler.allocate()
+        return Element("object", val=Object(self.root_shape))
+
+    def create_closure(self, args, statements, captures):
+        if self.profiler is not None:
+            self.profiler.allocate()
+        return Element("closure", args=args, statements=statements, captures=captures)
+
+    def create_member_cache(self, member_name):
+        return MemberCache(member_name)
+
+    def get_object(self, object_slot):
+        if self.variables[object_slot]:
+            object_value = self.variables[object_slot][-1].element
+        else:
             self.error(
-                ErrorType.TYPE_ERROR, "If condition does not evaluate to a boolean"
+                ErrorType.NAME_ERROR,
+                f"Variable {self.slot_names[object_slot]} has not been defined",
             )
-        finally:
-            self.delete_scope()
 
-    def run_while(self, while_block):
-        statements = while_block.get("statements")
-        self.create_scope()
-        try:
-            while True:
-                condition = self.to_bool(while_block.get("condition"))
-                if condition.get("val"):
-                    for statement in statements:
-                        self.run_statement(statement)
-                else:
-                    break
-        except TypeError:
+        if object_value.elem_type != "object":
             self.error(
-                ErrorType.TYPE_ERROR, "While condition does not evaluate to a boolean"
+                ErrorType.TYPE_ERROR,
+                f"{self.slot_names[object_slot]} is not an object",
             )
-        finally:
-            self.delete_scope()
 
-    def run_return(self, statement):
-        expression = statement.get("expression")
-        if expression:
-            raise Return(deepcopy(self.evaluate_expression(expression)))
-        else:
-            raise Return(Element("nil"))
-
-    def run_function(self, function):
-        name = function.get("name")
-        args = function.get("args")
-        if function.elem_type == "fcall":
-            if name in self.function_defs and len(args) in self.function_defs[name]:
-                function_def = self.function_defs[name][len(args)]
-                params = function_def.get("args")
-            elif name in self.variables:
-                function_def = self.variables[name][-1].element
-
-                if function_def.elem_type not in {"func", "closure"}:
-                    self.error(
-                        ErrorType.TYPE_ERROR,
-                        f"Variable {name} does not hold a function",
-                    )
+        return object_value.get("val")
 
-                params = function_def.get("args")
-                if len(params) != len(args):
-                    self.error(
-                        ErrorType.TYPE_ERROR,
-                        f"{name} takes {len(params)} parameters: {len(args)} arguments given",
-                    )
-            elif name in self.builtin_functions:
-                return self.run_builtin(function)
-            else:
-                self.error(
-                    ErrorType.NAME_ERROR,
-                    f"No {name}() function found that takes {len(args)} parameters",
+    def run_return(self, value):
+        if value is not None:
+            return self.copy_value(value)
+        else:
+            return NIL
+
+    # Values are copied when passed and returned. Only objects and closures
+    # (with the variables they capture) are mutable, so they are the only
+    # values copied in full; funcs are cloned so the copy compares unequal,
+    # and everything else is immutable and shared as is.
+
+    def copy_value(self, value, memo=None):
+        if value.elem_type in self.immutable_types:
+            return value
+        if memo is None:
+            memo = {}
+        elif id(value) in memo:
+            return memo[id(value)]
+
+        match value.elem_type:
+            case "object":
+                object_object = value.get("val")
+                value_copy = self.create_object()
+                memo[id(value)] = value_copy
+                object_copy = value_copy.get("val")
+                object_copy.shape = object_object.shape
+                object_copy.is_prototype = object_object.is_prototype
+                object_copy.values = [
+                    self.copy_value(member, memo) for member in object_object.values
+                ]
+            case "closure":
+                captures = {}
+                value_copy = self.create_closure(
+                    value.get("args"), value.get("statements"), captures
                 )
-        elif function.elem_type == "mcall":
-            object_name = function.get("objref")
-            if object_name in self.variables:
-                object_value = self.variables[object_name][-1].element
-            else:
+                memo[id(value)] = value_copy
+                for slot, variable in value.get("captures").items():
+                    captures[slot] = self.copy_variable(variable, memo)
+            case _:
+                value_copy = copy(value)
+                memo[id(value)] = value_copy
+        return value_copy
+
+    def copy_variable(self, variable, memo):
+        if id(variable) in memo:
+            return memo[id(variable)]
+        variable_copy = Variable(None)
+        memo[id(variable)] = variable_copy
+        variable_copy.element = self.copy_value(variable.element, memo)
+        return variable_copy
+
+    def evaluate_variable(self, slot, line_num=None):
+        name = self.slot_names[slot]
+        if self.variables[slot]:
+            return self.variables[slot][-1].element
+        elif name in self.function_defs:
+            if len(self.function_defs[name]) != 1:
                 self.error(
                     ErrorType.NAME_ERROR,
-                    f"Variable {object_name} has not been defined",
+                    f"{name}() function is ambiguous",
+                    line_num=line_num,
                 )
+            return next(iter(self.function_defs[name].values()))
+        else:
+            self.error(
+                ErrorType.NAME_ERROR,
+                f"Variable {name} has not been defined",
+                line_num=line_num,
+            )
 
-            if object_value.elem_type != "object":
-                self.error(
-                    ErrorType.TYPE_ERROR,
-                    f"{object_name} is not an object",
-                )
+    def resolve_function(self, slot, arg_count):
+        # Returns None when the call should go to a builtin
+        name = self.slot_names[slot]
+        if name in self.function_defs and arg_count in self.function_defs[name]:
+            return self.function_defs[name][arg_count]
+        elif self.variables[slot]:
+            function_def = self.variables[slot][-1].element
 
-            object_object = object_value.get("val")
-            function_def = object_object.get_member(self, name)
             if function_def.elem_type not in {"func", "closure"}:
                 self.error(
                     ErrorType.TYPE_ERROR,
-                    f"{object_name}.{name} does not hold a function",
+                    f"Variable {name} does not hold a function",
                 )
 
             params = function_def.get("args")
-            if len(params) != len(args):
+            if len(params) != arg_count:
                 self.error(
-                    ErrorType.NAME_ERROR,
-                    f"{name} takes {len(params)} parameters: {len(args)} arguments given",
+                    ErrorType.TYPE_ERROR,
+                    f"{name} takes {len(params)} parameters: {arg_count} arguments given",
                 )
-
-        statements = function_def.get("statements")
-        param_names = {param.get("name") for param in params}
-
-        # Get arguments before shadowing
-        arg_variables = []
-        for param, arg in zip(params, args):
-            param_name = param.get("name")
-            arg_name = arg.get("name")
-            if param.elem_type == "refarg" and arg_name in self.variables:
-                arg_variables.append(self.variables[arg_name][-1])
-            elif param.elem_type == "refarg" and arg_name in self.function_defs:
-                arg_variables.append(Variable(self.evaluate_expression(arg)))
-            else:
-                arg_variables.append(Variable(deepcopy(self.evaluate_expression(arg))))
-
-        self.create_scope()
-        if function.elem_type == "mcall":
-            self.push_variable("this", self.variables[object_name][-1])
-
-        if function_def.elem_type == "closure":
-            captures = function_def.get("captures")
-            exposed_captures = dict(
-                filter(lambda capture: capture[0] not in param_names, captures.items())
+            return function_def
+        elif name in self.builtin_functions:
+            return None
+        else:
+            self.error(
+                ErrorType.NAME_ERROR,
+                f"No {name}() function found that takes {arg_count} parameters",
             )
-            for capture_name, capture_variable in exposed_captures.items():
-                self.push_variable(capture_name, capture_variable)
 
-        for param, arg_variable in zip(params, arg_variables):
-            param_name = param.get("name")
-            self.push_variable(param_name, arg_variable)
+    def resolve_method(self, object_slot, member, arg_count):
+        # member is the call site's MemberCache
+        object_object = self.get_object(object_slot)
+        function_def = member.get_member(self, object_object)
+        if function_def.elem_type not in {"func", "closure"}:
+            self.error(
+                ErrorType.TYPE_ERROR,
+                f"{self.slot_names[object_slot]}.{member.member_name} does not hold a function",
+            )
 
+        params = function_def.get("args")
+        if len(params) != arg_count:
+            self.error(
+                ErrorType.NAME_ERROR,
+                f"{member.member_name} takes {len(params)} parameters: {arg_count} arguments given",
+            )
+        return function_def
+
+    # Arguments are bound before the callee's scope shadows anything
+
+    # Arguments without a name have no slot and are always evaluated
+
+    def bind_reference(self, param, arg_slot):
+        # Returns None when the argument has to be evaluated
+        if param.elem_type == "refarg" and arg_slot is not None:
+            if self.variables[arg_slot]:
+                return self.variables[arg_slot][-1]
+        return None
+
+    def bind_value(self, param, arg_slot, value):
+        if param.elem_type == "refarg" and arg_slot is not None:
+            if self.slot_names[arg_slot] in self.function_defs:
+                return Variable(value)
+        return Variable(self.copy_value(value))
+
+    def call_function(self, function_def, arg_variables, this_variable=None):
+        # Bodies may hand back a TailCall, which runs in this same frame. The
+        # compiled body is called right here, keeping the Python frames each
+        # Brewin call takes (and so how deep programs can recurse) down
+        frame_base = self.frame_base
+        block = None
         try:
-            for statement in statements:
-                self.run_statement(statement)
-            return Element("nil")
-        except Return as ret:
-            return ret.value
+            while True:
+                self.frame_base = len(self.scopes)
+                self.enter_function(function_def, arg_variables, this_variable)
+                try:
+                    value = self.engine.compile_body(function_def)()
+                except TypeError:
+                    if block is None:
+                        raise
+                    self.error(ErrorType.TYPE_ERROR, block[0], line_num=block[1])
+                finally:
+                    self.exit_function()
+                if value is None:
+                    return NIL
+                if type(value) is not TailCall:
+                    return value
+                function_def = value.function_def
+                arg_variables = value.arg_variables
+                this_variable = value.this_variable
+                if value.block is not None:
+                    block = value.block
         finally:
-            if function_def.elem_type == "closure":
-                for capture_name in exposed_captures:
-                    captures[capture_name] = self.variables[capture_name][-1]
+            self.frame_base = frame_base
+
+    def reuses_frame(self, frame_base, function_def, this_variable=None):
+        # Whether a tail call from the frame whose function scope is at
+        # frame_base can exit that frame before entering function_def
+        pushed_slots = {
+            self.slots[param.get("name")] for param in function_def.get("args")
+        }
+        if this_variable is not None:
+            pushed_slots.add(self.slots["this"])
+        if function_def.elem_type == "closure":
+            pushed_slots.update(function_def.get("captures"))
+        return self.tail_calls.reuses_frame(
+            self.scopes[frame_base:], function_def, pushed_slots
+        )
+
+    # Engines that keep their own frame stack call enter_function and
+    # exit_function around a body instead of going through call_function
 
-            self.delete_scope()
+    def enter_function(self, function_def, arg_variables, this_variable=None):
+        if self.max_depth is not None and self.depth >= self.max_depth:
+            raise RecursionError(f"Maximum call depth of {self.max_depth} exceeded")
+        self.depth += 1
+        if self.profiler is not None:
+            self.profiler.enter(function_def)
 
-    def run_builtin(self, function):
-        name = function.get("name")
-        args = function.get("args")
+        params = function_def.get("args")
+        param_slots = [self.slots[param.get("name")] for param in params]
+
+        self.create_scope()
+        if this_variable is not None:
+            self.push_variable(self.slots["this"], this_variable)
+
+        if function_def.elem_type == "closure":
+            # Captures are cells shared by every call of the closure, so the
+            # body assigns to them in place and nothing is written back.
+            # They are still bound like variables since callees may see them
+            for capture_slot, cell in function_def.get("captures").items():
+                self.push_variable(capture_slot, cell)
+
+        for param_slot, arg_variable in zip(param_slots, arg_variables):
+            self.push_variable(param_slot, arg_variable)
+
+    def exit_function(self):
+        self.delete_scope()
+        self.depth -= 1
+        if self.profiler is not None:
+            self.profiler.exit()
+
+    def run_builtin(self, name, args):
         match name:
             case "print":
                 self.output("".join(self.fmt(arg) for arg in args))
-                return Element("nil")
-            case "inputi":
+                return NIL
+            case "inputi" | "inputs":
                 if len(args) == 1:
-                    self.output(self.evaluate_expression(args[0]).get("val"))
+                    self.output(args[0].get("val"))
                 elif len(args) > 1:
+                    # Arguments are never evaluated in this case
                     self.error(
                         ErrorType.NAME_ERROR,
-                        "No inputi() function found that takes > 1 parameter",
-                    )
-                return Element("int", val=int(self.get_input()))
-            case "inputs":
-                if len(args) == 1:
-                    self.output(self.evaluate_expression(args[0]).get("val"))
-                elif len(args) > 1:
-                    self.error(
-                        ErrorType.NAME_ERROR,
-                        "No inputs() function found that takes > 1 parameter",
+                        f"No {name}() function found that takes > 1 parameter",
                     )
+                if name == "inputi":
+                    return int_value(int(self.get_input()))
                 return Element("string", val=self.get_input())
 
-    def fmt(self, expression):
-        element = self.evaluate_expression(expression)
+    def fmt(self, element):
         match element.elem_type:
             case "int" | "string":
                 return str(element.get("val"))
             case "bool":
                 return str(element.get("val")).lower()
 
-    def to_bool(self, expression):
-        element = self.evaluate_expression(expression)
+    def to_bool(self, element):
         match element.elem_type:
             case "bool":
                 return element
             case "int":
-                return Element("bool", val=bool(element.get("val")))
+                return bool_value(bool(element.get("val")))
             case _:
                 raise TypeError
 
-    def to_int(self, expression):
-        element = self.evaluate_expression(expression)
+    def to_int(self, element):
         match element.elem_type:
             case "int":
                 return element
             case "bool":
-                return Element("int", val=int(element.get("val")))
+                return int_value(int(element.get("val")))
             case _:
                 raise TypeError
 
-    def run_assignment(self, assignment):
-        name = assignment.get("name")
-        expression = assignment.get("expression")
-        value = self.evaluate_expression(expression)
-        if "." in name:
-            object_name, member_name = name.split(".")
-            if object_name in self.variables:
-                object_value = self.variables[object_name][-1].element
-            else:
-                self.error(
-                    ErrorType.NAME_ERROR,
-                    f"Variable {object_name} has not been defined",
-                )
-
-            if object_value.elem_type != "object":
-                self.error(
-                    ErrorType.TYPE_ERROR,
-                    f"{object_name} is not an object",
-                )
-
-            object_object = object_value.get("val")
-            object_object.assign_member(self, member_name, value)
-        else:
-            if name not in self.variables:
-                self.push_variable(name, Variable(value))
-            else:
-                self.variables[name][-1].element = value
-
-    def evaluate_expression(self, expression):
-        match expression.elem_type:
-            case "neg" | "!":
-                return self.evaluate_unary_operation(expression)
-            case "+" | "-" | "*" | "/" | "==" | "!=" | "<" | ">" | "<=" | ">=" | "||" | "&&":
-                return self.evaluate_binary_operation(expression)
-            case "fcall" | "mcall":
-                return self.run_function(expression)
-            case "lambda":
-                return self.evaluate_lambda(expression)
-            case "@":
-                return Element("object", val=Object())
-            case "var":  # Includes named functions and bound lambdas
-                return self.evaluate_variable(expression)
-            case "int" | "string" | "bool" | "nil" | "func" | "closure" | "object":
-                return expression
-
     def evaluate_lambda(self, lambda_def):
+        captured_slots = self.name_usage.captured_slots(lambda_def)
+        if captured_slots is None:
+            param_slots = {
+                self.slots[param.get("name")] for param in lambda_def.get("args")
+            }
+            captured_slots = [
+                slot
+                for slot, stack in enumerate(self.variables)
+                if stack and slot not in param_slots
+            ]
+
         captures = {}
-        for name, stack in self.variables.items():
+        for slot in captured_slots:
+            stack = self.variables[slot]
+            if not stack:
+                continue
             variable = stack[-1]
             value = variable.element
             if value.elem_type in {"closure", "object"}:
-                captures[name] = variable
+                captures[slot] = variable
             else:
-                captures[name] = deepcopy(variable)
+                captures[slot] = Variable(self.copy_value(value))
 
-        return Element(
-            "closure",
-            args=lambda_def.get("args"),
-            statements=lambda_def.get("statements"),
-            captures=captures,
+        return self.create_closure(
+            lambda_def.get("args"), lambda_def.get("statements"), captures
         )
 
-    def evaluate_variable(self, variable):
-        name = variable.get("name")
-        if "." in name:
-            object_name, member_name = name.split(".")
-            if object_name in self.variables:
-                object_value = self.variables[object_name][-1].element
-            else:
-                self.error(
-                    ErrorType.NAME_ERROR,
-                    f"Variable {object_name} has not been defined",
-                )
+    # Operations raise TypeError on incompatible operands; the caller reports it
+
+    def binary_type_error(self, operator, op1, op2):
+        # Names the types as the tree-walking evaluator did, which had
+        # already coerced op1 when op2 turned out to be incompatible
+        coerce = self.coercions.get(operator)
+        if coerce is not None:
+            try:
+                op1 = coerce(op1)
+            except TypeError:
+                pass
+        return f"Incompatible types for operation {operator}: {op1.elem_type} and {op2.elem_type}"
+
+    def negate(self, op1):
+        if op1.elem_type == "int":
+            return int_value(-op1.get("val"))
+        else:
+            raise TypeError
+
+    def logical_not(self, op1):
+        op1 = self.to_bool(op1)
+        return bool_value(not op1.get("val"))
+
+    def add(self, op1, op2):
+        if op1.elem_type == op2.elem_type == "string":
+            return Element("string", val=op1.get("val") + op2.get("val"))
+        op1 = self.to_int(op1)
+        op2 = self.to_int(op2)
+        return int_value(op1.get("val") + op2.get("val"))
+
+    def subtract(self, op1, op2):
+        op1 = self.to_int(op1)
+        op2 = self.to_int(op2)
+        return int_value(op1.get("val") - op2.get("val"))
+
+    def multiply(self, op1, op2):
+        op1 = self.to_int(op1)
+        op2 = self.to_int(op2)
+        return int_value(op1.get("val") * op2.get("val"))
+
+    def divide(self, op1, op2):
+        op1 = self.to_int(op1)
+        op2 = self.to_int(op2)
+        return int_value(op1.get("val") // op2.get("val"))
+
+    def equal(self, op1, op2):
+        if (op1.elem_type, op2.elem_type) in {
+            ("int", "bool"),
+            ("bool", "int"),
+        }:
+            op1 = self.to_bool(op1)
+            op2 = self.to_bool(op2)
+            return bool_value(op1.get("val") == op2.get("val"))
+        elif op1.elem_type != op2.elem_type:
+            return FALSE
+        elif op1.elem_type in {"func", "closure", "object"}:
+            return bool_value(op1 is op2)
+        else:
+            return bool_value(op1.get("val") == op2.get("val"))
+
+    def not_equal(self, op1, op2):
+        if (op1.elem_type, op2.elem_type) in {
+            ("int", "bool"),
+            ("bool", "int"),
+        }:
+            op1 = self.to_bool(op1)
+            op2 = self.to_bool(op2)
+            return bool_value(op1.get("val") != op2.get("val"))
+        elif op1.elem_type != op2.elem_type:
+            return TRUE
+        elif op1.elem_type in {"func", "closure", "object"}:
+            return bool_value(op1 is not op2)
+        else:
+            return bool_value(op1.get("val") != op2.get("val"))
 
-            if object_value.elem_type != "object":
-                self.error(
-                    ErrorType.TYPE_ERROR,
-                    f"{object_name} is not an object",
-                )
+    def less(self, op1, op2):
+        if op1.elem_type == op2.elem_type == "int":
+            return bool_value(op1.get("val") < op2.get("val"))
+        else:
+            raise TypeError
 
-            object_object = object_value.get("val")
-            return object_object.get_member(self, member_name)
+    def greater(self, op1, op2):
+        if op1.elem_type == op2.elem_type == "int":
+            return bool_value(op1.get("val") > op2.get("val"))
         else:
-            if name in self.variables:
-                return self.variables[name][-1].element
-            elif name in self.function_defs:
-                if len(self.function_defs[name]) != 1:
-                    self.error(ErrorType.NAME_ERROR, f"{name}() function is ambiguous")
-                return next(iter(self.function_defs[name].values()))
-            else:
-                self.error(
-                    ErrorType.NAME_ERROR,
-                    f"Variable {name} has not been defined",
-                )
+            raise TypeError
 
-    def evaluate_unary_operation(self, operation):
-        op1 = self.evaluate_expression(operation.get("op1"))
-        try:
-            match operation.elem_type:
-                case "neg":
-                    if op1.elem_type == "int":
-                        return Element("int", val=-op1.get("val"))
-                    else:
-                        raise TypeError
-                case "!":
-                    op1 = self.to_bool(op1)
-                    return Element("bool", val=not op1.get("val"))
-        except TypeError:
-            self.error(
-                ErrorType.TYPE_ERROR,
-                f"Incompatible type for operation {operation.elem_type}: {op1.elem_type}",
-            )
+    def less_equal(self, op1, op2):
+        if op1.elem_type == op2.elem_type == "int":
+            return bool_value(op1.get("val") <= op2.get("val"))
+        else:
+            raise TypeError
 
-    def evaluate_binary_operation(self, operation):
-        # Strict evaluation
-        op1 = self.evaluate_expression(operation.get("op1"))
-        op2 = self.evaluate_expression(operation.get("op2"))
-        try:
-            match operation.elem_type:
-                case "+":
-                    if op1.elem_type == op2.elem_type == "string":
-                        return Element("string", val=op1.get("val") + op2.get("val"))
-                    op1 = self.to_int(op1)
-                    op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") + op2.get("val"))
-                case "-":
-                    op1 = self.to_int(op1)
-                    op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") - op2.get("val"))
-                case "*":
-                    op1 = self.to_int(op1)
-                    op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") * op2.get("val"))
-                case "/":
-                    op1 = self.to_int(op1)
-                    op2 = self.to_int(op2)
-                    return Element("int", val=op1.get("val") // op2.get("val"))
-                case "==":
-                    if (op1.elem_type, op2.elem_type) in {
-                        ("int", "bool"),
-                        ("bool", "int"),
-                    }:
-                        op1 = self.to_bool(op1)
-                        op2 = self.to_bool(op2)
-                        return self.evaluate_binary_operation(
-                            Element("==", op1=op1, op2=op2)
-                        )
-                    elif op1.elem_type != op2.elem_type:
-                        return Element("bool", val=False)
-                    elif op1.elem_type in {"func", "closure", "object"}:
-                        return Element("bool", val=op1 is op2)
-                    else:
-                        return Element("bool", val=op1.get("val") == op2.get("val"))
-                case "!=":
-                    if (op1.elem_type, op2.elem_type) in {
-                        ("int", "bool"),
-                        ("bool", "int"),
-                    }:
-                        op1 = self.to_bool(op1)
-                        op2 = self.to_bool(op2)
-                        return self.evaluate_binary_operation(
-                            Element("!=", op1=op1, op2=op2)
-                        )
-                    elif op1.elem_type != op2.elem_type:
-                        return Element("bool", val=True)
-                    elif op1.elem_type in {"func", "closure", "object"}:
-                        return Element("bool", val=op1 is not op2)
-                    else:
-                        return Element("bool", val=op1.get("val") != op2.get("val"))
-                case "<":
-                    if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") < op2.get("val"))
-                    else:
-                        raise TypeError
-                case ">":
-                    if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") > op2.get("val"))
-                    else:
-                        raise TypeError
-                case "<=":
-                    if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") <= op2.get("val"))
-                    else:
-                        raise TypeError
-                case ">=":
-                    if op1.elem_type == op2.elem_type == "int":
-                        return Element("bool", val=op1.get("val") >= op2.get("val"))
-                    else:
-                        raise TypeError
-                case "||":
-                    op1 = self.to_bool(op1)
-                    op2 = self.to_bool(op2)
-                    return Element("bool", val=op1.get("val") or op2.get("val"))
-                case "&&":
-                    op1 = self.to_bool(op1)
-                    op2 = self.to_bool(op2)
-                    return Element("bool", val=op1.get("val") and op2.get("val"))
-        except TypeError:
-            self.error(
-                ErrorType.TYPE_ERROR,
-                f"Incompatible types for operation {operation.elem_type}: {op1.elem_type} and {op2.elem_type}",
-            )
+    def greater_equal(self, op1, op2):
+        if op1.elem_type == op2.elem_type == "int":
+            return bool_value(op1.get("val") >= op2.get("val"))
+        else:
+            raise TypeError
+
+    def logical_or(self, op1, op2):
+        op1 = self.to_bool(op1)
+        op2 = self.to_bool(op2)
+        return bool_value(op1.get("val") or op2.get("val"))
+
+    def logical_and(self, op1, op2):
+        op1 = self.to_bool(op1)
+        op2 = self.to_bool(op2)
+        return bool_value(op1.get("val") and op2.get("val"))